@@ -0,0 +1,293 @@
+"""
+Admission control and load shedding for the prediction endpoints.
+
+At most ADMISSION_MAX_CONCURRENCY requests are served at once; up to
+ADMISSION_MAX_QUEUE more wait in FIFO order. The queueing delay is the
+larger of:
+
+- the age of the oldest waiting request (queueing for a slot, e.g. when
+  inference runs in a thread or process pool), and
+- the event-loop lag, measured by a probe task (requests waiting for the
+  loop itself when inference runs inline)
+
+Once the delay has stayed above ADMISSION_TARGET_DELAY_MS for a whole
+ADMISSION_INTERVAL_MS, the service is overloaded. New requests are then
+rejected at once with 503 and ``Retry-After``, so they cost almost
+nothing instead of timing out later, and waiting requests that have
+already queued longer than the target are rejected instead of served late
+(as in CoDel). Requests are also rejected when the queue is full or after
+waiting ADMISSION_MAX_WAIT_MS. Shedding stops as soon as the delay falls
+back below target.
+
+Only ADMISSION_PATHS are limited; health (``/``), readiness (``/ready``),
+metrics and admin endpoints always go through.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from .metrics import count_admission, count_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = (
+    "/predict", "/predict/compact", "/predict/partial", "/predict/batch", "/predict/bulk",
+    "/explain", "/sensitivity",
+)
+SHED_REASONS = ("queue_full", "overloaded", "timeout")
+MAX_RETRY_AFTER = 30  # Seconds
+LOG_EVERY_SECONDS = 10  # Shedding can start and stop many times a second
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, delay-aware wait queue.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        target_delay_ms: float = 50,
+        interval_ms: float = 100,
+        max_wait_ms: float = 1000,
+        retry_after: int = 1,
+    ):
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be >= 1, got {max_concurrency}")
+        if max_queue < 0:
+            raise ValueError(f"max_queue must be >= 0, got {max_queue}")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.target = target_delay_ms / 1000
+        self.interval = interval_ms / 1000
+        self.max_wait = max_wait_ms / 1000
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._waiters: deque = deque()  # (arrival time, future), oldest first
+        self._loop_lag = 0.0
+        self._above_since: Optional[float] = None
+        self.overloaded = False
+        self._probe_task: Optional[asyncio.Task] = None
+        self.admitted = 0
+        self.shed = {reason: 0 for reason in SHED_REASONS}
+        self.max_delay_ms = 0.0
+        self.episodes = 0  # Times shedding started
+        self._logged_at = -LOG_EVERY_SECONDS
+
+    @classmethod
+    def from_env(cls) -> Optional["AdmissionController"]:
+        """Build a controller from ADMISSION_* settings.
+
+        Returns None when admission control is disabled (the default).
+        """
+        if os.getenv("ADMISSION_CONTROL", "0").lower() not in ("1", "true", "yes", "on"):
+            return None
+        concurrency = os.getenv("ADMISSION_MAX_CONCURRENCY")
+        return cls(
+            max_concurrency=int(concurrency) if concurrency else 2 * (os.cpu_count() or 1),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+            target_delay_ms=float(os.getenv("ADMISSION_TARGET_DELAY_MS", "50")),
+            interval_ms=float(os.getenv("ADMISSION_INTERVAL_MS", "100")),
+            max_wait_ms=float(os.getenv("ADMISSION_MAX_WAIT_MS", "1000")),
+            retry_after=int(os.getenv("ADMISSION_RETRY_AFTER", "1")),
+        )
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def queue_delay(self, now: Optional[float] = None) -> float:
+        """Current queueing delay in seconds (see module docstring)."""
+        now = time.monotonic() if now is None else now
+        head = now - self._waiters[0][0] if self._waiters else 0.0
+        return max(head, self._loop_lag)
+
+    def _update(self, now: float) -> bool:
+        """Re-evaluate overload: delay above target for a full interval."""
+        delay = self.queue_delay(now)
+        self.max_delay_ms = max(self.max_delay_ms, delay * 1000)
+        if delay <= self.target:
+            self._above_since = None
+            self.overloaded = False
+        elif self._above_since is None:
+            self._above_since = now
+        elif not self.overloaded and now - self._above_since >= self.interval:
+            self.overloaded = True
+            self.episodes += 1
+            if now - self._logged_at >= LOG_EVERY_SECONDS:
+                self._logged_at = now
+                logger.warning(
+                    f"⚠️ Load shedding: queueing delay {delay * 1000:.0f} ms above "
+                    f"{self.target * 1000:.0f} ms target for {self.interval * 1000:.0f} ms "
+                    f"({self.episodes} episodes, {sum(self.shed.values())} requests shed so far)"
+                )
+        return self.overloaded
+
+    def retry_after_seconds(self) -> int:
+        """Suggested Retry-After: the current delay, rounded up, at least retry_after."""
+        return min(MAX_RETRY_AFTER, max(self.retry_after, math.ceil(self.queue_delay())))
+
+    async def acquire(self) -> Optional[str]:
+        """Wait for a slot.
+
+        Returns:
+            None once admitted (call release() when done), otherwise the
+            reason the request was shed (one of SHED_REASONS)
+        """
+        now = time.monotonic()
+        if self._update(now):
+            return self._shed("overloaded")
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return self._shed("queue_full")
+
+        # Resolved by release(): None hands over a slot, a string sheds
+        entry = (now, asyncio.get_running_loop().create_future())
+        self._waiters.append(entry)
+        future = entry[1]
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return future.result()  # Resolved just as the wait timed out
+            self._waiters.remove(entry)
+            future.cancel()
+            return self._shed("timeout")
+        except asyncio.CancelledError:
+            # Client went away: give back a slot handed over meanwhile
+            if future.done() and not future.cancelled():
+                if future.result() is None:
+                    self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                future.cancel()
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one.
+
+        While overloaded, waiters queued longer than the target are shed
+        instead.
+        """
+        now = time.monotonic()
+        overloaded = self._update(now)
+        while self._waiters:
+            arrival, future = self._waiters.popleft()
+            if future.done():
+                continue
+            if overloaded and now - arrival > self.target:
+                future.set_result(self._shed("overloaded"))
+                continue
+            # in_flight stays the same: the slot changes hands
+            future.set_result(None)
+            self.admitted += 1
+            return
+        self.in_flight -= 1
+
+    def _shed(self, reason: str) -> str:
+        self.shed[reason] += 1
+        return reason
+
+    def start(self) -> None:
+        """Start the event-loop lag probe (call from the event loop)."""
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def _probe(self) -> None:
+        period = max(self.interval / 4, 0.005)
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(period)
+            now = time.monotonic()
+            self._loop_lag = max(0.0, now - start - period)
+            self._update(now)
+
+    async def close(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Limits, current load and admitted/shed counters."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "target_delay_ms": self.target * 1000,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queue_delay_ms": round(self.queue_delay() * 1000, 2),
+            "max_queue_delay_ms": round(self.max_delay_ms, 2),
+            "overloaded": self.overloaded,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+    def render_metrics(self):
+        """Prometheus gauges for the /metrics collector."""
+        stats = self.stats()
+        for name, help_text in (
+            ("in_flight", "Requests being served under admission control"),
+            ("queued", "Requests waiting for an admission slot"),
+            ("queue_delay_ms", "Current queueing delay in milliseconds"),
+        ):
+            yield f"# HELP pdd_admission_{name} {help_text}"
+            yield f"# TYPE pdd_admission_{name} gauge"
+            yield f"pdd_admission_{name} {stats[name]}"
+        yield "# HELP pdd_admission_overloaded Whether new requests are being shed"
+        yield "# TYPE pdd_admission_overloaded gauge"
+        yield f"pdd_admission_overloaded {int(stats['overloaded'])}"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to selected paths."""
+
+    def __init__(self, app, controller: AdmissionController, paths=DEFAULT_PATHS):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        reason = await self.controller.acquire()
+        if reason is not None:
+            count_admission("shed", reason)
+            count_request(scope["path"], 503)
+            await self._reject(send, reason)
+            return
+        count_admission("admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _reject(self, send, reason: str) -> None:
+        body = json.dumps({
+            "detail": "Server is overloaded. Please retry shortly.",
+            "reason": reason,
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.controller.retry_after_seconds()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,275 @@
+"""
+Native NumPy (.npz) model artifacts for fast, scikit-learn-free cold starts.
+
+Importing scikit-learn and unpickling the joblib files dominates cold start
+on small containers. The export step below writes the scaler mean/scale
+and the model coefficients (or, for random forests and gradient boosting,
+the flattened tree arrays) into a plain ``.npz`` file that can be served
+with NumPy alone. The joblib files remain the source of truth: the npz
+records their size/mtime and a digest, and is ignored if they change.
+Loading only re-hashes the joblib files when their size or mtime differ.
+
+The artifact also stores every array the compiled engine works from
+(folded weights and answer tables, int32 node arrays and transition
+tables) in its final dtype. They are memory-mapped straight out of the
+(uncompressed) npz file and adopted by the engine without a copy, so
+several worker processes serving the same artifact share one physical
+copy through the page cache. Artifacts without them are recompiled on
+load, into private memory.
+
+Usage (from backend/):
+    python -m app.artifact            # export models/psychiatric_model.npz
+"""
+
+import hashlib
+import logging
+import struct
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .engine import TREE_KINDS, LinearEngine, TreeEngine
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+MODELS_DIR = Path(__file__).parent.parent / "models"
+DEFAULT_JOBLIB_PATH = MODELS_DIR / "psychiatric_model.joblib"
+DEFAULT_NPZ_PATH = MODELS_DIR / "psychiatric_model.npz"
+
+
+def _source_paths(model_path: Path) -> Tuple[Path, Path]:
+    return model_path, model_path.parent / "scaler.joblib"
+
+
+def source_digest(model_path: Path) -> str:
+    """SHA-256 over the joblib model and scaler files an npz was exported from."""
+    digest = hashlib.sha256()
+    for path in _source_paths(model_path):
+        if path.exists():
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def source_stat(model_path: Path) -> np.ndarray:
+    """(size, mtime_ns) of the joblib model and scaler files; zeros for a missing file."""
+    stats = []
+    for path in _source_paths(model_path):
+        stat = path.stat() if path.exists() else None
+        stats.append((stat.st_size, stat.st_mtime_ns) if stat else (0, 0))
+    return np.array(stats, dtype=np.int64)
+
+
+def is_current(model_path: Path, digest: str, stat: Optional[np.ndarray] = None) -> bool:
+    """Whether an npz exported with (digest, stat) still matches the joblib files.
+
+    Compares size and mtime first and hashes the files only if they differ
+    (or the artifact predates recorded stats), as ml/dataset.py does.
+    """
+    if stat is not None and np.array_equal(stat, source_stat(model_path)):
+        return True
+    return digest == source_digest(model_path)
+
+
+def export_npz(model, scaler, output_path: Path, model_path: Optional[Path] = None) -> Path:
+    """Write a fitted scaler + linear model or tree ensemble to an npz artifact.
+
+    Args:
+        model: Fitted scikit-learn classifier
+        scaler: Fitted StandardScaler, or None
+        output_path: Destination ``.npz`` file
+        model_path: joblib file the model came from, recorded as a digest
+            so stale artifacts can be detected
+
+    Raises:
+        ValueError: If the model cannot be represented natively
+    """
+    digest = source_digest(model_path) if model_path else ""
+    stat = source_stat(model_path) if model_path else None
+    engine = LinearEngine.from_sklearn(model, scaler)
+    if engine is None:
+        trees = TreeEngine.from_sklearn(model, scaler)
+        if trees is None:
+            raise ValueError(f"{type(model).__name__} cannot be exported to a native artifact")
+        return write_tree_npz(output_path, trees, digest=digest, stat=stat)
+
+    extra = {}
+    # Scaler sample count and regularization let app.online resume training
+    n_seen = getattr(scaler, "n_samples_seen_", None)
+    if n_seen is not None:
+        extra["n_samples_seen"] = np.array(float(np.max(n_seen)))
+    if getattr(model, "C", None) is not None:
+        extra["C"] = np.array(float(model.C))
+
+    return write_linear_npz(
+        output_path,
+        coef=model.coef_,
+        intercept=model.intercept_,
+        classes=model.classes_,
+        multinomial=engine.multinomial,
+        mean=getattr(scaler, "mean_", None) if scaler is not None else None,
+        scale=getattr(scaler, "scale_", None) if scaler is not None else None,
+        digest=digest,
+        stat=stat,
+        extra=extra,
+    )
+
+
+def write_linear_npz(output_path: Path, coef, intercept, classes, multinomial: bool = True,
+                     mean=None, scale=None, digest: str = "", stat: Optional[np.ndarray] = None,
+                     extra: Optional[Dict[str, np.ndarray]] = None) -> Path:
+    """Write a linear artifact from raw arrays (scaled-space coef + scaler stats).
+
+    Args:
+        digest, stat: source_digest/source_stat of the joblib files, if any
+        extra: Additional arrays stored alongside (ignored by load_npz)
+    """
+    arrays = {
+        "artifact_version": np.array(ARTIFACT_VERSION),
+        "kind": np.array("linear"),
+        "coef": np.asarray(coef, dtype=float),
+        "intercept": np.asarray(intercept, dtype=float),
+        "classes": np.asarray(classes),
+        "multinomial": np.array(bool(multinomial)),
+        "source_digest": np.array(digest),
+    }
+    if stat is not None:
+        arrays["source_stat"] = np.asarray(stat, dtype=np.int64)
+    if mean is not None:
+        arrays["mean"] = np.asarray(mean, dtype=float)
+    if scale is not None:
+        arrays["scale"] = np.asarray(scale, dtype=float)
+    engine = LinearEngine(coef, intercept, classes, mean, scale, multinomial)
+    arrays.update(engine.compiled_arrays())
+    arrays.update(extra or {})
+
+    np.savez(output_path, **arrays)
+    logger.info(f"Exported native artifact to {output_path}")
+    return output_path
+
+
+def write_tree_npz(output_path: Path, engine: TreeEngine, digest: str = "",
+                   stat: Optional[np.ndarray] = None) -> Path:
+    """Write a compiled tree ensemble (see app.engine.TreeEngine)."""
+    extra = {"source_stat": np.asarray(stat, dtype=np.int64)} if stat is not None else {}
+    np.savez(
+        output_path,
+        artifact_version=np.array(ARTIFACT_VERSION),
+        kind=np.array(engine.kind),
+        classes=engine.classes,
+        source_digest=np.array(digest),
+        **engine.compiled_arrays(),
+        **extra,
+    )
+    logger.info(f"Exported native artifact to {output_path}")
+    return output_path
+
+
+def read_npz(path: Path, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """Read every array of an npz file, memory-mapping them when possible.
+
+    ``np.load`` ignores ``mmap_mode`` for npz archives, but ``np.savez``
+    stores members uncompressed, so each non-scalar array can be mapped
+    directly at its offset inside the zip file. Compressed members and
+    scalars are read into memory as usual.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+
+            # Skip the zip local file header to reach the .npy payload
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_len, extra_len = struct.unpack("<HH", local_header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"Array {name!r} in {path} holds Python objects")
+
+            if not shape or 0 in shape:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                    order="F" if fortran_order else "C",
+                )
+    return arrays
+
+
+def _stat(data: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+    stat = data.get("source_stat")
+    return np.asarray(stat) if stat is not None else None
+
+
+def load_npz(path: Path, mmap: bool = True) -> Tuple[Union[LinearEngine, TreeEngine], str, Optional[np.ndarray]]:
+    """Load an npz artifact into a compiled engine without importing scikit-learn.
+
+    Returns:
+        Tuple of (engine, source_digest, source_stat); source_stat is None
+        for artifacts exported before it was recorded
+
+    Raises:
+        ValueError: If the artifact is of an unknown kind or version
+    """
+    data = read_npz(path, mmap=mmap)
+    version = int(data["artifact_version"])
+    if version != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported artifact version {version}")
+    kind = str(data["kind"])
+    if kind in TREE_KINDS:
+        if "step4" in data:
+            return TreeEngine.from_compiled(data, data["classes"], kind), str(data["source_digest"]), _stat(data)
+        engine = TreeEngine(
+            data["feature"], data["threshold"], data["left"], data["right"], data["value"],
+            data["roots"], data["classes"], kind=kind, init=data["init"],
+            mean=data["mean"], scale=data["scale"],
+        )
+        return engine, str(data["source_digest"]), _stat(data)
+    if kind != "linear":
+        raise ValueError(f"Unsupported artifact kind {kind!r}")
+    if "table" in data:
+        engine = LinearEngine.from_compiled(data, data["classes"], multinomial=bool(data["multinomial"]))
+        return engine, str(data["source_digest"]), _stat(data)
+    engine = LinearEngine(
+        data["coef"],
+        data["intercept"],
+        data["classes"],
+        data.get("mean"),
+        data.get("scale"),
+        multinomial=bool(data["multinomial"]),
+    )
+    return engine, str(data["source_digest"]), _stat(data)
+
+
+def main() -> None:
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export the joblib model to a native .npz artifact.")
+    parser.add_argument("--model", type=Path, default=DEFAULT_JOBLIB_PATH, help="Path to psychiatric_model.joblib")
+    parser.add_argument("--output", type=Path, default=None, help="Output .npz (default: next to the model)")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    scaler_path = args.model.parent / "scaler.joblib"
+    scaler = joblib.load(scaler_path) if scaler_path.exists() else None
+    output = args.output or args.model.with_suffix(".npz")
+    export_npz(model, scaler, output, model_path=args.model)
+    print(f"✅ {output}")
+
+
+if __name__ == "__main__":
+    main()
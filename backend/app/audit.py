@@ -0,0 +1,589 @@
+"""
+Buffered, append-only audit log of screening results.
+
+Every prediction is recorded as a fixed-size binary record: timestamp,
+packed answers (see app.cache), source endpoint, predicted class and class
+probabilities, in a segment file that names the model version. Request
+handlers only copy the record into a preallocated in-memory ring buffer; a
+background task writes the buffer out every AUDIT_FLUSH_INTERVAL_MS, or
+sooner once it is half full, so requests do not wait for the disk.
+
+Flush policies (AUDIT_FLUSH):
+- ``batch``: write in the background; fsync when a segment is closed
+- ``sync``: each request waits until its record is written and fsynced;
+  concurrent requests share one write and fsync
+
+Backpressure (AUDIT_BACKPRESSURE) when the disk falls behind and the ring
+is full:
+- ``block``: the request writes out the buffer itself before it is
+  answered, so a slow disk slows clients down instead of losing records
+  (a failing disk fails the request)
+- ``drop``: the record is discarded and counted in pdd_audit_dropped_total
+
+Segments are named ``audit-<UTC time>-<n>.bin`` in AUDIT_DIR. Each starts
+with a JSON header (model version, class labels, record layout) followed by
+packed records. A new segment is started when the model version changes or
+the current one reaches AUDIT_MAX_BYTES or AUDIT_MAX_SECONDS. A record cut
+short by a crash is ignored by the reader.
+
+Usage (from backend/):
+    python -m app.audit dump audit/ > audit.ndjson
+    python -m app.audit stats audit/
+    python -m app.audit replay audit/ --model models/psychiatric_model.joblib
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .cache import pack_rows, unpack_rows
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PDDAUDIT"
+FORMAT_VERSION = 1
+SOURCES = ("predict", "predict_compact", "predict_batch", "predict_bulk", "explain", "sensitivity")
+FLUSH_POLICIES = ("batch", "sync")
+BACKPRESSURE_POLICIES = ("block", "drop")
+DEFAULT_AUDIT_DIR = Path(__file__).parent.parent / "audit"
+SEGMENT_PATTERN = "audit-*.bin"
+
+_HEADER_LENGTH = struct.Struct("<I")
+_SOURCE_IDS = {name: i for i, name in enumerate(SOURCES)}
+
+
+def record_dtype(n_classes: int) -> np.dtype:
+    """On-disk record layout (little-endian, unaligned)."""
+    return np.dtype([
+        ("time_us", "<i8"),  # Unix time in microseconds
+        ("answers", "<u8"),  # 30 answers, 2 bits each (app.cache.pack_answers)
+        ("source", "u1"),  # Index into SOURCES
+        ("prediction", "u1"),
+        ("probabilities", "<f4", (n_classes,)),
+    ])
+
+
+class _Segment:
+    """One open, append-only log file."""
+
+    def __init__(self, path: Path, version: str, file):
+        self.path = path
+        self.version = version
+        self.file = file
+        self.opened = time.monotonic()
+        self.size = file.tell()
+
+    @classmethod
+    def create(cls, directory: Path, version: str, header: Dict[str, Any]) -> "_Segment":
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        payload = json.dumps({**header, "model_version": version, "created": _iso_now()}).encode()
+        for n in range(10000):
+            path = directory / f"audit-{stamp}-{n:04d}.bin"
+            try:
+                file = open(path, "xb")
+            except FileExistsError:
+                continue
+            file.write(MAGIC + _HEADER_LENGTH.pack(len(payload)) + payload)
+            return cls(path, version, file)
+        raise OSError(f"Could not create a new audit segment in {directory}")
+
+    def write(self, records: np.ndarray) -> None:
+        self.file.write(records.tobytes())
+        self.file.flush()
+        self.size += records.nbytes
+
+    def sync(self) -> None:
+        os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        self.file.flush()
+        self.sync()
+        self.file.close()
+
+
+def _iso_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class AuditLog:
+    """Ring-buffered audit log with a background writer.
+
+    The async record methods must be called from the event loop;
+    record_batch_blocking is for worker threads (e.g. the bulk endpoint).
+    """
+
+    def __init__(
+        self,
+        manager,
+        class_labels: Sequence[str],
+        directory: Path = DEFAULT_AUDIT_DIR,
+        capacity: int = 65536,
+        flush: str = "batch",
+        backpressure: str = "block",
+        interval_ms: float = 200,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_seconds: float = 3600,
+    ):
+        if flush not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown audit flush policy {flush!r}, expected one of {', '.join(FLUSH_POLICIES)}")
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                f"Unknown audit backpressure policy {backpressure!r}, "
+                f"expected one of {', '.join(BACKPRESSURE_POLICIES)}"
+            )
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.manager = manager
+        self.class_labels = list(class_labels)
+        self.n_classes = len(self.class_labels)
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.flush_policy = flush
+        self.backpressure = backpressure
+        self.interval = interval_ms / 1000
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.dtype = record_dtype(self.n_classes)
+        self._header = {
+            "format": FORMAT_VERSION,
+            "n_classes": self.n_classes,
+            "class_labels": self.class_labels,
+            "sources": list(SOURCES),
+            "record_size": self.dtype.itemsize,
+        }
+
+        # Ring buffer columns; record seq lives in slot seq % capacity
+        self._time = np.zeros(capacity, dtype=np.int64)
+        self._answers = np.zeros(capacity, dtype=np.uint64)
+        self._source = np.zeros(capacity, dtype=np.uint8)
+        self._prediction = np.zeros(capacity, dtype=np.uint8)
+        self._probabilities = np.zeros((capacity, self.n_classes), dtype=np.float32)
+        self._version = np.zeros(capacity, dtype=np.uint16)  # Index into _versions
+        self._versions: List[str] = []
+        self._version_ids: Dict[str, int] = {}
+        self._head = 0  # Records appended
+        self._tail = 0  # Records written to disk
+        self._lock = threading.Lock()  # Ring indices and contents
+        self._write_lock = threading.Lock()  # Segment file
+
+        self._segment: Optional[_Segment] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.dropped = 0
+        self.blocked = 0
+        self.flushes = 0
+        self.errors = 0
+        self.bytes_written = 0
+
+    @classmethod
+    def from_env(cls, manager, class_labels: Sequence[str]) -> Optional["AuditLog"]:
+        """Build an audit log from AUDIT_* settings.
+
+        Returns None when auditing is disabled (AUDIT_LOG=0, the default).
+        """
+        if os.getenv("AUDIT_LOG", "0").lower() not in ("1", "true", "yes", "on"):
+            return None
+        directory = os.getenv("AUDIT_DIR")
+        return cls(
+            manager,
+            class_labels,
+            directory=Path(directory) if directory else DEFAULT_AUDIT_DIR,
+            capacity=int(os.getenv("AUDIT_BUFFER_SIZE", "65536")),
+            flush=os.getenv("AUDIT_FLUSH", "batch").lower(),
+            backpressure=os.getenv("AUDIT_BACKPRESSURE", "block").lower(),
+            interval_ms=float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200")),
+            max_bytes=int(os.getenv("AUDIT_MAX_BYTES", str(64 * 1024 * 1024))),
+            max_seconds=float(os.getenv("AUDIT_MAX_SECONDS", "3600")),
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._head - self._tail
+
+    @property
+    def records(self) -> int:
+        return self._head
+
+    def _model_version(self) -> int:
+        """Id of the served model version (registry version or artifact name)."""
+        version = self.manager.version
+        if version is None:
+            model_path = self.manager.model_path
+            version = model_path.name if model_path is not None else "unknown"
+        version_id = self._version_ids.get(version)
+        if version_id is None:
+            with self._lock:
+                version_id = self._version_ids.setdefault(version, len(self._versions))
+                if version_id == len(self._versions):
+                    self._versions.append(version)
+        return version_id
+
+    def _put(self, keys, predictions, probabilities, source: int) -> Optional[int]:
+        """Copy records into the ring.
+
+        Returns:
+            Sequence number after the last record, or None if they do not fit
+        """
+        n = len(keys)
+        version_id = self._model_version()
+        timestamp = time.time_ns() // 1000
+        with self._lock:
+            start = self._head
+            if start + n - self._tail > self.capacity:
+                return None
+            first = start % self.capacity
+            slots = slice(first, first + n) if first + n <= self.capacity else np.arange(start, start + n) % self.capacity
+            self._time[slots] = timestamp
+            self._answers[slots] = keys
+            self._source[slots] = source
+            self._prediction[slots] = predictions
+            self._probabilities[slots] = probabilities
+            self._version[slots] = version_id
+            self._head = start + n
+        return start + n
+
+    def _put_one(self, key: int, prediction: int, probabilities: list, source: int) -> Optional[int]:
+        """_put for a single record, without building arrays."""
+        version_id = self._model_version()
+        timestamp = time.time_ns() // 1000
+        with self._lock:
+            seq = self._head
+            if seq - self._tail >= self.capacity:
+                return None
+            slot = seq % self.capacity
+            self._time[slot] = timestamp
+            self._answers[slot] = key
+            self._source[slot] = source
+            self._prediction[slot] = prediction
+            self._probabilities[slot] = probabilities
+            self._version[slot] = version_id
+            self._head = seq + 1
+        return seq + 1
+
+    def _row_probabilities(self, prediction: int, probabilities: Union[Dict[str, float], Sequence[float]]) -> list:
+        values = list(probabilities.values()) if isinstance(probabilities, dict) else list(probabilities)
+        if len(values) != self.n_classes:
+            # Models without predict_proba report only the predicted class
+            values = [0.0] * self.n_classes
+            values[prediction] = 1.0
+        return values
+
+    async def record(self, key: int, prediction: int, probabilities, source: str) -> None:
+        """Record one screening result.
+
+        Args:
+            key: Packed answers (app.cache.pack_answers / pack_array)
+            prediction: Predicted class id
+            probabilities: Class probabilities, as a class-ordered dict or sequence
+            source: Endpoint name, one of SOURCES
+        """
+        values = self._row_probabilities(prediction, probabilities)
+        seq = self._put_one(key, prediction, values, _SOURCE_IDS[source])
+        if seq is None:
+            # Ring full: apply the backpressure policy
+            await self.record_batch(np.array([key], dtype=np.uint64), [prediction], [values], source)
+        elif self.flush_policy == "sync":
+            await asyncio.to_thread(self.flush, seq)
+        elif self.pending * 2 >= self.capacity and self._wake is not None:
+            self._wake.set()
+
+    async def record_batch(self, keys: np.ndarray, predictions, probabilities, source: str) -> None:
+        """Record N screening results (keys from app.cache.pack_rows)."""
+        for start in range(0, len(keys), self.capacity):
+            end = start + self.capacity
+            args = (keys[start:end], predictions[start:end], probabilities[start:end], _SOURCE_IDS[source])
+            seq = self._put(*args)
+            if seq is None and self.backpressure == "block":
+                self.blocked += 1
+            while seq is None:
+                if self.backpressure == "drop":
+                    self._drop(len(args[0]))
+                    break
+                await asyncio.to_thread(self.flush)
+                seq = self._put(*args)
+            if seq is None:
+                continue
+            if self.flush_policy == "sync":
+                await asyncio.to_thread(self.flush, seq)
+            elif self.pending * 2 >= self.capacity and self._wake is not None:
+                self._wake.set()
+
+    def record_batch_blocking(self, X: np.ndarray, predictions, probabilities, source: str) -> None:
+        """record_batch for worker threads; takes raw (N, 30) answers."""
+        keys = pack_rows(X).astype(np.uint64)
+        for start in range(0, len(keys), self.capacity):
+            end = start + self.capacity
+            args = (keys[start:end], predictions[start:end], probabilities[start:end], _SOURCE_IDS[source])
+            seq = self._put(*args)
+            if seq is None and self.backpressure == "block":
+                self.blocked += 1
+            while seq is None:
+                if self.backpressure == "drop":
+                    self._drop(len(args[0]))
+                    break
+                self.flush()
+                seq = self._put(*args)
+            if seq is not None and self.flush_policy == "sync":
+                self.flush(seq)
+
+    def _drop(self, n: int) -> None:
+        if self.dropped == 0 or (self.dropped + n) // 1000 > self.dropped // 1000:
+            logger.warning(f"⚠️ Audit buffer full: {self.dropped + n} records dropped so far")
+        self.dropped += n
+
+    def flush(self, upto: Optional[int] = None) -> None:
+        """Write buffered records to disk (blocking; call it off the event loop).
+
+        Args:
+            upto: Return as soon as records before this sequence number are
+                written (sync policy). None writes everything buffered.
+
+        Raises:
+            OSError: If writing fails; unwritten records stay buffered
+        """
+        with self._write_lock:
+            if upto is not None and self._tail >= upto:
+                return  # Written by a concurrent flush
+            with self._lock:
+                start, end = self._tail, self._head
+                if end > start:
+                    slots = np.arange(start, end) % self.capacity
+                    records = np.empty(end - start, dtype=self.dtype)
+                    records["time_us"] = self._time[slots]
+                    records["answers"] = self._answers[slots]
+                    records["source"] = self._source[slots]
+                    records["prediction"] = self._prediction[slots]
+                    records["probabilities"] = self._probabilities[slots]
+                    versions = self._version[slots]
+            if end == start:
+                self._rotate_if_due()
+                return
+
+            # One run of records per model version, in order
+            cuts = np.flatnonzero(np.diff(versions)) + 1
+            written = start
+            try:
+                for run, run_versions in zip(np.split(records, cuts), np.split(versions, cuts)):
+                    segment = self._segment_for(self._versions[run_versions[0]])
+                    segment.write(run)
+                    if self.flush_policy == "sync":
+                        segment.sync()
+                    written += len(run)
+                    self.bytes_written += run.nbytes
+                    with self._lock:
+                        self._tail = written
+            except OSError as e:
+                self.errors += 1
+                logger.error(f"❌ Audit log write failed ({end - written} records still buffered): {e}")
+                raise
+            self.flushes += 1
+
+    def _rotate_if_due(self, version: Optional[str] = None) -> None:
+        segment = self._segment
+        if segment is None:
+            return
+        if (
+            (version is not None and segment.version != version)
+            or segment.size >= self.max_bytes
+            or time.monotonic() - segment.opened >= self.max_seconds
+        ):
+            self._segment = None
+            segment.close()
+
+    def _segment_for(self, version: str) -> _Segment:
+        self._rotate_if_due(version)
+        if self._segment is None:
+            self._segment = _Segment.create(self.directory, version, self._header)
+            logger.info(f"📝 Audit log segment {self._segment.path}")
+        return self._segment
+
+    def start(self) -> None:
+        """Start the background writer (call from the event loop)."""
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except OSError:
+                pass  # Logged by flush; retried on the next tick
+
+    async def close(self) -> None:
+        """Stop the writer, write what is buffered and close the segment."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._write_lock:
+                if self._segment is not None:
+                    self._segment.close()
+                    self._segment = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "written": self._tail,
+            "pending": self.pending,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "bytes_written": self.bytes_written,
+        }
+
+    def render_metrics(self):
+        """Prometheus lines for the /metrics collector."""
+        stats = self.stats()
+        for name, help_text in (
+            ("records", "Screening results accepted into the audit buffer"),
+            ("written", "Audit records written to disk"),
+            ("dropped", "Audit records dropped because the buffer was full"),
+            ("blocked", "Requests that waited for the audit writer (backpressure)"),
+            ("errors", "Failed audit log writes"),
+            ("bytes_written", "Bytes of audit records written"),
+        ):
+            yield f"# HELP pdd_audit_{name}_total {help_text}"
+            yield f"# TYPE pdd_audit_{name}_total counter"
+            yield f"pdd_audit_{name}_total {stats[name]}"
+        yield "# HELP pdd_audit_pending Audit records buffered in memory"
+        yield "# TYPE pdd_audit_pending gauge"
+        yield f"pdd_audit_pending {stats['pending']}"
+
+
+def segment_paths(path: Path) -> List[Path]:
+    """Segment files under path (a segment or a directory), oldest first."""
+    path = Path(path)
+    return sorted(path.glob(SEGMENT_PATTERN)) if path.is_dir() else [path]
+
+
+def read_segment(path: Path) -> Tuple[Dict[str, Any], np.ndarray]:
+    """Header and memory-mapped records of one segment.
+
+    Raises:
+        ValueError: If the file is not an audit segment
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an audit log segment")
+        (length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+        header = json.loads(f.read(length))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported audit format {header.get('format')}")
+    dtype = record_dtype(header["n_classes"])
+    offset = len(MAGIC) + _HEADER_LENGTH.size + length
+    # A trailing partial record (crash mid-write) is ignored
+    count = (Path(path).stat().st_size - offset) // dtype.itemsize
+    if count == 0:
+        return header, np.empty(0, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+
+def iter_segments(path: Path) -> Iterator[Tuple[Path, Dict[str, Any], np.ndarray]]:
+    for segment in segment_paths(path):
+        header, records = read_segment(segment)
+        yield segment, header, records
+
+
+def _dump(path: Path, out) -> int:
+    count = 0
+    for _, header, records in iter_segments(path):
+        labels = [label.lower() for label in header["class_labels"]]
+        answers = unpack_rows(records["answers"])
+        for record, row in zip(records, answers.tolist()):
+            out.write(json.dumps({
+                "time": datetime.fromtimestamp(int(record["time_us"]) / 1e6, timezone.utc).isoformat(),
+                "model_version": header["model_version"],
+                "source": header["sources"][record["source"]],
+                "answers": row,
+                "prediction": header["class_labels"][record["prediction"]],
+                "severity_level": int(record["prediction"]),
+                "probabilities": {k: round(float(p), 6) for k, p in zip(labels, record["probabilities"])},
+            }) + "\n")
+            count += 1
+    return count
+
+
+def _replay(path: Path, model_path: Optional[Path], chunk_size: int = 10000) -> None:
+    from .model import ModelManager
+
+    manager = ModelManager(cache_size=0)
+    if not manager.load(model_path):
+        raise SystemExit(f"❌ Could not load model from {model_path or 'the default location'}")
+    total = changed = 0
+    max_delta = 0.0
+    for segment, header, records in iter_segments(path):
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            classes, _, probabilities = manager.predict_batch(unpack_rows(chunk["answers"]).astype(float))
+            changed += int((classes != chunk["prediction"]).sum())
+            if probabilities.shape[1] == header["n_classes"] and len(chunk):
+                max_delta = max(max_delta, float(np.abs(probabilities - chunk["probabilities"]).max()))
+            total += len(chunk)
+        print(f"   {segment.name}: {len(records):,} records (model {header['model_version']})")
+    agreement = 1 - changed / total if total else 1.0
+    print(f"🔁 Replayed {total:,} records: {changed:,} predictions differ "
+          f"({agreement:.2%} agree), max probability change {max_delta:.4f}")
+
+
+def main() -> None:
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Read the prediction audit log.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dump = commands.add_parser("dump", help="Print records as NDJSON")
+    stats = commands.add_parser("stats", help="Summarize segments")
+    replay = commands.add_parser("replay", help="Re-score logged answers and compare the predictions")
+    replay.add_argument("--model", type=Path, default=None, help="Model to replay with (default: backend/models)")
+    for command in (dump, stats, replay):
+        command.add_argument("path", type=Path, help="Audit directory or segment file")
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        _dump(args.path, sys.stdout)
+    elif args.command == "replay":
+        _replay(args.path, args.model)
+    else:
+        total = 0
+        for segment, header, records in iter_segments(args.path):
+            total += len(records)
+            if len(records):
+                first, last = (
+                    datetime.fromtimestamp(int(t) / 1e6, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                    for t in (records["time_us"][0], records["time_us"][-1])
+                )
+                span = f"{first} - {last}"
+            else:
+                span = "empty"
+            counts = np.bincount(records["prediction"], minlength=header["n_classes"])
+            print(f"{segment.name}  model {header['model_version']:<24} {len(records):>9,} records  {span}  "
+                  f"classes {counts.tolist()}")
+        print(f"📝 {total:,} records")
+
+
+if __name__ == "__main__":
+    main()
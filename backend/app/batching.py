@@ -0,0 +1,150 @@
+"""
+Asyncio micro-batching for /predict.
+
+Concurrent requests are queued for a short window (or until the batch is
+full) and scored together with one vectorized ModelManager.predict_batch
+call; each caller's future is then resolved with its own row.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Prediction = Tuple[int, float, Dict[str, float]]
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into batches.
+
+    Must be used from a single event loop. Cached answers are returned
+    immediately without joining a batch.
+    """
+
+    def __init__(self, manager, max_batch_size: int = 64, window_ms: float = 2.0, executor=None):
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be >= 1, got {max_batch_size}")
+        if window_ms < 0:
+            raise ValueError(f"window_ms must be >= 0, got {window_ms}")
+        self.manager = manager
+        self.executor = executor  # Optional InferenceExecutor; inline when None
+        self._tasks = set()
+        self.max_batch_size = max_batch_size
+        self.window_ms = window_ms
+        self._pending: List[Tuple[list, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+    @classmethod
+    def from_env(cls, manager, executor=None) -> Optional["MicroBatcher"]:
+        """Build a batcher from BATCH_COALESCE / BATCH_MAX_SIZE / BATCH_WINDOW_MS.
+
+        Returns None when coalescing is disabled (the default).
+        """
+        if os.getenv("BATCH_COALESCE", "0").lower() not in ("1", "true", "yes", "on"):
+            return None
+        return cls(
+            manager,
+            max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "64")),
+            window_ms=float(os.getenv("BATCH_WINDOW_MS", "2")),
+            executor=executor,
+        )
+
+    async def submit(self, features: list) -> Prediction:
+        """Queue one feature vector and wait for its prediction.
+
+        Raises:
+            ValueError: If features are invalid (checked before queueing,
+                so a bad row cannot fail the rest of its batch)
+        """
+        self.manager.validate_features(features)
+        cached = self.manager.get_cached(features, timed=True)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """Score everything queued so far as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        self.batches += 1
+        self.rows += len(pending)
+        self.largest_batch = max(self.largest_batch, len(pending))
+
+        # Results scored by a model swapped out meanwhile are not cached
+        generation = self.manager.cache.generation
+        if self.executor is None or self.executor.mode == "inline":
+            try:
+                outputs = self.manager.predict_batch(np.array([features for features, _ in pending]))
+            except Exception as e:
+                self._fail(pending, e)
+                return
+            self._resolve(pending, outputs, generation)
+        else:
+            task = asyncio.get_running_loop().create_task(self._run(pending, generation))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: List[Tuple[list, asyncio.Future]], generation: int) -> None:
+        """Score a batch through the executor and resolve its futures."""
+        try:
+            outputs = await self.executor.predict_batch(np.array([features for features, _ in pending]))
+        except Exception as e:
+            self._fail(pending, e)
+            return
+        self._resolve(pending, outputs, generation)
+
+    @staticmethod
+    def _fail(pending, error: Exception) -> None:
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def _resolve(self, pending, outputs, generation: int) -> None:
+        classes, confidences, probabilities = outputs
+        for i, (features, future) in enumerate(pending):
+            result = (
+                int(classes[i]),
+                float(confidences[i]),
+                self.manager.probabilities_to_dict(probabilities[i]),
+            )
+            self.manager.put_cached(features, result, generation)
+            # The caller may have disconnected and cancelled its future
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Flush queued requests and wait for in-flight batches."""
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, float]:
+        """Batch counters and configuration."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window_ms,
+            "batches": self.batches,
+            "rows": self.rows,
+            "largest_batch": self.largest_batch,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,222 @@
+"""
+Incremental parsing and chunked scoring for bulk uploads.
+
+Uploads are read one line at a time and scored in fixed-size chunks, so
+memory use stays flat regardless of file size. Supported formats:
+
+- ``ndjson``: one JSON object (q1-q30 or Q#A keys) or 30-element array per line
+- ``csv`` / ``tsv``: header row naming q1-q30 or the model's Q#A columns
+  (e.g. the raw DASS export), one respondent per row
+"""
+
+import csv
+import io
+import json
+import logging
+from typing import IO, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 30
+BULK_FORMATS = ("ndjson", "csv", "tsv")
+
+# Parsed row: (row_number, features) on success, (row_number, error) on failure
+ParsedRow = Tuple[int, Union[List[int], str]]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Guess the upload format from its filename or content type."""
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "ndjson"
+    if name.endswith((".tsv", ".tab")) or "tab-separated" in ctype:
+        return "tsv"
+    return "csv"
+
+
+def _column_aliases(feature_names: Sequence[str]) -> dict:
+    """Map lowercase column names (q1-q30 and Q#A) to feature positions."""
+    aliases = {f"q{i + 1}": i for i in range(N_FEATURES)}
+    for i, name in enumerate(feature_names[:N_FEATURES]):
+        aliases[name.lower()] = i
+    return aliases
+
+
+def _parse_answer(value) -> int:
+    """Parse one answer value, raising ValueError if it is not an integer 1-4."""
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            raise ValueError(f"invalid answer {value!r}")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not float(value).is_integer():
+        raise ValueError(f"invalid answer {value!r}")
+    answer = int(value)
+    if answer < 1 or answer > 4:
+        raise ValueError(f"answer must be between 1 and 4, got {answer}")
+    return answer
+
+
+def _numbered(lines) -> Iterator[Tuple[int, object, Optional[str]]]:
+    """Number lines from 1 as (row_number, line, read_error).
+
+    A malformed CSV field (e.g. one over the field size limit) surfaces
+    while reading, not while parsing a row. It is reported once for the
+    row where it happened and ends the upload, since the reader cannot
+    resynchronize after it.
+    """
+    iterator = iter(lines)
+    row_number = 0
+    while True:
+        row_number += 1
+        try:
+            line = next(iterator)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield row_number, None, f"unreadable row ({e}); rows from here on were not read"
+            return
+        yield row_number, line, None
+
+
+class TabularRowReader:
+    """Incremental reader for CSV/TSV uploads with a header row."""
+
+    def __init__(self, text: IO[str], delimiter: str, feature_names: Sequence[str]):
+        self._reader = csv.reader(text, delimiter=delimiter)
+        try:
+            header = next(self._reader)
+        except StopIteration:
+            raise ValueError("Upload is empty")
+        except csv.Error as e:
+            raise ValueError(f"Unreadable header: {e}")
+
+        aliases = _column_aliases(feature_names)
+        positions = {}
+        for col, name in enumerate(header):
+            feature = aliases.get(name.strip().lower())
+            if feature is not None and feature not in positions:
+                positions[feature] = col
+        missing = [i for i in range(N_FEATURES) if i not in positions]
+        if missing:
+            raise ValueError(
+                f"Header is missing {len(missing)} of {N_FEATURES} answer columns "
+                f"(expected q1-q30 or {', '.join(feature_names[:3])}, ...)"
+            )
+        self._columns = [positions[i] for i in range(N_FEATURES)]
+        self._width = max(self._columns) + 1
+
+    def __iter__(self) -> Iterator[ParsedRow]:
+        for row_number, row, error in _numbered(self._reader):
+            if error is not None:
+                yield row_number, error
+                return
+            if not row:
+                continue
+            if len(row) < self._width:
+                yield row_number, f"expected at least {self._width} columns, got {len(row)}"
+                continue
+            try:
+                yield row_number, [_parse_answer(row[col]) for col in self._columns]
+            except ValueError as e:
+                yield row_number, str(e)
+
+
+class NdjsonRowReader:
+    """Incremental reader for newline-delimited JSON uploads."""
+
+    def __init__(self, text: IO[str], feature_names: Sequence[str]):
+        self._text = text
+        self._aliases = _column_aliases(feature_names)
+
+    def _features(self, record) -> List[int]:
+        if isinstance(record, list):
+            if len(record) != N_FEATURES:
+                raise ValueError(f"expected {N_FEATURES} answers, got {len(record)}")
+            return [_parse_answer(v) for v in record]
+        if isinstance(record, dict):
+            features = [None] * N_FEATURES
+            for key, value in record.items():
+                feature = self._aliases.get(str(key).lower())
+                if feature is not None:
+                    features[feature] = _parse_answer(value)
+            missing = [f"q{i + 1}" for i, v in enumerate(features) if v is None]
+            if missing:
+                raise ValueError(f"missing answers: {', '.join(missing)}")
+            return features
+        raise ValueError("each line must be a JSON object or array")
+
+    def __iter__(self) -> Iterator[ParsedRow]:
+        for row_number, line, error in _numbered(self._text):
+            if error is not None:
+                yield row_number, error
+                return
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield row_number, self._features(json.loads(line))
+            except json.JSONDecodeError as e:
+                yield row_number, f"invalid JSON: {e.msg}"
+            except ValueError as e:
+                yield row_number, str(e)
+
+
+def open_reader(stream: IO[bytes], fmt: str, feature_names: Sequence[str]):
+    """Create a row reader over a binary stream.
+
+    Raises:
+        ValueError: If the format is unknown or the header is unusable
+    """
+    if fmt not in BULK_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(BULK_FORMATS)}")
+    # Invalid UTF-8 becomes U+FFFD, which fails validation of that row only
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    if fmt == "ndjson":
+        return NdjsonRowReader(text, feature_names)
+    return TabularRowReader(text, "\t" if fmt == "tsv" else ",", feature_names)
+
+
+def score_rows(rows, model_manager, chunk_size: int, observe=None) -> Iterator[str]:
+    """Score parsed rows in fixed-size chunks, yielding one NDJSON line per row.
+
+    Output lines preserve input order; invalid rows produce ``{"row", "error"}``.
+    ``observe(X, classes, confidences, probabilities)``, if given, is called
+    for each scored chunk.
+    """
+    chunk: List[ParsedRow] = []
+
+    def flush() -> Iterator[str]:
+        valid = [(n, f) for n, f in chunk if not isinstance(f, str)]
+        scored = {}
+        if valid:
+            X = np.array([f for _, f in valid])
+            classes, confidences, probabilities = model_manager.predict_batch(X)
+            if observe is not None:
+                observe(X, classes, confidences, probabilities)
+            for (n, _), class_id, confidence, row_probs in zip(
+                valid, classes.tolist(), confidences.tolist(), probabilities
+            ):
+                scored[n] = {
+                    "row": n,
+                    "prediction": model_manager.get_class_label(class_id),
+                    "severity_level": class_id,
+                    "confidence": round(confidence, 4),
+                    "probabilities": {
+                        k: round(v, 4) for k, v in model_manager.probabilities_to_dict(row_probs).items()
+                    },
+                }
+        for n, features in chunk:
+            record = {"row": n, "error": features} if isinstance(features, str) else scored[n]
+            yield json.dumps(record) + "\n"
+
+    for parsed in rows:
+        chunk.append(parsed)
+        if len(chunk) >= chunk_size:
+            yield from flush()
+            chunk = []
+    if chunk:
+        yield from flush()
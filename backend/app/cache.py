@@ -0,0 +1,149 @@
+"""
+Bounded LRU cache for predictions keyed on packed questionnaire answers.
+
+A questionnaire is 30 answers of 1-4, i.e. 2 bits each, so every valid
+request packs into a single 60-bit integer that makes a cheap dict key.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+BITS_PER_ANSWER = 2
+
+# Place value of each answer in the packed key (fits in int64 for 30 answers)
+_PACK_WEIGHTS = np.left_shift(1, BITS_PER_ANSWER * np.arange(30, dtype=np.int64))
+
+
+def pack_answers(features: Sequence) -> Optional[int]:
+    """Pack 30 integer answers (1-4) into a single integer key.
+
+    Args:
+        features: Sequence of answer values
+
+    Returns:
+        Packed key, or None if any value is not an integer between 1 and 4
+        (such inputs are never cached).
+    """
+    key = 0
+    for i, val in enumerate(features):
+        if isinstance(val, float):
+            if not val.is_integer():
+                return None
+            val = int(val)
+        elif not isinstance(val, int):
+            return None
+        if val < 1 or val > 4:
+            return None
+        key |= (val - 1) << (BITS_PER_ANSWER * i)
+    return key
+
+
+def pack_array(answers: np.ndarray) -> int:
+    """Vectorized pack_answers for an already validated integer array of 30 answers."""
+    return int(np.dot(answers - 1, _PACK_WEIGHTS))
+
+
+def pack_rows(X: np.ndarray) -> np.ndarray:
+    """pack_array for every row of a validated (N, 30) answer array."""
+    return (np.asarray(X, dtype=np.int64) - 1) @ _PACK_WEIGHTS
+
+
+def unpack_answers(key: int, n_features: int = 30) -> list:
+    """Inverse of pack_answers."""
+    return [((key >> (BITS_PER_ANSWER * i)) & 0b11) + 1 for i in range(n_features)]
+
+
+def unpack_rows(keys: np.ndarray, n_features: int = 30) -> np.ndarray:
+    """Inverse of pack_rows: (N,) keys to an (N, n_features) answer array."""
+    shifts = BITS_PER_ANSWER * np.arange(n_features, dtype=np.uint64)
+    return ((np.asarray(keys, dtype=np.uint64)[:, None] >> shifts) & np.uint64(0b11)).astype(np.int64) + 1
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with hit/miss/eviction counters.
+
+    A max_size of 0 disables caching entirely. ``generation`` increases on
+    every clear/reset; a put tagged with an older generation is dropped, so
+    a prediction computed by a model that was swapped out mid-request
+    cannot leak into the new model's cache.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        if max_size < 0:
+            raise ValueError(f"Cache size must be >= 0, got {max_size}")
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: int) -> Optional[Any]:
+        """Return the cached value for key (marking it most recent), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: int, value: Any, generation: Optional[int] = None) -> None:
+        """Store value under key, evicting the least recently used entry if full.
+
+        If generation is given and the cache has been cleared since it was
+        read, the value is stale and is not stored.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries, e.g. after a new model is loaded."""
+        self.reset()
+
+    def reset(self, entries: Optional[Dict[int, Any]] = None) -> None:
+        """Replace all entries with entries (least recent first) in one step."""
+        with self._lock:
+            self._entries = OrderedDict(entries or ())
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self.generation += 1
+            self.invalidations += 1
+
+    def keys(self) -> List[int]:
+        """Snapshot of the cached keys, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,93 @@
+"""
+Compact request parsing and fast JSON serialization for /predict/compact.
+
+A compact request carries the 30 answers either as a JSON array
+(``[2, 1, 1, ...]``), as a 30-character answer string (``"2112..."``,
+sent as a JSON string or as ``text/plain``), or as ``{"answers": ...}``
+holding either form. Answers are validated once, in a vectorized check,
+instead of through 30 pydantic fields plus the per-value checks in
+ModelManager.predict.
+"""
+
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the standard library
+    orjson = None
+
+N_FEATURES = 30
+_ZERO = ord("0")
+
+
+def loads(body: bytes):
+    """Parse JSON with orjson when available."""
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def dumps(obj) -> bytes:
+    """Serialize JSON with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def answers_from_string(text: str) -> np.ndarray:
+    """Validate a 30-character answer string such as "2112...".
+
+    Raises:
+        ValueError: If the string is not exactly 30 digits between 1 and 4
+    """
+    raw = text.strip().encode("ascii", errors="replace")
+    if len(raw) != N_FEATURES:
+        raise ValueError(f"Expected {N_FEATURES} answers, got {len(raw)}")
+    answers = np.frombuffer(raw, dtype=np.uint8).astype(np.int64) - _ZERO
+    _check_range(answers)
+    return answers
+
+
+def answers_from_list(values: list) -> np.ndarray:
+    """Validate a 30-element list of integer answers.
+
+    Raises:
+        ValueError: If the list has the wrong length or holds anything but integers 1-4
+    """
+    if len(values) != N_FEATURES:
+        raise ValueError(f"Expected {N_FEATURES} answers, got {len(values)}")
+    answers = np.asarray(values)
+    # Mixed, float, bool or string lists produce a non-integer dtype
+    if answers.ndim != 1 or answers.dtype.kind not in "iu":
+        raise ValueError("Answers must be integers between 1 and 4")
+    answers = answers.astype(np.int64, copy=False)
+    _check_range(answers)
+    return answers
+
+
+def _check_range(answers: np.ndarray) -> None:
+    bad = (answers < 1) | (answers > 4)
+    if bad.any():
+        index = int(bad.argmax())
+        raise ValueError(f"Answer {index + 1} must be between 1 and 4")
+
+
+def parse_compact(body: bytes, content_type: str = "") -> np.ndarray:
+    """Parse and validate a compact request body into an int64 answer vector.
+
+    Raises:
+        ValueError: If the body is malformed or any answer is invalid
+    """
+    if content_type.startswith("text/plain"):
+        return answers_from_string(body.decode("ascii", errors="replace"))
+    try:
+        data = loads(body)
+    except ValueError:
+        raise ValueError("Body must be JSON or a text/plain answer string")
+    if isinstance(data, dict):
+        data = data.get("answers")
+    if isinstance(data, str):
+        return answers_from_string(data)
+    if isinstance(data, list):
+        return answers_from_list(data)
+    raise ValueError("Expected a list of 30 answers or a 30-character answer string")
@@ -0,0 +1,313 @@
+"""
+Streaming drift monitor for live answers and predictions.
+
+Fixed-size histograms are kept for the answers to every question (30 × 4),
+the predicted class and the prediction confidence, each both since startup
+and exponentially decayed (half-life DRIFT_HALF_LIFE predictions). An
+update touches one bin per histogram, so it costs O(1) and memory does
+not grow with traffic. Decay is applied by giving every new observation a
+larger weight instead of shrinking all bins; the weights are rescaled when
+they grow large.
+
+Drift is measured as the population stability index (PSI) against the
+reference histograms that ml/train.py writes next to the model
+(``drift_reference.json``: training answers, held-out predictions and
+confidences). By convention a PSI below 0.1 is stable, 0.1-0.25 a moderate
+shift and above 0.25 a major shift.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_FILE = "drift_reference.json"
+REFERENCE_VERSION = 1
+N_QUESTIONS = 30
+N_ANSWERS = 4
+CONFIDENCE_BINS = 20  # Equal-width bins over [0, 1]
+PSI_FLOOR = 1e-4  # Proportions are floored so empty bins do not give infinite PSI
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+# Rescale decayed bins before the observation weight can overflow
+_MAX_WEIGHT = 1e100
+
+_QUESTIONS = np.arange(N_QUESTIONS)
+# Offsets of each question's bins in the flattened (30 × 4) answer histogram
+_ANSWER_OFFSETS = _QUESTIONS * N_ANSWERS - 1
+
+
+def _answer_index(features) -> np.ndarray:
+    """0-based answer bins for one (30,) or many (N, 30) questionnaires."""
+    return np.clip(np.rint(np.asarray(features, dtype=float)), 1, N_ANSWERS).astype(np.intp) - 1
+
+
+def _confidence_index(confidence) -> np.ndarray:
+    return np.clip((np.asarray(confidence, dtype=float) * CONFIDENCE_BINS).astype(np.intp), 0, CONFIDENCE_BINS - 1)
+
+
+def build_reference(X: np.ndarray, probabilities: np.ndarray) -> Dict[str, Any]:
+    """Reference histograms for the drift monitor.
+
+    Args:
+        X: (N, 30) raw training answers (1-4)
+        probabilities: (M, n_classes) model probabilities on held-out data
+
+    Returns:
+        JSON-serializable dict; write it to ``drift_reference.json``
+    """
+    answers = _answer_index(X)
+    answer_counts = np.zeros((N_QUESTIONS, N_ANSWERS))
+    np.add.at(answer_counts, (np.broadcast_to(_QUESTIONS, answers.shape), answers), 1)
+    predictions = np.bincount(probabilities.argmax(axis=1), minlength=probabilities.shape[1])
+    confidence = np.bincount(_confidence_index(probabilities.max(axis=1)), minlength=CONFIDENCE_BINS)
+    return {
+        "version": REFERENCE_VERSION,
+        "samples": int(len(X)),
+        "prediction_samples": int(len(probabilities)),
+        "answers": (answer_counts / len(X)).tolist(),
+        "predictions": (predictions / predictions.sum()).tolist(),
+        "confidence": (confidence / confidence.sum()).tolist(),
+    }
+
+
+def psi(observed: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """Population stability index along the last axis (inputs need not be normalized)."""
+    p = np.maximum(observed / observed.sum(axis=-1, keepdims=True), PSI_FLOOR)
+    q = np.maximum(expected / expected.sum(axis=-1, keepdims=True), PSI_FLOOR)
+    return ((p - q) * np.log(p / q)).sum(axis=-1)
+
+
+def drift_status(score: Optional[float]) -> str:
+    if score is None:
+        return "unknown"
+    if score >= PSI_MAJOR:
+        return "major"
+    return "moderate" if score >= PSI_MODERATE else "stable"
+
+
+class _Histograms:
+    """Answer, prediction and confidence bins (weighted counts)."""
+
+    def __init__(self, n_classes: int):
+        self.answers = np.zeros((N_QUESTIONS, N_ANSWERS))
+        self.answers_flat = self.answers.reshape(-1)  # View for single-row updates
+        self.predictions = np.zeros(n_classes)
+        self.confidence = np.zeros(CONFIDENCE_BINS)
+
+    def reset_predictions(self) -> None:
+        self.predictions[:] = 0
+        self.confidence[:] = 0
+
+    def scale(self, factor: float) -> None:
+        # In place, so answers_flat stays a view
+        self.answers *= factor
+        self.predictions *= factor
+        self.confidence *= factor
+
+
+class DriftMonitor:
+    """Constant-memory histograms of live traffic with PSI drift scores.
+
+    Prediction and confidence bins are reset when the served model changes,
+    since they describe a particular model; answer bins are kept.
+    """
+
+    def __init__(self, manager, n_classes: int, half_life: float = 1000, enabled: bool = True):
+        self.manager = manager
+        self.enabled = enabled
+        self.half_life = half_life
+        self.n_classes = n_classes
+        self._growth = 2.0 ** (1.0 / half_life)  # Weight ratio between consecutive observations
+        self._weight = 1.0
+        self.total = _Histograms(n_classes)
+        self.recent = _Histograms(n_classes)
+        self.samples = 0
+        self.prediction_samples = 0
+        self._model_path: Optional[Path] = None
+        self._references: Dict[Path, Optional[Dict[str, np.ndarray]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, manager, n_classes: int) -> "DriftMonitor":
+        """Monitor configured by DRIFT_MONITOR and DRIFT_HALF_LIFE."""
+        return cls(
+            manager,
+            n_classes,
+            half_life=float(os.getenv("DRIFT_HALF_LIFE", "1000")),
+            enabled=os.getenv("DRIFT_MONITOR", "1").lower() in ("1", "true", "yes", "on"),
+        )
+
+    def _follow_model(self) -> None:
+        """Start fresh prediction bins when another model version is served."""
+        model_path = self.manager.model_path
+        if model_path != self._model_path:
+            if self._model_path is not None:
+                self.total.reset_predictions()
+                self.recent.reset_predictions()
+                self.prediction_samples = 0
+            self._model_path = model_path
+
+    def _next_weight(self) -> float:
+        """Decayed-bin weight for the next observation."""
+        if self._weight > _MAX_WEIGHT:
+            self.recent.scale(1.0 / self._weight)
+            self._weight = 1.0
+        self._weight *= self._growth
+        return self._weight
+
+    def _batch_weights(self, n: int) -> np.ndarray:
+        """Decayed-bin weights for the next n observations, oldest first.
+
+        Rebases the bins so the newest observation has weight 1; old bins
+        may underflow to zero, which only drops negligible history.
+        """
+        self.recent.scale(self._growth ** -n / self._weight)
+        self._weight = 1.0
+        return self._growth ** np.arange(1 - n, 1, dtype=float)
+
+    def observe(self, features, prediction: int, confidence: float) -> None:
+        """Record one scored questionnaire (O(1))."""
+        if not self.enabled:
+            return
+        bins = _ANSWER_OFFSETS + np.clip(np.asarray(features, dtype=np.intp), 1, N_ANSWERS)
+        bin_index = min(max(int(confidence * CONFIDENCE_BINS), 0), CONFIDENCE_BINS - 1)
+        with self._lock:
+            self._follow_model()
+            weight = self._next_weight()
+            self.total.answers_flat[bins] += 1
+            self.recent.answers_flat[bins] += weight
+            self.total.predictions[prediction] += 1
+            self.recent.predictions[prediction] += weight
+            self.total.confidence[bin_index] += 1
+            self.recent.confidence[bin_index] += weight
+            self.samples += 1
+            self.prediction_samples += 1
+
+    def observe_batch(self, X: np.ndarray, predictions: np.ndarray, confidences: np.ndarray) -> None:
+        """Record N scored questionnaires (O(N))."""
+        if not self.enabled or len(X) == 0:
+            return
+        answers = _answer_index(X)
+        questions = np.broadcast_to(_QUESTIONS, answers.shape)
+        predictions = np.asarray(predictions, dtype=np.intp)
+        bins = _confidence_index(confidences)
+        with self._lock:
+            self._follow_model()
+            weights = self._batch_weights(len(X))
+            np.add.at(self.total.answers, (questions, answers), 1)
+            np.add.at(self.recent.answers, (questions, answers), weights[:, None])
+            np.add.at(self.total.predictions, predictions, 1)
+            np.add.at(self.recent.predictions, predictions, weights)
+            np.add.at(self.total.confidence, bins, 1)
+            np.add.at(self.recent.confidence, bins, weights)
+            self.samples += len(X)
+            self.prediction_samples += len(X)
+
+    def reference(self) -> Optional[Dict[str, np.ndarray]]:
+        """Reference histograms of the served model, or None if it has none."""
+        model_path = self.manager.model_path
+        if model_path is None:
+            return None
+        if model_path not in self._references:
+            path = model_path.parent / REFERENCE_FILE
+            reference = None
+            if path.exists():
+                try:
+                    data = json.loads(path.read_text())
+                    if data.get("version") != REFERENCE_VERSION:
+                        raise ValueError(f"unsupported version {data.get('version')}")
+                    reference = {key: np.asarray(data[key], dtype=float) for key in ("answers", "predictions", "confidence")}
+                    reference["samples"] = int(data.get("samples", 0))
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Could not read drift reference {path}: {e}")
+            self._references[model_path] = reference
+        return self._references[model_path]
+
+    def _window(self, histograms: _Histograms, reference: Dict[str, np.ndarray]) -> Optional[Dict[str, Any]]:
+        if not histograms.answers[0].any():
+            return None
+        question_psi = psi(histograms.answers, reference["answers"])
+        window = {
+            "inputs_psi_mean": float(question_psi.mean()),
+            "inputs_psi_max": float(question_psi.max()),
+            "questions": {f"q{j + 1}": round(float(value), 4) for j, value in enumerate(question_psi)},
+            "predictions_psi": None,
+            "confidence_psi": None,
+        }
+        signals = [window["inputs_psi_mean"]]
+        if histograms.predictions.any() and len(reference["predictions"]) == self.n_classes:
+            window["predictions_psi"] = float(psi(histograms.predictions, reference["predictions"]))
+            window["confidence_psi"] = float(psi(histograms.confidence, reference["confidence"]))
+            signals += [window["predictions_psi"], window["confidence_psi"]]
+        window["drift_score"] = max(signals)
+        window["status"] = drift_status(window["drift_score"])
+        return window
+
+    def report(self, histograms: bool = False) -> Dict[str, Any]:
+        """Drift scores for the cumulative and decayed windows.
+
+        The drift score of a window is the largest of the mean per-question
+        answer PSI, the predicted-class PSI and the confidence PSI.
+        """
+        with self._lock:
+            self._follow_model()
+            snapshot = {
+                name: (h.answers.copy(), h.predictions.copy(), h.confidence.copy())
+                for name, h in (("total", self.total), ("recent", self.recent))
+            }
+            weight, samples, prediction_samples = self._weight, self.samples, self.prediction_samples
+        views = {}
+        for name, (answers, predictions, confidence) in snapshot.items():
+            view = _Histograms(self.n_classes)
+            view.answers, view.predictions, view.confidence = answers, predictions, confidence
+            views[name] = view
+
+        reference = self.reference()
+        result = {
+            "enabled": self.enabled,
+            "samples": samples,
+            "prediction_samples": prediction_samples,
+            # Sum of decayed weights relative to the newest observation
+            "recent_samples": round(float(views["recent"].answers[0].sum()) / weight, 2),
+            "half_life": self.half_life,
+            "reference_available": reference is not None,
+            "reference_samples": reference["samples"] if reference is not None else None,
+            "total": self._window(views["total"], reference) if reference is not None else None,
+            "recent": self._window(views["recent"], reference) if reference is not None else None,
+            "histograms": None,
+        }
+        if histograms:
+            result["histograms"] = {
+                name: {
+                    "answers": (view.answers / max(view.answers[0].sum(), 1e-300)).round(4).tolist(),
+                    "predictions": (view.predictions / max(view.predictions.sum(), 1e-300)).round(4).tolist(),
+                    "confidence": (view.confidence / max(view.confidence.sum(), 1e-300)).round(4).tolist(),
+                }
+                for name, view in views.items()
+            }
+        return result
+
+    def render_metrics(self):
+        """Prometheus gauges for the /metrics collector."""
+        if not self.enabled:
+            return
+        report = self.report()
+        yield "# HELP pdd_drift_samples_total Questionnaires observed by the drift monitor"
+        yield "# TYPE pdd_drift_samples_total counter"
+        yield f"pdd_drift_samples_total {report['samples']}"
+        yield "# HELP pdd_drift_psi Population stability index against the training reference"
+        yield "# TYPE pdd_drift_psi gauge"
+        for window in ("total", "recent"):
+            values = report[window]
+            if values is None:
+                continue
+            for signal in ("inputs_psi_mean", "inputs_psi_max", "predictions_psi", "confidence_psi", "drift_score"):
+                if values[signal] is not None:
+                    yield f'pdd_drift_psi{{window="{window}",signal="{signal}"}} {values[signal]:.6g}'
@@ -0,0 +1,558 @@
+"""
+Compiled inference engines for the deployed model.
+
+A StandardScaler followed by a linear classifier folds into one weight
+matrix and bias, so scoring is a single matrix product and a softmax with
+no scikit-learn call on the hot path. Every answer is an integer 1-4, so
+the weights also expand into a per-question, per-answer table of logit
+contributions that explains, bounds and perturbs a prediction question
+by question.
+
+Tree ensembles (random forest, gradient boosting) are flattened into
+contiguous node arrays. A split on a 1-4 answer can only send answers up
+to some cut left, so each node becomes a 4-entry row of a transition
+table and all trees of a batch advance one level per vectorized step.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 30
+N_ANSWERS = 4  # Answers are integers 1-4
+
+TREE_KINDS = ("forest", "boosting")
+# (row, tree) pairs per tree-engine pass; keeps temporaries cache-sized
+_TREE_CHUNK_VALUES = 1 << 16
+# Levels between removals of finished paths from the tree traversal
+_TREE_COMPACT_EVERY = 4
+_TREE_COMPACT_MIN_PAIRS = 4096
+
+# Fixed probe rows used to check a compiled engine against scikit-learn
+_PROBE_SEED = 1234
+_PROBE_ROWS = 64
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    """Row-wise numerically stable softmax."""
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _ovr_normalize(logits: np.ndarray) -> np.ndarray:
+    """One-vs-rest probabilities: per-class sigmoids normalized to sum to 1."""
+    prob = 1.0 / (1.0 + np.exp(-logits))
+    return prob / prob.sum(axis=1, keepdims=True)
+
+
+def probe_rows() -> np.ndarray:
+    """Deterministic set of valid questionnaires used for verification."""
+    rng = np.random.default_rng(_PROBE_SEED)
+    rows = rng.integers(1, N_ANSWERS + 1, size=(_PROBE_ROWS, N_FEATURES))
+    rows[0] = 1
+    rows[1] = N_ANSWERS
+    return rows.astype(float)
+
+
+class LinearEngine:
+    """Lookup-table evaluator for a (scaler +) multi-class linear model.
+
+    The scaler is folded into the weights, and the weights are expanded
+    into a table of shape (30, 4, n_classes) holding the logit contribution
+    of every answer to every question. Scoring uses the folded weights;
+    the table serves per-question work (contributions, bounds, changes).
+    """
+
+    # Arrays the engine works from: npz key -> (attribute, dtype); see from_compiled
+    _COMPILED = {
+        "weights": ("weights", float),
+        "bias": ("bias", float),
+        "intercept": ("intercept", float),
+        "table": ("table", float),
+        "contribution_table": ("contribution_table", float),
+        "margin_low": ("_margin_low", float),
+        "margin_high": ("_margin_high", float),
+    }
+
+    def __init__(
+        self,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        classes: np.ndarray,
+        mean: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None,
+        multinomial: bool = True,
+    ):
+        coef = np.asarray(coef, dtype=float)
+        intercept = np.asarray(intercept, dtype=float)
+        if coef.ndim != 2 or coef.shape[1] != N_FEATURES:
+            raise ValueError(f"Expected coefficients of shape (K, {N_FEATURES}), got {coef.shape}")
+        if coef.shape[0] < 2:
+            raise ValueError("Binary linear models are not supported by the compiled engine")
+
+        mean = np.zeros(N_FEATURES) if mean is None else np.asarray(mean, dtype=float)
+        scale = np.ones(N_FEATURES) if scale is None else np.asarray(scale, dtype=float)
+
+        # Fold (x - mean) / scale into the weights: logits = x @ W.T + b
+        self.weights = coef / scale
+        self.bias = intercept - self.weights @ mean
+        self.classes = np.asarray(classes)
+        self.multinomial = multinomial
+
+        # table[j, a - 1, k] = contribution of answer a to question j for class k
+        answers = np.arange(1, N_ANSWERS + 1, dtype=float)
+        self.table = answers[None, :, None] * self.weights.T[:, None, :]
+
+        # Same table centred on the mean answer, i.e. coef * scaled answer:
+        # logits = intercept + sum of one entry per question (see contributions())
+        self.intercept = intercept
+        self.contribution_table = self.table - (self.weights * mean).T[:, None, :]
+
+        # Range of every pairwise logit margin (class c minus class d) that
+        # each question can still produce, used to bound partial answers
+        margins = self.table[:, :, :, None] - self.table[:, :, None, :]
+        self._margin_low = margins.min(axis=1)  # (30, K, K)
+        self._margin_high = margins.max(axis=1)
+        self._views()
+
+    def _views(self) -> None:
+        self._flat_table = self.table.reshape(N_FEATURES * N_ANSWERS, -1)
+        self._offsets = np.arange(N_FEATURES) * N_ANSWERS - 1
+
+    def compiled_arrays(self) -> Dict[str, np.ndarray]:
+        """Every array the engine works from, keyed for an npz artifact."""
+        return {key: getattr(self, attr) for key, (attr, _) in self._COMPILED.items()}
+
+    @classmethod
+    def from_compiled(cls, arrays: Dict[str, np.ndarray], classes: np.ndarray,
+                      multinomial: bool = True) -> "LinearEngine":
+        """Adopt arrays written by compiled_arrays() without copying them.
+
+        Memory-mapped arrays (see app.artifact.read_npz) stay memory-mapped,
+        so every process serving the same artifact shares one physical copy.
+        """
+        engine = cls.__new__(cls)
+        for key, (attr, dtype) in cls._COMPILED.items():
+            setattr(engine, attr, np.asarray(arrays[key], dtype=dtype))
+        engine.classes = np.asarray(classes)
+        engine.multinomial = multinomial
+        engine._views()
+        return engine
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None) -> Optional["LinearEngine"]:
+        """Compile a fitted scikit-learn linear classifier and scaler.
+
+        The compiled engine is checked against ``model.predict_proba`` on a
+        fixed set of probe questionnaires; if neither the multinomial nor the
+        one-vs-rest form reproduces it, None is returned and callers should
+        keep using scikit-learn.
+
+        Args:
+            model: Fitted classifier (e.g. LogisticRegression)
+            scaler: Fitted StandardScaler, or None if features are unscaled
+
+        Returns:
+            A LinearEngine, or None if the model cannot be compiled.
+        """
+        if not all(hasattr(model, attr) for attr in ('coef_', 'intercept_', 'classes_', 'predict_proba')):
+            return None
+
+        mean = scale = None
+        if scaler is not None:
+            if type(scaler).__name__ != 'StandardScaler':
+                return None
+            mean = getattr(scaler, 'mean_', None)
+            scale = getattr(scaler, 'scale_', None)
+
+        try:
+            X = probe_rows()
+            expected = model.predict_proba(scaler.transform(X) if scaler is not None else X)
+            for multinomial in (True, False):
+                engine = cls(model.coef_, model.intercept_, model.classes_, mean, scale, multinomial)
+                if np.allclose(engine.predict_proba(X), expected, rtol=1e-6, atol=1e-9):
+                    return engine
+        except Exception as e:
+            logger.warning(f"Could not compile linear engine: {e}")
+            return None
+
+        logger.warning("Compiled engine does not reproduce model probabilities")
+        return None
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Compute class logits for an (N, 30) array of validated answers."""
+        # The folded matrix product beats a per-answer table gather at every
+        # batch size; the table is for per-question work (contributions, bounds)
+        return np.asarray(X, dtype=float) @ self.weights.T + self.bias
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Compute class probabilities for an (N, 30) array of validated answers."""
+        return self.proba_from_logits(self.decision_function(X))
+
+    def proba_from_logits(self, logits: np.ndarray) -> np.ndarray:
+        """Class probabilities for an (N, n_classes) array of logits."""
+        return _softmax(logits) if self.multinomial else _ovr_normalize(logits)
+
+    def contributions(self, answers: np.ndarray) -> np.ndarray:
+        """Per-question logit contributions for one validated integer answer vector.
+
+        Entry [j, k] is coef[k, j] * scaled answer j, so the rows sum to the
+        class logits minus ``intercept``. Costs 30 table lookups.
+
+        Returns:
+            Array of shape (30, n_classes)
+        """
+        index = np.asarray(answers).astype(np.intp) - 1
+        return self.contribution_table[np.arange(N_FEATURES), index]
+
+    def changed_logits(self, answers: np.ndarray, questions: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Class logits after changing a few answers of one questionnaire.
+
+        Logits are sums of one table entry per question, so changing an
+        answer only swaps its entry: each row costs W lookups and a
+        subtraction instead of a full rescore.
+
+        Args:
+            answers: (30,) validated integer answers
+            questions: (M, W) 0-based questions changed in each row (distinct within a row)
+            values: (M, W) new answers (1-4) for those questions
+
+        Returns:
+            Array of shape (M, n_classes)
+        """
+        answers = np.asarray(answers).astype(np.intp)
+        questions = np.asarray(questions, dtype=np.intp)
+        base = self._flat_table[answers + self._offsets].sum(axis=0) + self.bias
+        offsets = self._offsets[questions]
+        delta = self._flat_table[offsets + np.asarray(values, dtype=np.intp)] - self._flat_table[offsets + answers[questions]]
+        return base + delta.sum(axis=1)
+
+    def bounds(self, answers: np.ndarray, answered: np.ndarray):
+        """Bound the final logits of a partially answered questionnaire.
+
+        Logits are sums of one table entry per question, so the extremes
+        over all completions are reached question by question. The same
+        holds for the margin between any two classes, which decides the
+        final class.
+
+        Args:
+            answers: (30,) integer answers; entries where answered is False are ignored
+            answered: (30,) boolean mask of answered questions
+
+        Returns:
+            Tuple of (logits, low, high, margin_low, margin_width) where
+            logits assumes the mean answer for open questions, low/high
+            bound each class logit, margin_low[c, d] is the smallest
+            reachable logit[c] - logit[d], and margin_width[j, c, d] is how
+            much question j can still move that margin (0 once answered).
+        """
+        answered = np.asarray(answered, dtype=bool)
+        index = np.where(answered, np.asarray(answers), 1).astype(np.intp) - 1
+        known = self.table[np.arange(N_FEATURES), index]  # (30, K)
+        known_sum = known[answered].sum(axis=0) + self.bias
+        open_table = self.table[~answered]  # (open, 4, K)
+
+        logits = self.intercept + self.contribution_table[np.arange(N_FEATURES), index][answered].sum(axis=0)
+        low = known_sum + open_table.min(axis=1).sum(axis=0)
+        high = known_sum + open_table.max(axis=1).sum(axis=0)
+
+        margin_low = (known_sum[:, None] - known_sum[None, :]) + self._margin_low[~answered].sum(axis=0)
+        margin_width = np.where(answered[:, None, None], 0.0, self._margin_high - self._margin_low)
+        return logits, low, high, margin_low, margin_width
+
+
+class TreeEngine:
+    """Array-backed evaluator for random forests and gradient boosting.
+
+    All trees are stored in one set of node arrays (leaves point to
+    themselves). ``value`` holds each leaf's contribution to every class:
+    normalized class frequencies for a forest, learning rate × leaf value
+    in the tree's class column for boosting. Contributions are summed in
+    tree order, as scikit-learn does, so results match it exactly.
+    """
+
+    # Batch size from which scikit-learn's compiled per-row traversal is
+    # faster than stepping all trees in NumPy (measured on one core)
+    sklearn_min_rows = 1000
+
+    # Arrays the engine works from: npz key -> (attribute, dtype); see from_compiled
+    _COMPILED = {
+        "feature": ("feature", np.int32),
+        "threshold": ("threshold", float),
+        "left": ("left", np.int32),
+        "right": ("right", np.int32),
+        "value": ("value", float),
+        "roots": ("roots", np.int32),
+        "init": ("init", float),
+        "mean": ("mean", float),
+        "scale": ("scale", float),
+        "internal": ("_internal", bool),
+        "step4": ("_step4", np.int32),
+        "feature4": ("_feature4", np.int32),
+        "internal4": ("_internal4", bool),
+    }
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        kind: str = "forest",
+        init: Optional[np.ndarray] = None,
+        mean: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None,
+    ):
+        if kind not in TREE_KINDS:
+            raise ValueError(f"Unknown tree ensemble kind {kind!r}")
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=float)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=float)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.classes = np.asarray(classes)
+        self.kind = kind
+        if len(self.classes) < 3:
+            raise ValueError("Binary tree ensembles are not supported by the compiled engine")
+        if self.value.shape != (len(self.feature), len(self.classes)):
+            raise ValueError(f"Expected leaf values of shape ({len(self.feature)}, {len(self.classes)}), got {self.value.shape}")
+        self.init = np.zeros(len(self.classes)) if init is None else np.asarray(init, dtype=float)
+        self.mean = np.zeros(N_FEATURES) if mean is None else np.asarray(mean, dtype=float)
+        self.scale = np.ones(N_FEATURES) if scale is None else np.asarray(scale, dtype=float)
+
+        if kind == "boosting":
+            if len(self.roots) % len(self.classes):
+                raise ValueError("Boosting ensembles need one tree per class and stage")
+            # Each boosting tree feeds one class, so a leaf holds one nonzero value
+            tree_sizes = np.diff(np.append(self.roots, len(self.feature)))
+            tree_class = np.repeat(np.arange(len(self.roots)) % len(self.classes), tree_sizes)
+            self._leaf_value = self.value[np.arange(len(self.feature)), tree_class]
+
+        nodes = np.arange(len(self.feature))
+        self._internal = self.left != nodes
+        self.depth = self._max_depth()
+
+        # scikit-learn compares float32 scaled answers with float64 thresholds;
+        # cut = number of answers (1..cut) that go left at each node
+        answers = np.arange(1, N_ANSWERS + 1, dtype=float)
+        scaled = ((answers[None, :] - self.mean[self.feature, None]) / self.scale[self.feature, None]).astype(np.float32)
+        goes_left = (scaled <= self.threshold[:, None]) & self._internal[:, None]
+        cut = goes_left.sum(axis=1)
+        if not np.array_equal(goes_left, answers[None, :] <= cut[:, None]):
+            raise ValueError("Tree splits are not monotone in the answer value")
+
+        # step[node, answer - 1] = next node for that answer
+        step = np.where(answers[None, :] <= cut[:, None], self.left[:, None], self.right[:, None])
+        step[~self._internal] = nodes[~self._internal, None]
+        self._step4 = (step.reshape(-1) * N_ANSWERS).astype(np.int32)
+        self._feature4 = np.repeat(self.feature, N_ANSWERS).astype(np.int32)
+        self._internal4 = np.repeat(self._internal, N_ANSWERS)
+
+    def compiled_arrays(self) -> Dict[str, np.ndarray]:
+        """Every array the engine works from, keyed for an npz artifact."""
+        arrays = {key: getattr(self, attr) for key, (attr, _) in self._COMPILED.items()}
+        arrays["depth"] = np.array(self.depth)
+        if self.kind == "boosting":
+            arrays["leaf_value"] = self._leaf_value
+        return arrays
+
+    @classmethod
+    def from_compiled(cls, arrays: Dict[str, np.ndarray], classes: np.ndarray, kind: str) -> "TreeEngine":
+        """Adopt arrays written by compiled_arrays() without copying them.
+
+        Memory-mapped arrays (see app.artifact.read_npz) stay memory-mapped,
+        so every process serving the same artifact shares one physical copy
+        of the node arrays and transition tables.
+        """
+        if kind not in TREE_KINDS:
+            raise ValueError(f"Unknown tree ensemble kind {kind!r}")
+        engine = cls.__new__(cls)
+        for key, (attr, dtype) in cls._COMPILED.items():
+            setattr(engine, attr, np.asarray(arrays[key], dtype=dtype))
+        engine.classes = np.asarray(classes)
+        engine.kind = kind
+        engine.depth = int(arrays["depth"])
+        if kind == "boosting":
+            engine._leaf_value = np.asarray(arrays["leaf_value"], dtype=float)
+        return engine
+
+    def _max_depth(self) -> int:
+        depth, level = 0, self.roots
+        while self._internal[level].any():
+            level = np.concatenate([self.left[level[self._internal[level]]], self.right[level[self._internal[level]]]])
+            depth += 1
+        return depth
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None) -> Optional["TreeEngine"]:
+        """Compile a fitted RandomForest/ExtraTrees or GradientBoosting classifier.
+
+        The compiled engine is checked against ``model.predict_proba`` on a
+        fixed set of probe questionnaires; None is returned if the model is
+        of another kind or cannot be reproduced.
+
+        Args:
+            model: Fitted tree-ensemble classifier
+            scaler: Fitted StandardScaler, or None if features are unscaled
+
+        Returns:
+            A TreeEngine, or None if the model cannot be compiled.
+        """
+        name = type(model).__name__
+        if name not in ("RandomForestClassifier", "ExtraTreesClassifier", "GradientBoostingClassifier"):
+            return None
+
+        mean = scale = None
+        if scaler is not None:
+            if type(scaler).__name__ != 'StandardScaler':
+                return None
+            mean = getattr(scaler, 'mean_', None)
+            scale = getattr(scaler, 'scale_', None)
+
+        try:
+            X = probe_rows()
+            X_model = scaler.transform(X) if scaler is not None else X
+            if name == "GradientBoostingClassifier":
+                arrays = cls._flatten_boosting(model, X_model)
+            else:
+                arrays = cls._flatten_forest(model)
+            if arrays is None:
+                return None
+            engine = cls(**arrays, classes=model.classes_, mean=mean, scale=scale)
+            expected = model.predict_proba(X_model)
+            got = engine.predict_proba(X)
+            if np.allclose(got, expected, rtol=1e-12, atol=1e-15) and \
+                    np.array_equal(got.argmax(axis=1), expected.argmax(axis=1)):
+                return engine
+        except Exception as e:
+            logger.warning(f"Could not compile tree engine: {e}")
+            return None
+
+        logger.warning("Compiled tree engine does not reproduce model probabilities")
+        return None
+
+    @staticmethod
+    def _flatten(trees, leaf_values):
+        """Concatenate fitted sklearn trees into global node arrays."""
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for tree, tree_value in zip(trees, leaf_values):
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, 0.0, tree.threshold))
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            value.append(tree_value)
+            offset += tree.node_count
+        return {
+            "feature": np.concatenate(feature),
+            "threshold": np.concatenate(threshold),
+            "left": np.concatenate(left),
+            "right": np.concatenate(right),
+            "value": np.concatenate(value),
+            "roots": np.array(roots),
+        }
+
+    @classmethod
+    def _flatten_forest(cls, model):
+        if getattr(model, 'n_outputs_', 1) != 1:
+            return None
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        values = []
+        for tree in trees:
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :len(model.classes_)].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            values.append(proba)
+        return {**cls._flatten(trees, values), "kind": "forest"}
+
+    @classmethod
+    def _flatten_boosting(cls, model, X_model: np.ndarray):
+        n_classes = len(model.classes_)
+        if model.estimators_.shape[1] != n_classes:
+            return None
+        # The prior-based initial prediction is the same for every row
+        init = model._raw_predict_init(X_model)
+        if not np.all(init == init[0]):
+            return None
+        trees, values = [], []
+        for stage in model.estimators_:
+            for k, estimator in enumerate(stage):
+                value = np.zeros((estimator.tree_.node_count, n_classes))
+                value[:, k] = model.learning_rate * estimator.tree_.value[:, 0, 0]
+                trees.append(estimator.tree_)
+                values.append(value)
+        return {**cls._flatten(trees, values), "kind": "boosting", "init": init[0]}
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf reached in every tree, flattened row-major to shape (N * n_trees,)."""
+        n_rows, n_trees = len(X), len(self.roots)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int32) * N_FEATURES, n_trees)
+        node = np.tile(self.roots, n_rows)
+        if np.issubdtype(X.dtype, np.integer) or np.array_equal(X, np.round(X)):
+            # Table path on row positions (node * 4): the answer picks the
+            # entry of the node's 4-way transition row
+            answers = (X.astype(np.int32) - 1).ravel()
+            if len(answers) and (answers.min() < 0 or answers.max() >= N_ANSWERS):
+                # Would silently index a neighbouring transition entry
+                raise ValueError("Integer answers must be between 1 and 4")
+            node = node * N_ANSWERS
+            advance = lambda cur, offset: self._step4[cur + answers[offset + self._feature4[cur]]]  # noqa: E731
+            internal, position = self._internal4, N_ANSWERS
+        else:
+            Z = ((X - self.mean) / self.scale).astype(np.float32).ravel()
+            advance = lambda cur, offset: np.where(  # noqa: E731
+                Z[offset + self.feature[cur]] <= self.threshold[cur], self.left[cur], self.right[cur])
+            internal, position = self._internal, 1
+
+        # Paths end at different depths; on large inputs, every few levels
+        # stop carrying (row, tree) pairs that already reached a leaf
+        compact = len(node) >= _TREE_COMPACT_MIN_PAIRS
+        active, current, offset = None, node, row_offset
+        for level in range(1, self.depth + 1):
+            current = advance(current, offset)
+            if compact and level % _TREE_COMPACT_EVERY == 0 and level < self.depth:
+                keep = np.flatnonzero(internal[current])
+                if active is None:
+                    node, active = current, keep
+                else:
+                    node[active] = current
+                    active = active[keep]
+                current, offset = current[keep], offset[keep]
+        if active is None:
+            node = current
+        else:
+            node[active] = current
+        return node // position if position > 1 else node
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Compute class probabilities for an (N, 30) array of validated answers."""
+        X = np.asarray(X)
+        n_trees, n_classes = len(self.roots), len(self.classes)
+        chunk = max(1, _TREE_CHUNK_VALUES // n_trees)
+        out = np.empty((len(X), n_classes))
+        for start in range(0, len(X), chunk):
+            rows = X[start:start + chunk]
+            leaves = self._leaves(rows).reshape(len(rows), n_trees).T  # (n_trees, rows)
+            if self.kind == "forest":
+                # Reducing over the leading axis adds trees one by one, like sklearn
+                out[start:start + chunk] = self.value[leaves].sum(axis=0) / n_trees
+            else:
+                # Trees are stored stage by stage, one per class
+                raw = np.empty((n_trees // n_classes + 1, n_classes, leaves.shape[1]))
+                raw[0] = self.init[:, None]
+                raw[1:] = self._leaf_value[leaves].reshape(-1, n_classes, leaves.shape[1])
+                out[start:start + chunk] = _softmax(raw.sum(axis=0).T)
+        return out
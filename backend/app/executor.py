@@ -0,0 +1,173 @@
+"""
+Configurable execution of model inference off the event loop.
+
+Modes (INFERENCE_MODE):
+- ``inline``: run on the event loop (lowest overhead for the compiled engine)
+- ``thread``: run in a thread pool so the loop keeps accepting requests
+- ``process``: run in a process pool so one uvicorn worker can use several
+  cores; each child loads the model memory-mapped, so all of them share
+  one physical copy of the weights
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MODES = ("inline", "thread", "process")
+
+Prediction = Tuple[int, float, Dict[str, float]]
+
+# Per-process model used by process-pool workers
+_worker_manager = None
+
+
+def _init_process_worker(model_path: Optional[str]) -> None:
+    """Load the model once in each process-pool worker."""
+    global _worker_manager
+    from .model import ModelManager
+
+    _worker_manager = ModelManager(cache_size=0)
+    if not _worker_manager.load(Path(model_path) if model_path else None):
+        raise RuntimeError(f"Inference worker could not load model from {model_path}")
+
+
+def _process_ready() -> bool:
+    return _worker_manager is not None and _worker_manager.is_loaded
+
+
+def _process_predict(features: list) -> Prediction:
+    return _worker_manager.predict(features)
+
+
+def _process_predict_batch(X: np.ndarray):
+    return _worker_manager.predict_batch(X)
+
+
+def _process_explain(features: list):
+    return _worker_manager.explain(features)
+
+
+def _process_sensitivity(features: list, pair_questions: list):
+    return _worker_manager.sensitivity(features, pair_questions)
+
+
+class InferenceExecutor:
+    """Runs ModelManager predictions inline, in threads or in processes."""
+
+    def __init__(self, manager, mode: str = "inline", workers: Optional[int] = None):
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode {mode!r}, expected one of {', '.join(INFERENCE_MODES)}")
+        self.manager = manager
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        if mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        elif mode == "process":
+            self._pool = self._process_pool(manager.model_path)
+
+    def _process_pool(self, model_path: Optional[Path]) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_process_worker,
+            initargs=(str(model_path) if model_path else None,),
+        )
+
+    @classmethod
+    def from_env(cls, manager) -> "InferenceExecutor":
+        """Build an executor from INFERENCE_MODE / INFERENCE_WORKERS."""
+        workers = os.getenv("INFERENCE_WORKERS")
+        return cls(
+            manager,
+            mode=os.getenv("INFERENCE_MODE", "inline").lower(),
+            workers=int(workers) if workers else None,
+        )
+
+    async def predict(self, features: list) -> Prediction:
+        """Score one validated feature vector."""
+        if self.mode == "inline":
+            return self.manager.predict(features)
+
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            return await loop.run_in_executor(self._pool, self.manager.predict, features)
+
+        # Process mode: the cache lives in this process, the model in the
+        # workers; check here so the stages are recorded where /metrics is
+        self.manager.validate_features(features)
+        cached = self.manager.get_cached(features, timed=True)
+        if cached is not None:
+            return cached
+        generation = self.manager.cache.generation
+        result = await loop.run_in_executor(self._pool, _process_predict, features)
+        self.manager.put_cached(features, result, generation)
+        return result
+
+    async def predict_answers(self, answers: np.ndarray) -> Prediction:
+        """Score one pre-validated integer answer array (see app.compact)."""
+        if self.mode == "inline":
+            return self.manager.predict_answers(answers)
+        if self.mode == "thread":
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, self.manager.predict_answers, answers)
+        return await self.predict(answers.tolist())
+
+    async def predict_batch(self, X: np.ndarray):
+        """Score an (N, 30) array; see ModelManager.predict_batch."""
+        if self.mode == "inline":
+            return self.manager.predict_batch(X)
+        loop = asyncio.get_running_loop()
+        fn = self.manager.predict_batch if self.mode == "thread" else _process_predict_batch
+        return await loop.run_in_executor(self._pool, fn, X)
+
+    async def explain(self, features: list):
+        """Explain one validated feature vector; see ModelManager.explain."""
+        if self.mode == "inline":
+            return self.manager.explain(features)
+        loop = asyncio.get_running_loop()
+        fn = self.manager.explain if self.mode == "thread" else _process_explain
+        return await loop.run_in_executor(self._pool, fn, features)
+
+    async def sensitivity(self, features: list, pair_questions: list):
+        """What-if sweep around one feature vector; see ModelManager.sensitivity."""
+        if self.mode == "inline":
+            return self.manager.sensitivity(features, pair_questions)
+        loop = asyncio.get_running_loop()
+        fn = self.manager.sensitivity if self.mode == "thread" else _process_sensitivity
+        return await loop.run_in_executor(self._pool, fn, features, pair_questions)
+
+    def reload(self, model_path: Optional[Path]) -> None:
+        """Replace process-pool workers with ones serving model_path.
+
+        The new workers are started and loaded before the swap; the old
+        pool finishes the calls already submitted to it and then exits.
+        Thread and inline modes share the manager's model and need nothing.
+        Blocking: call it from a worker thread.
+        """
+        if self.mode != "process":
+            return
+        pool = self._process_pool(model_path)
+        try:
+            # Each submission can start a worker; wait until all have loaded
+            ready = [pool.submit(_process_ready) for _ in range(self.workers)]
+            if not all(future.result() for future in ready):
+                raise RuntimeError(f"Inference workers could not load {model_path}")
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        old, self._pool = self._pool, pool
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        """Stop worker threads or processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
@@ -2,21 +2,62 @@
 FastAPI application for Psychiatric Disorder Detection.
 
 This API provides:
-- Health check endpoint
+- Health check and readiness endpoints
 - Prediction endpoint for mental health screening
+- Compact prediction endpoint (answer array or string, fast JSON)
+- Partial scoring endpoint that reports whether the outcome is already fixed
+- Batch prediction endpoint for screening cohorts
+- Streaming bulk-scoring endpoint for NDJSON/CSV/TSV uploads
+- Explanation endpoint with per-question contributions
+- What-if sensitivity endpoint: which answer changes would alter the result
+- Prometheus metrics endpoint with per-stage latency histograms
+- Drift endpoint comparing live answers and predictions with the training data
+- Buffered audit log of every screening result (see app.audit)
+- Admission control that sheds load with 503 + Retry-After (see app.admission)
+- Admin endpoints to list registry model versions and hot-swap the active one
+- Admin endpoint for incremental model updates from labeled questionnaires
+- Admin endpoint comparing shadow-scored candidate models with the served predictions
 
 Note: This tool is for educational purposes only and is NOT a medical diagnosis.
 """
 
+import asyncio
+import hmac
 import os
+import sys
 import time
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, File, Header, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import ValidationError
 
-from .schemas import PredictionRequest, PredictionResponse, HealthResponse
-from .model import model_manager
+from .schemas import (
+    PredictionRequest, PredictionResponse, HealthResponse, ReadinessResponse,
+    BatchPredictionRequest, BatchPredictionItem, BatchPredictionResponse,
+    ExplanationResponse, QuestionContribution, QUESTION_TEXTS,
+    PartialPredictionRequest, PartialPredictionResponse,
+    SensitivityRequest, SensitivityResponse,
+    ModelRegistryResponse, ModelSwapResponse, ModelVersionInfo,
+    OnlineUpdateRequest, OnlineUpdateResponse, ShadowResponse,
+    DriftResponse,
+    MAX_BATCH_SIZE, DISCLAIMER, UNTIMED,
+)
+from .admission import AdmissionController, AdmissionMiddleware
+from .audit import AuditLog
+from .cache import pack_answers, pack_array, pack_rows
+from .compact import parse_compact, dumps as fast_dumps
+from .drift import DriftMonitor
+from .bulk import BULK_FORMATS, detect_format, open_reader, score_rows
+from .batching import MicroBatcher
+from .executor import InferenceExecutor
+from .metrics import registry as metrics_registry, now, observe_stage, count_prediction, count_request
+from .model import CLASS_LABELS, UnsupportedModelError, model_manager
+from .online import OnlineUpdater
+from .registry import ModelRegistry, ModelSwapper
+from .shadow import ShadowScorer
 
 # Configure logging with more detail for debugging
 logging.basicConfig(
@@ -26,22 +67,142 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Cold start measurements reported by the health check
+_startup_stats = {}
+
+# Where inference runs (see INFERENCE_MODE); replaced at startup
+_executor = InferenceExecutor(model_manager)
+
+# Optional request coalescer for /predict (see BATCH_COALESCE)
+_batcher = None
+
+# Versioned model registry and the hot-swap coordinator (set at startup)
+_registry = ModelRegistry.from_env()
+_swapper = None
+
+# Incremental learning from labeled submissions (see ONLINE_LEARNING)
+_online = None
+
+# Append-only record of every screening result (see AUDIT_LOG)
+_audit = None
+
+# Candidate models scoring copies of live traffic (see SHADOW_MODELS)
+_shadow = None
+
+# Concurrency limit and load shedding for prediction endpoints (see ADMISSION_CONTROL)
+_admission = AdmissionController.from_env()
+
+# Live answer/prediction histograms compared with the training reference
+_drift = DriftMonitor.from_env(model_manager, len(CLASS_LABELS))
+
+# Admin endpoints are disabled unless a token is configured
+_admin_token = os.getenv("ADMIN_TOKEN", "")
+
+
+def _resident_memory_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak RSS; reported in KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Load model on startup with timing for cold start monitoring."""
+    rss_before = _resident_memory_mb()
     start_time = time.time()
     logger.info("🚀 Starting up... Loading model...")
     
-    success = model_manager.load()
+    active_version = _registry.active_version()
+    if active_version is not None:
+        logger.info(f"Serving model version {active_version} from {_registry.root}")
+        success = model_manager.load(_registry.model_path(active_version), version=active_version)
+    else:
+        success = model_manager.load()
     load_time = time.time() - start_time
     
+    _startup_stats.update(
+        artifact_format=model_manager.artifact_format,
+        load_seconds=round(load_time, 4),
+        rss_before_mb=round(rss_before, 2),
+        rss_after_mb=round(_resident_memory_mb(), 2),
+        sklearn_imported="sklearn" in sys.modules,
+    )
+    
     if success:
-        logger.info(f"✅ Model loaded successfully in {load_time:.2f}s")
+        logger.info(
+            f"✅ Model loaded successfully in {load_time:.2f}s "
+            f"({model_manager.artifact_format}, RSS {_startup_stats['rss_after_mb']:.1f} MB)"
+        )
     else:
         logger.warning("⚠️ Model failed to load. Predictions will not work.")
         logger.warning("Please run training script first to train and save the model.")
     
+    global _batcher, _executor, _swapper, _online, _audit, _shadow
+    if success:
+        _executor = InferenceExecutor.from_env(model_manager)
+        logger.info(f"Inference mode: {_executor.mode} ({_executor.workers} workers)")
+    _swapper = ModelSwapper(model_manager, _registry, _executor)
+    poll_seconds = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "0"))
+    if poll_seconds > 0:
+        _swapper.start_watching(poll_seconds)
+        logger.info(f"Watching {_registry.root / 'ACTIVE'} every {poll_seconds:g}s")
+    if success:
+        _online = OnlineUpdater.from_env(model_manager, _registry, _swapper)
+        if _online is not None:
+            logger.info(f"Online learning enabled (snapshot every {_online.publish_every} batches)")
+    _audit = AuditLog.from_env(model_manager, [CLASS_LABELS[i] for i in range(len(CLASS_LABELS))])
+    if _audit is not None:
+        _audit.start()
+        logger.info(
+            f"📝 Audit log enabled in {_audit.directory} "
+            f"({_audit.flush_policy} flush, {_audit.backpressure} when full)"
+        )
+    if success:
+        try:
+            _shadow = ShadowScorer.from_env(model_manager, _registry, [CLASS_LABELS[i] for i in range(len(CLASS_LABELS))])
+            if _shadow is not None:
+                await asyncio.to_thread(_shadow.start)
+                logger.info(f"👥 Shadow scoring with {', '.join(name for name, _ in _shadow.candidates)}")
+        except Exception as e:
+            logger.error(f"❌ Shadow scoring disabled: {e}")
+            _shadow = None
+    if _admission is not None:
+        _admission.start()
+        logger.info(
+            f"🚦 Admission control enabled ({_admission.max_concurrency} concurrent, "
+            f"queue {_admission.max_queue}, target delay {_admission.target * 1000:g} ms)"
+        )
+    _batcher = MicroBatcher.from_env(model_manager, _executor)
+    if _batcher is not None:
+        logger.info(
+            f"Micro-batching enabled (max {_batcher.max_batch_size} rows, "
+            f"{_batcher.window_ms} ms window)"
+        )
+    
     yield
+    
+    _online = None
+    if _shadow is not None:
+        await asyncio.to_thread(_shadow.close)
+        _shadow = None
+    if _admission is not None:
+        await _admission.close()
+    await _swapper.close()
+    if _audit is not None:
+        await _audit.close()
+        _audit = None
+    _swapper = None
+    if _batcher is not None:
+        await _batcher.close()
+        _batcher = None
+    _executor.shutdown()
+    _executor = InferenceExecutor(model_manager)
     logger.info("👋 Shutting down...")
 
 
@@ -82,6 +243,15 @@ _allowed_origins = [
 
 logger.info(f"CORS allowed origins: {_allowed_origins}")
 
+# Added before CORS so that 503s from load shedding still carry CORS headers
+if _admission is not None:
+    _admission_paths = os.getenv("ADMISSION_PATHS")
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=_admission,
+        **({"paths": [p.strip() for p in _admission_paths.split(",") if p.strip()]} if _admission_paths else {}),
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=_allowed_origins,
@@ -98,10 +268,33 @@ async def health_check():
     return HealthResponse(
         status="healthy" if model_manager.is_loaded else "degraded",
         model_loaded=model_manager.is_loaded,
-        version="1.0.0"
+        version="1.0.0",
+        model_version=model_manager.version,
+        cache=model_manager.cache.stats(),
+        startup=_startup_stats or None,
+        batching=_batcher.stats() if _batcher is not None else None,
+        admission=_admission.stats() if _admission is not None else None
     )
 
 
+@app.get("/ready", response_model=ReadinessResponse, tags=["Health"])
+async def readiness_check(response: Response):
+    """
+    Readiness for prediction traffic.
+    
+    Returns 503 while the model is not loaded or admission control is
+    shedding load, so a load balancer can route requests elsewhere. Unlike
+    `/` (liveness), this should not be used to restart the container.
+    """
+    overloaded = _admission is not None and _admission.overloaded
+    ready = model_manager.is_loaded and not overloaded
+    if not ready:
+        response.status_code = 503
+        if overloaded:
+            response.headers["Retry-After"] = str(_admission.retry_after_seconds())
+    return ReadinessResponse(ready=ready, model_loaded=model_manager.is_loaded, overloaded=overloaded)
+
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
 async def predict(request: PredictionRequest):
     """
@@ -127,6 +320,7 @@ async def predict(request: PredictionRequest):
     ```
     """
     if not model_manager.is_loaded:
+        count_request("/predict", 503)
         raise HTTPException(
             status_code=503,
             detail="Model not loaded. Please run training script first."
@@ -134,28 +328,637 @@ async def predict(request: PredictionRequest):
     
     try:
         # Convert request to feature array
+        start = now()
         features = request.to_feature_array()
+        observe_stage("to_feature_array", start)
         
-        # Get prediction
-        class_id, confidence, probabilities = model_manager.predict(features)
+        # Get prediction, coalesced with concurrent requests when enabled
+        if _batcher is not None:
+            class_id, confidence, probabilities = await _batcher.submit(features)
+        else:
+            class_id, confidence, probabilities = await _executor.predict(features)
+        _drift.observe(features, class_id, confidence)
+        if _audit is not None:
+            await _audit.record(pack_answers(features), class_id, probabilities, "predict")
+        if _shadow is not None:
+            _shadow.submit(features, class_id, probabilities)
         
         # Build response
-        return PredictionResponse(
-            prediction=model_manager.get_class_label(class_id),
+        start = now()
+        label = model_manager.get_class_label(class_id)
+        response = PredictionResponse(
+            prediction=label,
             severity_level=class_id,
             confidence=round(confidence, 4),
             probabilities={k: round(v, 4) for k, v in probabilities.items()},
             description=model_manager.get_class_description(class_id)
         )
+        observe_stage("response", start)
+        count_prediction(label)
+        count_request("/predict", 200)
+        return response
         
     except ValueError as e:
         logger.warning(f"Validation error: {e}")
+        count_request("/predict", 400)
         raise HTTPException(status_code=400, detail="Invalid input data. Please check your responses.")
     except Exception as e:
         logger.error(f"Prediction failed: {e}", exc_info=True)
+        count_request("/predict", 500)
         raise HTTPException(status_code=500, detail="An error occurred while processing your request. Please try again.")
 
 
+@app.post(
+    "/predict/compact",
+    response_model=PredictionResponse,
+    tags=["Prediction"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "oneOf": [
+                            {"type": "array", "items": {"type": "integer", "minimum": 1, "maximum": 4},
+                             "minItems": 30, "maxItems": 30},
+                            {"type": "string", "pattern": "^[1-4]{30}$"},
+                            {"type": "object", "properties": {"answers": {}}, "required": ["answers"]},
+                        ]
+                    },
+                    "example": "211212112111211212112111211121",
+                },
+                "text/plain": {
+                    "schema": {"type": "string", "pattern": "^[1-4]{30}$"},
+                    "example": "211212112111211212112111211121",
+                },
+            },
+        }
+    },
+)
+async def predict_compact(request: Request):
+    """
+    Make a prediction from a compact answer encoding.
+    
+    Accepts the 30 answers (q1-q30 order) as a JSON array, as a 30-character
+    answer string such as `"2112..."` (JSON string or `text/plain`), or as
+    `{"answers": ...}` with either form. Answers are validated once in a
+    vectorized check and the response is serialized with a fast JSON encoder.
+    The response body matches `/predict`.
+    """
+    if not model_manager.is_loaded:
+        count_request("/predict/compact", 503)
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run training script first."
+        )
+    
+    start = now()
+    try:
+        answers = parse_compact(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        count_request("/predict/compact", 400)
+        raise HTTPException(status_code=400, detail=f"Invalid input data: {e}")
+    observe_stage("validation", start)
+    
+    try:
+        if _batcher is not None:
+            class_id, confidence, probabilities = await _batcher.submit(answers.tolist())
+        else:
+            class_id, confidence, probabilities = await _executor.predict_answers(answers)
+        _drift.observe(answers, class_id, confidence)
+        if _audit is not None:
+            await _audit.record(pack_array(answers), class_id, probabilities, "predict_compact")
+        if _shadow is not None:
+            _shadow.submit(answers, class_id, probabilities)
+        
+        start = now()
+        label = model_manager.get_class_label(class_id)
+        body = fast_dumps({
+            "prediction": label,
+            "severity_level": class_id,
+            "confidence": round(confidence, 4),
+            "probabilities": {k: round(v, 4) for k, v in probabilities.items()},
+            "description": model_manager.get_class_description(class_id),
+            "disclaimer": DISCLAIMER,
+        })
+        observe_stage("response", start)
+        count_prediction(label)
+        count_request("/predict/compact", 200)
+        return Response(content=body, media_type="application/json")
+    
+    except Exception as e:
+        logger.error(f"Prediction failed: {e}", exc_info=True)
+        count_request("/predict/compact", 500)
+        raise HTTPException(status_code=500, detail="An error occurred while processing your request. Please try again.")
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    """Summarize pydantic validation errors for a single batch row."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+@app.post("/predict/partial", response_model=PartialPredictionResponse, tags=["Prediction"])
+async def predict_partial(request: PartialPredictionRequest):
+    """
+    Score a partially answered questionnaire.
+    
+    Submit any subset of q1-q30. Because every answer is 1-4, the final
+    class logits of the linear model lie within computable bounds; the
+    response says whether the predicted class is already fixed (``final``)
+    so a client can stop asking, which classes are still reachable, and
+    which open question to ask next. Requires the linear model.
+    """
+    if not model_manager.is_loaded:
+        count_request("/predict/partial", 503)
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run training script first."
+        )
+    
+    try:
+        score = model_manager.score_partial(request.to_partial_array())
+    except UnsupportedModelError as e:
+        count_request("/predict/partial", 501)
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        count_request("/predict/partial", 400)
+        raise HTTPException(status_code=400, detail="Invalid input data. Please check your responses.")
+    
+    class_keys = [CLASS_LABELS[i].lower() for i in range(len(score.logit_low))]
+    count_request("/predict/partial", 200)
+    return PartialPredictionResponse(
+        prediction=model_manager.get_class_label(score.prediction),
+        severity_level=score.prediction,
+        confidence=round(score.confidence, 4),
+        probabilities={k: round(v, 4) for k, v in score.probabilities.items()},
+        final=score.final,
+        reachable=[model_manager.get_class_label(c) for c in score.reachable],
+        logit_range={
+            k: [round(float(lo), 4), round(float(hi), 4)]
+            for k, lo, hi in zip(class_keys, score.logit_low, score.logit_high)
+        },
+        answered=score.answered,
+        next_question=f"q{score.next_question + 1}" if score.next_question is not None else None,
+    )
+
+
+@app.post("/explain", response_model=ExplanationResponse, tags=["Prediction"])
+async def explain(
+    request: PredictionRequest,
+    top: int = Query(30, ge=1, le=30, description="Number of most influential questions to return"),
+):
+    """
+    Predict and explain which questions drove the result.
+    
+    For the linear model, each question's contribution is its coefficient ×
+    the scaled answer, read from a precomputed per-answer table, so this
+    costs about the same as /predict. Other models are explained by
+    replacing one answer at a time with the average answer (31 rows scored
+    in one call). Questions are ranked by the absolute contribution to the
+    predicted class.
+    """
+    if not model_manager.is_loaded:
+        count_request("/explain", 503)
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run training script first."
+        )
+    
+    try:
+        features = request.to_feature_array()
+        explanation = await _executor.explain(features)
+        if _audit is not None:
+            await _audit.record(pack_answers(features), explanation.prediction, explanation.probabilities, "explain")
+        
+        start = now()
+        class_id = explanation.prediction
+        class_keys = [CLASS_LABELS[i].lower() for i in range(explanation.contributions.shape[1])]
+        toward = explanation.contributions[:, class_id]
+        ranked = np.argsort(-np.abs(toward), kind="stable")[:top]
+        item_names = model_manager.feature_names or [f"q{i}" for i in range(1, 31)]
+        
+        response = ExplanationResponse(
+            prediction=model_manager.get_class_label(class_id),
+            severity_level=class_id,
+            confidence=round(explanation.confidence, 4),
+            probabilities={k: round(v, 4) for k, v in explanation.probabilities.items()},
+            description=model_manager.get_class_description(class_id),
+            method=explanation.method,
+            base=(
+                {k: round(float(v), 4) for k, v in zip(class_keys, explanation.base)}
+                if explanation.base is not None else None
+            ),
+            contributions=[
+                QuestionContribution(
+                    question=f"q{j + 1}",
+                    item=item_names[j],
+                    text=QUESTION_TEXTS[j],
+                    answer=int(features[j]),
+                    contribution=round(float(toward[j]), 4),
+                    contributions={k: round(float(v), 4) for k, v in zip(class_keys, explanation.contributions[j])},
+                )
+                for j in ranked
+            ],
+        )
+        observe_stage("response", start)
+        count_request("/explain", 200)
+        return response
+        
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        count_request("/explain", 400)
+        raise HTTPException(status_code=400, detail="Invalid input data. Please check your responses.")
+    except Exception as e:
+        logger.error(f"Explanation failed: {e}", exc_info=True)
+        count_request("/explain", 500)
+        raise HTTPException(status_code=500, detail="An error occurred while processing your request. Please try again.")
+
+
+def _sensitivity_changes(perturbations, features: list, class_id: int) -> list:
+    """Convert one Perturbations block of a sensitivity sweep to SensitivityChange dicts."""
+    answers = np.asarray(features, dtype=int)
+    steps = np.abs(perturbations.values - answers[perturbations.questions]).sum(axis=1)
+    labels = {c: model_manager.get_class_label(c) for c in np.unique(perturbations.classes).tolist()}
+    return [
+        {
+            "changes": {f"q{q + 1}": v for q, v in zip(questions, values)},
+            "step": step,
+            "prediction": labels[c],
+            "severity_level": c,
+            "confidence": round(confidence, 4),
+            "margin": round(margin, 4),
+            "flip": c != class_id,
+        }
+        for questions, values, step, c, confidence, margin in zip(
+            perturbations.questions.tolist(), perturbations.values.tolist(), steps.tolist(),
+            perturbations.classes.tolist(), perturbations.confidences.tolist(), perturbations.margins.tolist(),
+        )
+    ]
+
+
+@app.post("/sensitivity", response_model=SensitivityResponse, tags=["Prediction"])
+async def sensitivity(request: SensitivityRequest):
+    """
+    Show which answer changes would alter the screening result.
+    
+    Scores every other answer to each of the 30 questions (90 changes)
+    and, for the questions listed in ``pairs``, every combination of
+    other answers to two of them, all in one vectorized pass. For the
+    linear model each change only swaps entries of the precomputed logit
+    table, so the sweep costs about as much as /predict. Every result
+    carries its margin from the class boundary; ``flips`` lists the
+    changes that alter the predicted class. The response is serialized
+    with the fast JSON encoder used by /predict/compact.
+    """
+    if not model_manager.is_loaded:
+        count_request("/sensitivity", 503)
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run training script first."
+        )
+    
+    try:
+        features = request.to_feature_array()
+        result = await _executor.sensitivity(features, request.pair_indices())
+        if _audit is not None:
+            await _audit.record(pack_answers(features), result.prediction, result.probabilities, "sensitivity")
+        
+        start = now()
+        class_id = result.prediction
+        singles = _sensitivity_changes(result.singles, features, class_id)
+        pairs = _sensitivity_changes(result.pairs, features, class_id)
+        flips = sorted(
+            (change for change in singles + pairs if change["flip"]),
+            key=lambda change: (change["step"], -change["margin"]),
+        )
+        
+        body = fast_dumps({
+            "prediction": model_manager.get_class_label(class_id),
+            "severity_level": class_id,
+            "confidence": round(result.confidence, 4),
+            "probabilities": {k: round(v, 4) for k, v in result.probabilities.items()},
+            "description": model_manager.get_class_description(class_id),
+            "margin": round(result.margin, 4),
+            "method": result.method,
+            "stable": not flips,
+            "min_flip_step": flips[0]["step"] if flips else None,
+            "flips": flips,
+            "singles": singles,
+            "pairs": pairs,
+            "disclaimer": DISCLAIMER,
+        })
+        observe_stage("response", start)
+        count_request("/sensitivity", 200)
+        return Response(content=body, media_type="application/json")
+        
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        count_request("/sensitivity", 400)
+        raise HTTPException(status_code=400, detail="Invalid input data. Please check your responses.")
+    except Exception as e:
+        logger.error(f"Sensitivity sweep failed: {e}", exc_info=True)
+        count_request("/sensitivity", 500)
+        raise HTTPException(status_code=500, detail="An error occurred while processing your request. Please try again.")
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
+async def predict_batch(request: BatchPredictionRequest):
+    """
+    Make predictions for many questionnaires in a single call.
+    
+    Each item takes the same q1-q30 fields as `/predict`. Rows are validated
+    individually: invalid rows are reported with an `error` and do not fail
+    the rest of the batch. All valid rows are scored in one vectorized pass.
+    """
+    if not model_manager.is_loaded:
+        count_request("/predict/batch", 503)
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run training script first."
+        )
+    
+    results = [None] * len(request.items)
+    valid_indices = []
+    valid_features = []
+    
+    # Validate each row on its own so one bad row does not fail the batch
+    start = now()
+    for index, item in enumerate(request.items):
+        try:
+            row = PredictionRequest.model_validate(item, context=UNTIMED)
+        except ValidationError as e:
+            results[index] = BatchPredictionItem(index=index, error=_format_validation_error(e))
+            continue
+        valid_indices.append(index)
+        valid_features.append(row.to_feature_array())
+    observe_stage("validation", start)
+    
+    try:
+        if valid_features:
+            X = np.array(valid_features)
+            classes, confidences, probabilities = await _executor.predict_batch(X)
+            _drift.observe_batch(X, classes, confidences)
+            if _audit is not None:
+                await _audit.record_batch(pack_rows(X).astype(np.uint64), classes, probabilities, "predict_batch")
+            if _shadow is not None:
+                _shadow.submit_batch(X, classes, probabilities)
+            for index, class_id, confidence, row_probs in zip(
+                valid_indices, classes.tolist(), confidences.tolist(), probabilities
+            ):
+                label = model_manager.get_class_label(class_id)
+                count_prediction(label)
+                results[index] = BatchPredictionItem(
+                    index=index,
+                    prediction=label,
+                    severity_level=class_id,
+                    confidence=round(confidence, 4),
+                    probabilities={
+                        k: round(v, 4) for k, v in model_manager.probabilities_to_dict(row_probs).items()
+                    },
+                    description=model_manager.get_class_description(class_id)
+                )
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        count_request("/predict/batch", 400)
+        raise HTTPException(status_code=400, detail="Invalid input data. Please check your responses.")
+    except Exception as e:
+        logger.error(f"Batch prediction failed: {e}", exc_info=True)
+        count_request("/predict/batch", 500)
+        raise HTTPException(status_code=500, detail="An error occurred while processing your request. Please try again.")
+    
+    count_request("/predict/batch", 200)
+    return BatchPredictionResponse(
+        results=results,
+        total=len(results),
+        succeeded=len(valid_indices),
+        failed=len(results) - len(valid_indices)
+    )
+
+
+def _observe_bulk_chunk(X: np.ndarray, classes: np.ndarray, confidences: np.ndarray, probabilities: np.ndarray) -> None:
+    """Feed a scored bulk chunk to the drift monitor and audit log (runs in a worker thread)."""
+    _drift.observe_batch(X, classes, confidences)
+    if _audit is not None:
+        _audit.record_batch_blocking(X, classes, probabilities, "predict_bulk")
+
+
+@app.post("/predict/bulk", tags=["Prediction"])
+async def predict_bulk(
+    file: UploadFile = File(..., description="NDJSON, CSV or TSV file of questionnaire responses"),
+    upload_format: str = Query(None, alias="format", description=f"Upload format ({', '.join(BULK_FORMATS)}); guessed from the filename if omitted"),
+    chunk_size: int = Query(1000, ge=1, le=MAX_BATCH_SIZE, description="Rows scored per model call"),
+):
+    """
+    Score a large upload and stream results back as NDJSON.
+    
+    Rows are parsed incrementally and scored in chunks of `chunk_size`, so
+    memory use stays flat regardless of the upload size. CSV/TSV files need
+    a header naming `q1`-`q30` or the DASS answer columns (`Q1A`, `Q3A`, ...),
+    so the raw DASS export can be uploaded as-is. NDJSON lines may be objects
+    with the same keys or 30-element arrays.
+    
+    Each output line is either a prediction for the row or `{"row": n, "error": ...}`.
+    """
+    if not model_manager.is_loaded:
+        count_request("/predict/bulk", 503)
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please run training script first."
+        )
+    
+    fmt = (upload_format or detect_format(file.filename, file.content_type)).lower()
+    try:
+        # Parse the header eagerly so a bad upload fails with 400, not mid-stream
+        rows = open_reader(file.file, fmt, model_manager.feature_names)
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.warning(f"Bulk upload rejected: {e}")
+        count_request("/predict/bulk", 400)
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {e}")
+    
+    # Row errors are reported in the stream; the response itself is a 200
+    count_request("/predict/bulk", 200)
+    return StreamingResponse(
+        score_rows(rows, model_manager, chunk_size, observe=_observe_bulk_chunk),
+        media_type="application/x-ndjson"
+    )
+
+
+def _cache_metrics():
+    """Expose prediction cache counters at scrape time."""
+    stats = model_manager.cache.stats()
+    for name in ("hits", "misses", "evictions", "invalidations"):
+        yield f"# HELP pdd_cache_{name}_total Prediction cache {name}"
+        yield f"# TYPE pdd_cache_{name}_total counter"
+        yield f"pdd_cache_{name}_total {stats[name]}"
+    yield "# HELP pdd_cache_size Entries in the prediction cache"
+    yield "# TYPE pdd_cache_size gauge"
+    yield f"pdd_cache_size {stats['size']}"
+
+
+metrics_registry.add_collector(_cache_metrics)
+metrics_registry.add_collector(_drift.render_metrics)
+
+
+def _audit_metrics():
+    """Expose audit log counters at scrape time, when enabled."""
+    if _audit is not None:
+        yield from _audit.render_metrics()
+
+
+metrics_registry.add_collector(_audit_metrics)
+if _admission is not None:
+    metrics_registry.add_collector(_admission.render_metrics)
+
+
+def _shadow_metrics():
+    """Expose shadow scoring counters at scrape time, when enabled."""
+    if _shadow is not None:
+        yield from _shadow.render_metrics()
+
+
+metrics_registry.add_collector(_shadow_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Monitoring"])
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms and prediction counters."""
+    if not metrics_registry.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0).")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/drift", response_model=DriftResponse, tags=["Monitoring"])
+async def drift(histograms: bool = Query(False, description="Include the normalized live histograms")):
+    """
+    Compare live traffic with the training data of the served model.
+    
+    Reports the population stability index (PSI) of every question's answer
+    distribution, of the predicted classes and of the prediction confidence,
+    for all traffic since startup (`total`) and for an exponentially decayed
+    window (`recent`, half-life `DRIFT_HALF_LIFE` questionnaires). A drift
+    score below 0.1 is `stable`, up to 0.25 `moderate` and above that `major`.
+    Scores are null until the model has a `drift_reference.json` (written by
+    `ml/train.py`) and some traffic has been scored.
+    """
+    if not _drift.enabled:
+        raise HTTPException(status_code=404, detail="Drift monitoring is disabled (DRIFT_MONITOR=0).")
+    return DriftResponse(**_drift.report(histograms=histograms))
+
+
+def _require_admin(token: str) -> None:
+    """Reject admin calls unless ADMIN_TOKEN is set and matches."""
+    if not _admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (set ADMIN_TOKEN).")
+    if not hmac.compare_digest(token.encode(), _admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+@app.get("/admin/models", response_model=ModelRegistryResponse, tags=["Admin"])
+async def list_model_versions(x_admin_token: str = Header(default="")):
+    """List model versions in the registry, the active one and hot-swap status."""
+    _require_admin(x_admin_token)
+    if _swapper is None:
+        raise HTTPException(status_code=503, detail="Service is starting up.")
+    active = model_manager.version
+    return ModelRegistryResponse(
+        active_version=active,
+        versions=[
+            ModelVersionInfo(**_registry.describe(version), active=(version == active))
+            for version in _registry.versions()
+        ],
+        swap=_swapper.stats(),
+    )
+
+
+@app.post(
+    "/admin/models/{version}/activate",
+    response_model=ModelSwapResponse,
+    status_code=202,
+    tags=["Admin"],
+)
+async def activate_model_version(version: str, x_admin_token: str = Header(default="")):
+    """
+    Hot-swap the serving model to a registry version.
+    
+    The version is loaded and warmed up in the background while the current
+    model keeps serving, then swapped in atomically; in-flight requests
+    finish on the old version. Poll `GET /admin/models` for the outcome.
+    """
+    _require_admin(x_admin_token)
+    if _swapper is None:
+        raise HTTPException(status_code=503, detail="Service is starting up.")
+    try:
+        _registry.model_path(version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Model version {version!r} not found.")
+    if _swapper.busy:
+        raise HTTPException(status_code=409, detail="A model swap is already in progress.")
+    
+    logger.info(f"🔁 Swapping to model version {version}...")
+    _swapper.start_swap(version)
+    return ModelSwapResponse(status="accepted", version=version)
+
+
+@app.get("/admin/shadow", response_model=ShadowResponse, tags=["Admin"])
+async def shadow_report(x_admin_token: str = Header(default="")):
+    """
+    Compare shadow candidate models with the served predictions.
+    
+    Live requests are copied to a bounded queue and scored in the background
+    by the SHADOW_MODELS candidates; rows are dropped (and counted) rather
+    than delaying responses when the queue is full. Reports agreement,
+    class-flip matrices and scoring latency next to the primary model.
+    """
+    _require_admin(x_admin_token)
+    if _shadow is None:
+        raise HTTPException(status_code=404, detail="Shadow scoring is disabled (set SHADOW_MODELS).")
+    return ShadowResponse(**_shadow.report())
+
+
+@app.post("/admin/online/update", response_model=OnlineUpdateResponse, tags=["Admin"])
+async def online_update(request: OnlineUpdateRequest, x_admin_token: str = Header(default="")):
+    """
+    Update the linear model incrementally with labeled questionnaires.
+    
+    The batch adjusts the scaler statistics and takes a gradient step on the
+    model weights; the cost depends on the batch size only. Every
+    ONLINE_PUBLISH_EVERY batches a snapshot is published to the model
+    registry and hot-swapped in.
+    """
+    _require_admin(x_admin_token)
+    if _online is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Online learning is disabled (set ONLINE_LEARNING=1; requires a multinomial linear model)."
+        )
+    
+    features, labels = [], []
+    for index, item in enumerate(request.items):
+        label = item.get("label")
+        if isinstance(label, bool) or not isinstance(label, int) or label not in CLASS_LABELS:
+            raise HTTPException(status_code=400, detail=f"Item {index}: label must be one of {sorted(CLASS_LABELS)}")
+        try:
+            row = PredictionRequest.model_validate(item, context=UNTIMED)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Item {index}: {_format_validation_error(e)}")
+        features.append(row.to_feature_array())
+        labels.append(label)
+    
+    try:
+        result = await _online.update(np.array(features), np.array(labels))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result["published_version"]:
+        logger.info(f"📈 Online update published as {result['published_version']}")
+    return OnlineUpdateResponse(**result)
+
+
 # OpenAPI customization for better docs
 app.openapi_tags = [
     {
@@ -165,5 +968,13 @@ app.openapi_tags = [
     {
         "name": "Prediction", 
         "description": "Mental health screening prediction endpoints"
+    },
+    {
+        "name": "Monitoring",
+        "description": "Operational metrics for scraping"
+    },
+    {
+        "name": "Admin",
+        "description": "Model registry and zero-downtime model swaps (requires X-Admin-Token)"
     }
 ]
@@ -2,13 +2,19 @@
 Model loading and inference module.
 """
 
+import itertools
 import json
 import logging
+import os
 from pathlib import Path
-from typing import Tuple, Dict, Optional
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
 
 import numpy as np
-import joblib
+
+from .artifact import is_current, load_npz
+from .cache import PredictionCache, pack_answers, pack_array, unpack_answers
+from .engine import LinearEngine, TreeEngine
+from .metrics import now, observe_stage
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -52,65 +58,322 @@ else:
     }
 
 
+class UnsupportedModelError(ValueError):
+    """The loaded model type does not support the requested operation."""
+
+
+class ModelState(NamedTuple):
+    """One loaded model version; replaced as a whole on every (re)load."""
+    model: Any
+    scaler: Any
+    engine: Optional[Union[LinearEngine, TreeEngine]]
+    feature_names: list
+    artifact_format: str  # "npz" or "joblib"
+    model_path: Path  # Path passed to load()
+    version: Optional[str]
+
+
+class Explanation(NamedTuple):
+    """Per-question breakdown of one prediction (see ModelManager.explain)."""
+    prediction: int
+    confidence: float
+    probabilities: Dict[str, float]
+    contributions: np.ndarray  # (30, n_classes), one row per question
+    base: Optional[np.ndarray]  # Class logits at the mean answers (linear models only)
+    method: str  # "linear" or "occlusion"
+
+
+class PartialScore(NamedTuple):
+    """Where a partially answered questionnaire can still end up (see ModelManager.score_partial)."""
+    prediction: int  # Most likely class if open questions get the mean answer
+    confidence: float
+    probabilities: Dict[str, float]
+    logit_low: np.ndarray  # (n_classes,) smallest reachable logit per class
+    logit_high: np.ndarray  # (n_classes,) largest reachable logit per class
+    reachable: list  # Classes that some completion may still produce
+    final: bool  # True if every completion yields the same class
+    next_question: Optional[int]  # 0-based index of the most informative open question
+    answered: int
+
+
+class Perturbations(NamedTuple):
+    """Predictions after changing answers of one questionnaire, one row per change."""
+    questions: np.ndarray  # (M, W) 0-based questions changed
+    values: np.ndarray  # (M, W) their new answers
+    classes: np.ndarray  # (M,) predicted class
+    confidences: np.ndarray  # (M,)
+    margins: np.ndarray  # (M,) log(p_best / p_runner_up); 0 on the class boundary
+
+
+class Sensitivity(NamedTuple):
+    """What-if sweep around one prediction (see ModelManager.sensitivity)."""
+    prediction: int
+    confidence: float
+    probabilities: Dict[str, float]
+    margin: float  # Margin of the submitted answers
+    singles: Perturbations  # Every other answer to every question (90 rows)
+    pairs: Perturbations  # Every other answer to two of the chosen questions
+    method: str  # "linear" (table deltas) or "rescore"
+
+
+# ALTERNATIVES[a - 1] holds the three answers other than a
+ALTERNATIVES = np.array([[b for b in range(1, 5) if b != a] for a in range(1, 5)])
+# Question changed by each single-answer perturbation, matching ALTERNATIVES[x - 1].reshape(-1, 1)
+SINGLE_QUESTIONS = np.repeat(np.arange(30), 3)[:, None]
+SINGLE_QUESTIONS.flags.writeable = False  # Shared by every Sensitivity result
+
+
 class ModelManager:
-    """Manages the ML model lifecycle."""
+    """Manages the ML model lifecycle.
+    
+    The loaded model lives in a single immutable ModelState. Predictions
+    read it once per call, so a reload swaps versions atomically: requests
+    already running finish on the state they started with.
+    """
+    
+    def __init__(self, cache_size: Optional[int] = None):
+        if cache_size is None:
+            cache_size = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+        self.cache = PredictionCache(cache_size)  # LRU keyed on packed answers
+        self._state: Optional[ModelState] = None
+        # Memory-map model arrays so worker processes share one physical copy
+        self.mmap = os.getenv("MODEL_MMAP", "1").lower() in ("1", "true", "yes", "on")
+        # Compile linear and tree-ensemble models into NumPy engines
+        self.compile = os.getenv("COMPILED_ENGINE", "1").lower() in ("1", "true", "yes", "on")
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._state is not None
+    
+    @property
+    def model(self):
+        return self._state.model if self._state else None
+    
+    @property
+    def scaler(self):
+        return self._state.scaler if self._state else None
     
-    def __init__(self):
-        self.model = None
-        self.scaler = None  # StandardScaler for feature scaling
-        self.feature_names = None
-        self.is_loaded = False
+    @property
+    def engine(self) -> Optional[Union[LinearEngine, TreeEngine]]:
+        """Compiled engine for linear and tree-ensemble models (see app.engine)."""
+        return self._state.engine if self._state else None
     
-    def load(self, model_path: Optional[Path] = None) -> bool:
-        """Load the trained model and feature names.
+    @property
+    def feature_names(self) -> Optional[list]:
+        return self._state.feature_names if self._state else None
+    
+    @property
+    def artifact_format(self) -> Optional[str]:
+        return self._state.artifact_format if self._state else None
+    
+    @property
+    def model_path(self) -> Optional[Path]:
+        return self._state.model_path if self._state else None
+    
+    @property
+    def version(self) -> Optional[str]:
+        """Registry version of the active model (None outside the registry)."""
+        return self._state.version if self._state else None
+    
+    def load(self, model_path: Optional[Path] = None, version: Optional[str] = None) -> bool:
+        """Load the trained model and feature names and make them active.
+        
+        A native ``.npz`` artifact next to the joblib model (see app.artifact)
+        is preferred because it loads without importing scikit-learn. It is
+        skipped if it was exported from different joblib files. Set
+        MODEL_FORMAT to "joblib" or "npz" to force one format; with
+        COMPILED_ENGINE=0 the joblib model is served through scikit-learn.
+        
+        If loading fails the previously loaded model (if any) stays active.
         
         Args:
-            model_path: Path to model file. If None, uses default location.
+            model_path: Path to model file (.joblib or .npz). If None, uses default location.
+            version: Registry version label reported by the health check
             
         Returns:
             True if model loaded successfully, False otherwise.
         """
+        state = self.build_state(model_path, version)
+        if state is None:
+            return False
+        self.activate(state)
+        return True
+    
+    def build_state(self, model_path: Optional[Path] = None,
+                    version: Optional[str] = None) -> Optional[ModelState]:
+        """Load a model version without activating it (see load()).
+        
+        Returns:
+            The loaded ModelState, or None if loading failed.
+        """
         if model_path is None:
             # Default path relative to this file
             model_path = Path(__file__).parent.parent / "models" / "psychiatric_model.joblib"
         
+        requested_path = model_path
+        model_format = os.getenv("MODEL_FORMAT", "auto").lower()
+        if model_format == "auto" and not self.compile:
+            model_format = "joblib"
+        if model_path.suffix == ".npz":
+            npz_path, model_path = model_path, model_path.with_suffix(".joblib")
+            model_format = "npz"
+        else:
+            npz_path = model_path.with_suffix(".npz")
+        
         features_path = model_path.parent / "feature_names.json"
         
         try:
-            # Load model
-            if not model_path.exists():
-                logger.error(f"Model file not found: {model_path}")
-                return False
-            
-            self.model = joblib.load(model_path)
-            logger.info(f"Model loaded from: {model_path}")
+            loaded = None
+            if model_format != "joblib":
+                loaded = self._load_npz(npz_path, model_path, required=(model_format == "npz"))
+            if loaded is None and model_format != "npz":
+                loaded = self._load_joblib(model_path)
+            if loaded is None:
+                return None
             
             # Load feature names
             if features_path.exists():
                 with open(features_path, 'r') as f:
-                    self.feature_names = json.load(f)
-                logger.info(f"Loaded {len(self.feature_names)} feature names")
+                    feature_names = json.load(f)
+                logger.info(f"Loaded {len(feature_names)} feature names")
             else:
                 # Use default feature order
-                self.feature_names = [f"q{i}" for i in range(1, 31)]
+                feature_names = [f"q{i}" for i in range(1, 31)]
                 logger.warning("Using default feature names")
             
-            # Load scaler (optional - model works without it)
-            scaler_path = model_path.parent / "scaler.joblib"
-            if scaler_path.exists():
-                self.scaler = joblib.load(scaler_path)
-                logger.info(f"Scaler loaded from: {scaler_path}")
-            else:
-                self.scaler = None
-                logger.info("No scaler found - using raw features")
-            
-            self.is_loaded = True
-            return True
+            model, scaler, engine, artifact_format = loaded
+            return ModelState(
+                model=model,
+                scaler=scaler,
+                engine=engine,
+                feature_names=feature_names,
+                artifact_format=artifact_format,
+                model_path=requested_path,
+                version=version,
+            )
             
         except Exception as e:
             logger.error(f"Error loading model: {e}", exc_info=True)
-            self.is_loaded = False
+            return None
+    
+    def activate(self, state: ModelState, cache_entries: Optional[Dict[int, Any]] = None) -> None:
+        """Atomically make state the active model.
+        
+        Cached predictions belong to the previous model, so the cache is
+        reset to cache_entries (see rescore_cache) or emptied.
+        """
+        self._state = state
+        self.cache.reset(cache_entries)
+    
+    def warm_up(self, state: ModelState) -> None:
+        """Run a few predictions through an inactive state so the first
+        requests after a swap do not pay for lazy initialisation."""
+        rows = np.random.default_rng(0).integers(1, 5, size=(16, 30))
+        self._predict_rows(rows, state)
+        for row in rows[:4]:
+            self._predict_one(row, state)
+    
+    def rescore_cache(self, state: ModelState) -> Dict[int, Any]:
+        """Score every currently cached questionnaire with state.
+        
+        Passing the result to activate() keeps the cache warm across a
+        model swap instead of starting from empty.
+        """
+        keys = self.cache.keys()
+        if not keys:
+            return {}
+        X = np.array([unpack_answers(key) for key in keys])
+        classes, confidences, probabilities = self._predict_rows(X, state)
+        return {
+            key: (int(classes[i]), float(confidences[i]), self.probabilities_to_dict(probabilities[i]))
+            for i, key in enumerate(keys)
+        }
+    
+    def _require_state(self) -> ModelState:
+        state = self._state
+        if state is None:
+            raise RuntimeError("Model not loaded. Call load() first.")
+        return state
+    
+    def _load_npz(self, npz_path: Path, model_path: Path, required: bool = False):
+        """Load a native npz artifact; returns None if absent or stale."""
+        if not npz_path.exists():
+            if required:
+                logger.error(f"Native artifact not found: {npz_path}")
+            return None
+        
+        engine, digest, stat = load_npz(npz_path, mmap=self.mmap)
+        if not required and model_path.exists() and not is_current(model_path, digest, stat):
+            logger.warning(f"Native artifact {npz_path.name} is stale - falling back to joblib")
+            return None
+        
+        logger.info(f"Native model loaded from: {npz_path}")
+        return None, None, engine, "npz"
+    
+    def _load_joblib(self, model_path: Path):
+        """Load the pickled scikit-learn model and scaler."""
+        if not model_path.exists():
+            logger.error(f"Model file not found: {model_path}")
+            return None
+        
+        # Imported lazily: unpickling pulls in scikit-learn, which the npz path avoids
+        import joblib
+        
+        # mmap_mode shares large numpy arrays (e.g. SVM support vectors) across
+        # processes; estimators that copy arrays on unpickling still get a copy
+        mmap_mode = 'r' if self.mmap else None
+        model = joblib.load(model_path, mmap_mode=mmap_mode)
+        logger.info(f"Model loaded from: {model_path}")
+        
+        # Load scaler (optional - model works without it)
+        scaler_path = model_path.parent / "scaler.joblib"
+        if scaler_path.exists():
+            scaler = joblib.load(scaler_path, mmap_mode=mmap_mode)
+            logger.info(f"Scaler loaded from: {scaler_path}")
+        else:
+            scaler = None
+            logger.info("No scaler found - using raw features")
+        
+        # Some estimators (e.g. SVC) reject read-only memory-mapped arrays at
+        # predict time; load those into private memory instead
+        if mmap_mode is not None and not self._accepts_readonly_arrays(model, scaler):
+            logger.info("Model cannot predict from memory-mapped arrays - loading into memory")
+            model = joblib.load(model_path)
+            if scaler is not None:
+                scaler = joblib.load(scaler_path)
+        
+        # Fold scaler + linear model into a lookup table, or flatten a tree
+        # ensemble into node arrays, when possible
+        engine = None
+        if self.compile:
+            engine = LinearEngine.from_sklearn(model, scaler)
+            if engine is not None:
+                logger.info("Compiled linear lookup-table engine")
+            else:
+                engine = TreeEngine.from_sklearn(model, scaler)
+                if engine is not None:
+                    logger.info(f"Compiled tree-ensemble engine ({len(engine.roots)} trees)")
+        if engine is None:
+            logger.info("Using scikit-learn inference")
+        
+        return model, scaler, engine, "joblib"
+    
+    @staticmethod
+    def _accepts_readonly_arrays(model, scaler) -> bool:
+        """Smoke-test a freshly loaded model on one row."""
+        X = np.ones((1, 30))
+        if scaler is not None:
+            X = scaler.transform(X)
+        try:
+            if hasattr(model, 'predict_proba'):
+                model.predict_proba(X)
+            else:
+                model.predict(X)
+        except ValueError as e:
+            if "read-only" not in str(e):
+                raise
             return False
+        return True
     
     def predict(self, features: list) -> Tuple[int, float, Dict[str, float]]:
         """Make a prediction using the loaded model.
@@ -125,30 +388,122 @@ class ModelManager:
             RuntimeError: If model is not loaded
             ValueError: If features are invalid
         """
-        if not self.is_loaded or self.model is None:
-            raise RuntimeError("Model not loaded. Call load() first.")
+        # Read the cache generation before the state so a result computed
+        # by a model that is swapped out meanwhile is never cached
+        generation = self.cache.generation
+        state = self._require_state()
+        
+        self.validate_features(features)
+        cached = self.get_cached(features, timed=True)
+        if cached is not None:
+            return cached
+        
+        result = self._predict_one(features, state)
+        self.put_cached(features, result, generation)
+        return result
+    
+    def validate_features(self, features: list) -> None:
+        """Check that features holds 30 values between 1 and 4.
+        
+        Timed as the ``range_check`` stage.
         
-        # Validate input
+        Raises:
+            ValueError: If features are invalid
+        """
+        start = now()
         if len(features) != 30:
             raise ValueError(f"Expected 30 features, got {len(features)}")
         
         for i, val in enumerate(features):
             if not isinstance(val, (int, float)) or val < 1 or val > 4:
                 raise ValueError(f"Feature {i+1} must be between 1 and 4, got {val}")
+        observe_stage("range_check", start)
+    
+    def predict_answers(self, answers: np.ndarray) -> Tuple[int, float, Dict[str, float]]:
+        """Predict for an already validated integer answer vector.
+        
+        Skips the per-value range checks in predict(); callers must have
+        validated that answers holds 30 integers between 1 and 4
+        (see app.compact).
         
+        Args:
+            answers: Integer array of shape (30,)
+            
+        Returns:
+            Tuple of (predicted_class, confidence, probability_dict)
+        """
+        generation = self.cache.generation
+        state = self._require_state()
+        
+        key = pack_array(answers) if self.cache.enabled else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                prediction, confidence, prob_dict = cached
+                return prediction, confidence, dict(prob_dict)
+        
+        result = self._predict_one(answers, state)
+        if key is not None:
+            prediction, confidence, prob_dict = result
+            self.cache.put(key, (prediction, confidence, dict(prob_dict)), generation)
+        return result
+    
+    def get_cached(self, features: list, timed: bool = False) -> Optional[Tuple[int, float, Dict[str, float]]]:
+        """Return a cached prediction for integer answers, or None on a miss.
+        
+        With timed=True the lookup is recorded as the ``cache_lookup`` stage.
+        """
+        start = now()
+        key = pack_answers(features) if self.cache.enabled else None
+        cached = self.cache.get(key) if key is not None else None
+        if timed:
+            observe_stage("cache_lookup", start)
+        if cached is None:
+            return None
+        prediction, confidence, prob_dict = cached
+        return prediction, confidence, dict(prob_dict)
+    
+    def put_cached(self, features: list, result: Tuple[int, float, Dict[str, float]],
+                   generation: Optional[int] = None) -> None:
+        """Store a prediction for integer answers in the cache.
+        
+        Pass the cache generation read before scoring so results from a
+        model that has since been swapped out are dropped.
+        """
+        key = pack_answers(features) if self.cache.enabled else None
+        if key is not None:
+            prediction, confidence, prob_dict = result
+            self.cache.put(key, (prediction, confidence, dict(prob_dict)), generation)
+    
+    def _predict_one(self, features: list, state: ModelState) -> Tuple[int, float, Dict[str, float]]:
+        """Score one validated feature vector without consulting the cache."""
         # Convert to numpy array
         X = np.array([features])
+        engine, model = state.engine, state.model
+        
+        if engine is not None:
+            # Compiled path: table lookups and a softmax, no sklearn call
+            start = now()
+            probabilities = engine.predict_proba(X)[0]
+            prediction = int(engine.classes[probabilities.argmax()])
+            confidence = float(max(probabilities))
+            observe_stage("inference", start)
+            return prediction, confidence, self.probabilities_to_dict(probabilities)
         
         # Apply scaler if available
-        if self.scaler is not None:
-            X = self.scaler.transform(X)
+        if state.scaler is not None:
+            start = now()
+            X = state.scaler.transform(X)
+            observe_stage("scaler_transform", start)
         
         # Get prediction
-        prediction = int(self.model.predict(X)[0])
+        start = now()
+        prediction = int(model.predict(X)[0])
         
         # Get probabilities
-        if hasattr(self.model, 'predict_proba'):
-            probabilities = self.model.predict_proba(X)[0]
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(X)[0]
+            observe_stage("inference", start)
             confidence = float(max(probabilities))
             
             # Validate probability array length matches class labels
@@ -166,11 +521,288 @@ class ModelManager:
             }
         else:
             # Model doesn't support probability prediction
+            observe_stage("inference", start)
             confidence = 1.0
             prob_dict = {CLASS_LABELS[prediction].lower(): 1.0}
         
         return prediction, confidence, prob_dict
     
+    def predict_batch(self, X) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Make predictions for many questionnaires in one vectorized pass.
+        
+        The scaler and model are each called once for the whole batch and
+        the predicted class is derived from the argmax of the probabilities.
+        
+        Args:
+            X: Array-like of shape (N, 30) with feature values (1-4)
+            
+        Returns:
+            Tuple of (predicted_classes, confidences, probabilities) where
+            probabilities has shape (N, n_classes)
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            ValueError: If features are invalid
+        """
+        state = self._require_state()
+        
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != 30:
+            raise ValueError(f"Expected array of shape (N, 30), got {X.shape}")
+        
+        invalid = ~np.isfinite(X) | (X < 1) | (X > 4)
+        if invalid.any():
+            row, col = np.argwhere(invalid)[0]
+            raise ValueError(f"Row {row}: feature {col+1} must be between 1 and 4, got {X[row, col]}")
+        
+        return self._predict_rows(X, state)
+    
+    def _predict_rows(self, X: np.ndarray, state: ModelState) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Score a validated (N, 30) array with state."""
+        if len(X) == 0:
+            return np.empty(0, dtype=int), np.empty(0), np.empty((0, len(CLASS_LABELS)))
+        
+        engine, model = state.engine, state.model
+        if isinstance(engine, TreeEngine) and model is not None and len(X) >= engine.sklearn_min_rows:
+            # Identical results; scikit-learn's per-row loop wins on large batches
+            engine = None
+        if engine is not None:
+            probabilities = engine.predict_proba(X)
+            best = probabilities.argmax(axis=1)
+            predictions = engine.classes[best].astype(int)
+            return predictions, probabilities[np.arange(len(best)), best], probabilities
+        
+        # Apply scaler if available
+        if state.scaler is not None:
+            X = state.scaler.transform(X)
+        
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(X)
+            if probabilities.shape[1] != len(CLASS_LABELS):
+                logger.error(
+                    f"Probability length mismatch: got {probabilities.shape[1]}, "
+                    f"expected {len(CLASS_LABELS)}"
+                )
+                raise ValueError("Model output does not match expected class count")
+            
+            best = probabilities.argmax(axis=1)
+            classes = np.asarray(getattr(model, 'classes_', np.arange(len(CLASS_LABELS))))
+            predictions = classes[best].astype(int)
+            confidences = probabilities[np.arange(len(best)), best]
+        else:
+            # Model doesn't support probability prediction - use one-hot rows
+            predictions = np.asarray(model.predict(X)).astype(int)
+            confidences = np.ones(len(predictions))
+            probabilities = np.zeros((len(predictions), len(CLASS_LABELS)))
+            probabilities[np.arange(len(predictions)), predictions] = 1.0
+        
+        return predictions, confidences, probabilities
+    
+    def explain(self, features: list) -> Explanation:
+        """Explain a prediction question by question.
+        
+        Linear models report exact logit contributions (coefficient × scaled
+        answer) read from the engine's precomputed table, so explaining costs
+        about as much as predicting. Other models fall back to occlusion:
+        each answer is replaced by the mean training answer and the change in
+        log-probability is reported. The original and the 30 occluded rows
+        are scored in one vectorized call, which bounds the cost.
+        
+        Args:
+            features: List of 30 integer answers (1-4)
+            
+        Returns:
+            Explanation with contributions of shape (30, n_classes)
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            ValueError: If features are invalid
+        """
+        state = self._require_state()
+        
+        x = np.asarray(features, dtype=float)
+        if x.shape != (30,):
+            raise ValueError(f"Expected 30 features, got {x.size}")
+        if not np.isfinite(x).all() or (x < 1).any() or (x > 4).any() or (x != np.round(x)).any():
+            raise ValueError("Features must be integers between 1 and 4")
+        
+        if isinstance(state.engine, LinearEngine):
+            classes, confidences, probabilities = self._predict_rows(x[None, :], state)
+            contributions = state.engine.contributions(x)
+            base, method = state.engine.intercept, "linear"
+        else:
+            reference = getattr(state.scaler, 'mean_', getattr(state.engine, 'mean', None))
+            # Without a scaler the engine's mean is all zeros, not an answer;
+            # occlude such questions with the midpoint answer instead
+            reference = np.full(30, 2.5) if reference is None else np.asarray(reference, dtype=float)
+            reference = np.where((reference >= 1) & (reference <= 4), reference, 2.5)
+            rows = np.repeat(x[None, :], 31, axis=0)
+            rows[np.arange(1, 31), np.arange(30)] = reference
+            classes, confidences, probabilities = self._predict_rows(rows, state)
+            log_proba = np.log(np.clip(probabilities, 1e-12, None))
+            contributions = log_proba[0] - log_proba[1:]
+            base, method = None, "occlusion"
+        
+        return Explanation(
+            prediction=int(classes[0]),
+            confidence=float(confidences[0]),
+            probabilities=self.probabilities_to_dict(probabilities[0]),
+            contributions=contributions,
+            base=base,
+            method=method,
+        )
+    
+    def score_partial(self, answers: list) -> PartialScore:
+        """Score a partially answered questionnaire with bounds on the outcome.
+        
+        With a linear model every answer adds one bounded term per class
+        logit, so the final class is known as soon as one class beats every
+        other for all possible remaining answers. Classes are ruled out
+        pairwise, so ``reachable`` may keep a class that no completion
+        actually produces; ``final`` is exact. The suggested next question
+        is the open one that can move the margins between the still
+        reachable classes the most.
+        
+        Args:
+            answers: 30 entries, integers 1-4 or None for unanswered questions
+            
+        Returns:
+            PartialScore
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            UnsupportedModelError: If the active model is not linear
+            ValueError: If answers are invalid
+        """
+        state = self._require_state()
+        engine = state.engine
+        if not isinstance(engine, LinearEngine):
+            raise UnsupportedModelError("Partial scoring requires a linear model")
+        
+        if len(answers) != 30:
+            raise ValueError(f"Expected 30 entries, got {len(answers)}")
+        answered = np.array([value is not None for value in answers])
+        x = np.array([value if value is not None else 1 for value in answers], dtype=float)
+        if not np.isfinite(x).all() or (x < 1).any() or (x > 4).any() or (x != np.round(x)).any():
+            raise ValueError("Answers must be integers between 1 and 4")
+        
+        logits, low, high, margin_low, margin_width = engine.bounds(x.astype(np.intp), answered)
+        probabilities = engine.proba_from_logits(logits[None, :])[0]
+        best = int(probabilities.argmax())
+        
+        # Class c is out once some class d beats it for every completion
+        beaten = margin_low > 0
+        reachable = [c for c in range(len(logits)) if not beaten[:, c].any()]
+        final = len(reachable) == 1
+        
+        next_question = None
+        if not final and not answered.all():
+            pairs = np.ix_(reachable, reachable)
+            spread = np.array([width[pairs].sum() for width in margin_width])
+            spread[answered] = -1.0
+            next_question = int(spread.argmax())
+        
+        return PartialScore(
+            prediction=int(engine.classes[best]),
+            confidence=float(probabilities[best]),
+            probabilities=self.probabilities_to_dict(probabilities),
+            logit_low=low,
+            logit_high=high,
+            reachable=[int(engine.classes[c]) for c in reachable],
+            final=final,
+            next_question=next_question,
+            answered=int(answered.sum()),
+        )
+    
+    def sensitivity(self, features: list, pair_questions=()) -> Sensitivity:
+        """Score every single-answer change, and optionally answer pairs.
+        
+        All changes are scored in one vectorized pass. With a linear model
+        a change only swaps the changed questions' entries in the logit
+        table (see LinearEngine.changed_logits), so the 90 single changes
+        cost about as much as one prediction. Other models rescore the
+        changed questionnaires in a single batch call.
+        
+        Args:
+            features: List of 30 integer answers (1-4)
+            pair_questions: 0-based questions whose answers are also changed
+                two at a time (9 combinations for each pair)
+            
+        Returns:
+            Sensitivity
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            ValueError: If features or pair_questions are invalid
+        """
+        state = self._require_state()
+        
+        x = np.asarray(features, dtype=float)
+        if x.shape != (30,):
+            raise ValueError(f"Expected 30 features, got {x.size}")
+        if not np.isfinite(x).all() or (x < 1).any() or (x > 4).any() or (x != np.round(x)).any():
+            raise ValueError("Features must be integers between 1 and 4")
+        chosen = [int(q) for q in pair_questions]
+        if any(q < 0 or q >= 30 for q in chosen) or len(set(chosen)) != len(chosen):
+            raise ValueError("Pair questions must be distinct indices between 0 and 29")
+        x = x.astype(np.intp)
+        
+        alternatives = ALTERNATIVES[x - 1]  # (30, 3)
+        single_values = alternatives.reshape(-1, 1)
+        if len(chosen) >= 2:
+            # Each pair of questions with all 3 x 3 combinations of other answers
+            first, second = np.array(list(itertools.combinations(chosen, 2))).T
+            double_questions = np.repeat(np.stack([first, second], axis=1), 9, axis=0)
+            double_values = np.stack([
+                np.repeat(alternatives[first], 3, axis=1).ravel(),
+                np.tile(alternatives[second], 3).ravel(),
+            ], axis=1)
+        else:
+            double_questions = double_values = np.empty((0, 2), dtype=np.intp)
+        
+        engine = state.engine
+        if isinstance(engine, LinearEngine):
+            logits = [engine.decision_function(x[None, :]), engine.changed_logits(x, SINGLE_QUESTIONS, single_values)]
+            if len(double_values):
+                logits.append(engine.changed_logits(x, double_questions, double_values))
+            logits = np.concatenate(logits)
+            probabilities = engine.proba_from_logits(logits)
+            best = probabilities.argmax(axis=1)
+            classes = engine.classes[best].astype(int)
+            confidences = probabilities[np.arange(len(best)), best]
+            scores = logits if engine.multinomial else np.log(np.clip(probabilities, 1e-12, None))
+            method = "linear"
+        else:
+            rows = np.repeat(x[None, :], 1 + len(single_values) + len(double_values), axis=0)
+            for offset, questions, values in ((1, SINGLE_QUESTIONS, single_values),
+                                              (1 + len(single_values), double_questions, double_values)):
+                rows[np.arange(offset, offset + len(values))[:, None], questions] = values
+            classes, confidences, probabilities = self._predict_rows(rows.astype(float), state)
+            scores = np.log(np.clip(probabilities, 1e-12, None))
+            method = "rescore"
+        top_two = np.partition(scores, -2, axis=1)[:, -2:]
+        margins = top_two[:, 1] - top_two[:, 0]
+        
+        split = 1 + len(single_values)
+        return Sensitivity(
+            prediction=int(classes[0]),
+            confidence=float(confidences[0]),
+            probabilities=self.probabilities_to_dict(probabilities[0]),
+            margin=float(margins[0]),
+            singles=Perturbations(SINGLE_QUESTIONS, single_values, classes[1:split],
+                                  confidences[1:split], margins[1:split]),
+            pairs=Perturbations(double_questions, double_values, classes[split:],
+                                confidences[split:], margins[split:]),
+            method=method,
+        )
+    
+    def probabilities_to_dict(self, probabilities) -> Dict[str, float]:
+        """Map one row of class probabilities to lowercase class labels."""
+        return {
+            CLASS_LABELS[i].lower(): float(probabilities[i])
+            for i in range(len(probabilities))
+        }
+    
     def get_class_label(self, class_id: int) -> str:
         """Get human-readable label for class ID."""
         return CLASS_LABELS.get(class_id, f"Unknown ({class_id})")
@@ -0,0 +1,329 @@
+"""
+Incremental (online) updates of the linear model from labeled submissions.
+
+OnlineLinearModel continues training the deployed StandardScaler +
+multinomial LogisticRegression one mini-batch at a time, without the
+historical data:
+
+- the scaler's mean and variance are merged with the batch statistics
+  (Chan et al. parallel update), weighted by the number of samples seen
+- the weights take mini-batch gradient steps on the L2-regularized
+  multinomial log loss, with the same regularization strength per sample
+  as LogisticRegression(C) had on the original training set
+
+Scaler updates do not change predictions by themselves: the weights are
+re-expressed for the new mean/scale before the gradient step. Each update
+costs O(batch size × features × classes), independent of the history.
+
+OnlineUpdater publishes snapshots as native npz artifacts in the model
+registry (``online-<timestamp>-<updates>``) and activates them through the
+ModelSwapper, so cache re-scoring and process-pool reloads work exactly as
+for any other version.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .artifact import read_npz, write_linear_npz
+from .drift import REFERENCE_FILE
+from .engine import N_FEATURES, LinearEngine, _softmax
+
+logger = logging.getLogger(__name__)
+
+ONLINE_PREFIX = "online-"
+# Samples assumed behind an npz artifact that does not record its count
+DEFAULT_PRIOR_SAMPLES = 1000
+
+
+class OnlineLinearModel:
+    """Scaler statistics + multinomial logistic weights updated by mini-batches."""
+
+    def __init__(self, coef, intercept, classes, mean, var, n_seen: float,
+                 C: float = 1.0, learning_rate: float = 0.05, epochs: int = 1, updates: int = 0):
+        self.coef = np.array(coef, dtype=float)  # (K, 30), in scaled feature space
+        self.intercept = np.array(intercept, dtype=float)
+        self.classes = np.asarray(classes)
+        self.mean = np.array(mean, dtype=float)
+        self.var = np.array(var, dtype=float)
+        self.n_seen = float(n_seen)
+        self.C = float(C)
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.updates = updates
+        if self.coef.shape != (len(self.classes), N_FEATURES):
+            raise ValueError(f"Expected coefficients of shape ({len(self.classes)}, {N_FEATURES}), got {self.coef.shape}")
+
+    @property
+    def scale(self) -> np.ndarray:
+        # Same zero-variance handling as StandardScaler
+        scale = np.sqrt(self.var)
+        scale[scale < 10 * np.finfo(float).eps] = 1.0
+        return scale
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, **kwargs) -> "OnlineLinearModel":
+        """Start from a fitted multinomial LogisticRegression and StandardScaler."""
+        engine = LinearEngine.from_sklearn(model, scaler)
+        if engine is None or not engine.multinomial:
+            raise ValueError("Online updates need a multinomial linear model")
+        if scaler is None:
+            mean, var, n_seen = np.zeros(N_FEATURES), np.ones(N_FEATURES), DEFAULT_PRIOR_SAMPLES
+        else:
+            mean, var = scaler.mean_, scaler.var_
+            n_seen = float(np.max(scaler.n_samples_seen_))
+        return cls(model.coef_, model.intercept_, model.classes_, mean, var, n_seen,
+                   C=getattr(model, "C", 1.0), **kwargs)
+
+    @classmethod
+    def from_npz(cls, path: Path, **kwargs) -> "OnlineLinearModel":
+        """Start from a native linear artifact (see app.artifact)."""
+        data = read_npz(path, mmap=False)
+        if str(data["kind"]) != "linear" or not bool(data["multinomial"]):
+            raise ValueError("Online updates need a multinomial linear model")
+        mean = data.get("mean", np.zeros(N_FEATURES))
+        scale = data.get("scale", np.ones(N_FEATURES))
+        return cls(
+            data["coef"], data["intercept"], data["classes"], mean, np.square(scale),
+            n_seen=float(data.get("n_samples_seen", DEFAULT_PRIOR_SAMPLES)),
+            C=float(data.get("C", 1.0)),
+            updates=int(data.get("online_updates", 0)),
+            **kwargs,
+        )
+
+    def _raw_weights(self):
+        """Weights and bias acting on unscaled answers."""
+        weights = self.coef / self.scale
+        return weights, self.intercept - weights @ self.mean
+
+    def log_loss(self, X: np.ndarray, y: np.ndarray) -> float:
+        """Mean multinomial log loss on raw answers X with labels y."""
+        weights, bias = self._raw_weights()
+        proba = _softmax(X @ weights.T + bias)
+        index = np.searchsorted(self.classes, y)
+        return float(-np.log(np.clip(proba[np.arange(len(y)), index], 1e-15, None)).mean())
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray) -> None:
+        """Update the scaler statistics and weights with one labeled mini-batch.
+
+        Args:
+            X: (N, 30) raw answers
+            y: (N,) labels, all of them in self.classes
+
+        Raises:
+            ValueError: If shapes or labels are invalid
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        if X.ndim != 2 or X.shape[1] != N_FEATURES or len(X) != len(y) or len(X) == 0:
+            raise ValueError(f"Expected X of shape (N, {N_FEATURES}) and N labels")
+        index = np.searchsorted(self.classes, y)
+        index = np.clip(index, 0, len(self.classes) - 1)
+        if not np.array_equal(self.classes[index], y):
+            raise ValueError(f"Labels must be among {self.classes.tolist()}")
+
+        # Freeze the current decision function in raw space
+        weights, bias = self._raw_weights()
+
+        # Merge batch statistics into the running mean/variance
+        n_batch = len(X)
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        total = self.n_seen + n_batch
+        delta = batch_mean - self.mean
+        m2 = self.var * self.n_seen + batch_m2 + delta ** 2 * self.n_seen * n_batch / total
+        self.mean = self.mean + delta * n_batch / total
+        self.var = m2 / total
+        self.n_seen = total
+
+        # Re-express the same function for the new scaler, then descend
+        scale = self.scale
+        coef = weights * scale
+        intercept = bias + weights @ self.mean
+        Z = (X - self.mean) / scale
+        Y = np.zeros((n_batch, len(self.classes)))
+        Y[np.arange(n_batch), index] = 1.0
+        alpha = 1.0 / (self.C * self.n_seen)
+        for _ in range(self.epochs):
+            residual = _softmax(Z @ coef.T + intercept) - Y
+            coef -= self.learning_rate * (residual.T @ Z / n_batch + alpha * coef)
+            intercept -= self.learning_rate * residual.mean(axis=0)
+
+        self.coef, self.intercept = coef, intercept
+        self.updates += 1
+
+    def engine(self) -> LinearEngine:
+        return LinearEngine(self.coef, self.intercept, self.classes, self.mean, self.scale, multinomial=True)
+
+    def save(self, path: Path) -> Path:
+        """Write the model as a native linear artifact that can resume training."""
+        return write_linear_npz(
+            path, self.coef, self.intercept, self.classes, multinomial=True,
+            mean=self.mean, scale=self.scale,
+            extra={
+                "n_samples_seen": np.array(self.n_seen),
+                "C": np.array(self.C),
+                "online_updates": np.array(self.updates),
+            },
+        )
+
+
+def model_from_manager(manager, **options) -> OnlineLinearModel:
+    """Online model initialised from the version the manager is serving.
+
+    Raises:
+        ValueError: If the active model is not a multinomial linear model
+    """
+    if not manager.is_loaded:
+        raise ValueError("no model loaded")
+    if manager.model is not None:
+        return OnlineLinearModel.from_sklearn(manager.model, manager.scaler, **options)
+    model_path = manager.model_path
+    npz_path = model_path if model_path.suffix == ".npz" else model_path.with_suffix(".npz")
+    if manager.engine is None or not npz_path.exists():
+        raise ValueError("no linear artifact to start from")
+    return OnlineLinearModel.from_npz(npz_path, **options)
+
+
+class OnlineUpdater:
+    """Applies labeled mini-batches and publishes snapshots to the registry.
+
+    If another version is activated (e.g. through the admin endpoint), the
+    next batch restarts online training from that version.
+    """
+
+    def __init__(self, manager, registry, swapper, publish_every: int = 1,
+                 keep_snapshots: int = 5, **options):
+        self.options = options
+        self.model = model_from_manager(manager, **options)
+        self._base_version = manager.version
+        self.manager = manager
+        self.registry = registry
+        self.swapper = swapper
+        self.publish_every = max(1, publish_every)
+        self.keep_snapshots = keep_snapshots
+        self._lock = threading.Lock()
+        self._publish_lock = asyncio.Lock()
+        self.pending_updates = 0
+        self.last_published: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, manager, registry, swapper) -> Optional["OnlineUpdater"]:
+        """Build an updater from ONLINE_* settings, or None if disabled or unsupported."""
+        if os.getenv("ONLINE_LEARNING", "0").lower() not in ("1", "true", "yes", "on"):
+            return None
+        try:
+            return cls(
+                manager, registry, swapper,
+                publish_every=int(os.getenv("ONLINE_PUBLISH_EVERY", "1")),
+                keep_snapshots=int(os.getenv("ONLINE_KEEP_SNAPSHOTS", "5")),
+                learning_rate=float(os.getenv("ONLINE_LEARNING_RATE", "0.05")),
+                epochs=int(os.getenv("ONLINE_EPOCHS", "1")),
+            )
+        except ValueError as e:
+            logger.warning(f"⚠️ Online learning disabled: {e}")
+            return None
+
+    def _update(self, X: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+        with self._lock:
+            if self.manager.version != self._base_version:
+                logger.info(f"Online learning restarts from model version {self.manager.version}")
+                self.model = model_from_manager(self.manager, **self.options)
+                self._base_version = self.manager.version
+                self.pending_updates = 0
+            loss = self.model.log_loss(X, y)
+            self.model.partial_fit(X, y)
+            self.pending_updates += 1
+            return {"loss_before": loss, "loss_after": self.model.log_loss(X, y)}
+
+    async def update(self, X: np.ndarray, y: np.ndarray) -> Dict:
+        """Apply one mini-batch; publish a snapshot every publish_every batches.
+
+        Raises:
+            ValueError: If the batch is invalid
+        """
+        losses = await asyncio.to_thread(self._update, X, y)
+        published = None
+        if self.pending_updates >= self.publish_every:
+            published = await self.publish(min_updates=self.publish_every)
+        return {
+            "rows": len(X),
+            "updates": self.model.updates,
+            "samples_seen": int(self.model.n_seen),
+            "published_version": published,
+            **losses,
+        }
+
+    def _write_snapshot(self) -> Tuple[str, int]:
+        """Write the current model into a new registry version.
+
+        Returns:
+            The new version and the number of updates it includes
+        """
+        with self._lock:
+            version = f"{ONLINE_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{self.model.updates:06d}"
+            staging = Path(tempfile.mkdtemp(prefix="online-snapshot-"))
+            try:
+                self.model.save(staging / "psychiatric_model.npz")
+                (staging / "feature_names.json").write_text(json.dumps(self.manager.feature_names))
+                (staging / "training_report.json").write_text(json.dumps({
+                    "best_model": "Logistic Regression (online)",
+                    "models": {},
+                    "online": {"updates": self.model.updates, "samples_seen": self.model.n_seen},
+                }, indent=2))
+                # Drift is still measured against the original training data
+                reference = self.manager.model_path.parent / REFERENCE_FILE
+                if reference.exists():
+                    shutil.copy2(reference, staging / REFERENCE_FILE)
+                self.registry.publish(staging, version)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+            return version, self.pending_updates
+
+    async def publish(self, min_updates: int = 1) -> Optional[str]:
+        """Snapshot the model and hot-swap it in.
+
+        Args:
+            min_updates: Skip publishing unless at least this many updates are pending
+
+        Returns:
+            The published version, or None if skipped or the swap failed
+        """
+        async with self._publish_lock:
+            # Concurrent batches may all pass the check in update(); only the first publishes
+            if self.pending_updates == 0 or self.pending_updates < min_updates:
+                return None
+            version, included = await asyncio.to_thread(self._write_snapshot)
+            if not await self.swapper.swap(version):
+                # Keep the updates pending so the next batch retries the publish
+                return None
+            with self._lock:
+                self.pending_updates = max(0, self.pending_updates - included)
+                self.last_published = self._base_version = version
+            await asyncio.to_thread(self._prune)
+            return version
+
+    def _prune(self) -> None:
+        """Delete old online snapshots beyond keep_snapshots (never the active one)."""
+        snapshots = [v for v in self.registry.versions() if v.startswith(ONLINE_PREFIX)]
+        active = self.manager.version
+        for version in snapshots[:-self.keep_snapshots] if self.keep_snapshots > 0 else []:
+            if version != active:
+                self.registry.remove(version)
+
+    def stats(self) -> Dict:
+        return {
+            "updates": self.model.updates,
+            "samples_seen": int(self.model.n_seen),
+            "pending_updates": self.pending_updates,
+            "last_published": self.last_published,
+        }
@@ -0,0 +1,314 @@
+"""
+Versioned model registry with zero-downtime hot swap.
+
+A registry is a directory of artifact sets, one subdirectory per version:
+
+    models/registry/
+        ACTIVE                      # name of the version to serve
+        2024-06-01/
+            psychiatric_model.joblib
+            scaler.joblib
+            feature_names.json
+            training_report.json
+            psychiatric_model.npz   # optional, see app.artifact
+            drift_reference.json    # optional, see app.drift
+        2024-07-15/
+            ...
+
+ModelSwapper loads and warms a version in a worker thread while the old
+one keeps serving. It then re-creates process-pool workers, re-scores the
+hot cache entries with the new model and swaps the ModelState in one
+assignment. Requests already running finish on the old version. A swap is
+triggered through the admin endpoint or by editing ACTIVE when
+MODEL_REGISTRY_POLL_SECONDS is set.
+
+Usage (from backend/):
+    python -m app.registry list
+    python -m app.registry publish models/ 2024-07-15 --activate
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_DIR = Path(__file__).parent.parent / "models" / "registry"
+ACTIVE_FILE = "ACTIVE"
+MODEL_FILE = "psychiatric_model.joblib"
+NPZ_FILE = "psychiatric_model.npz"
+ARTIFACT_FILES = (
+    MODEL_FILE, "scaler.joblib", "feature_names.json", "training_report.json", NPZ_FILE,
+    "drift_reference.json",
+)
+
+# Version names become directory names; keep them to one safe path segment
+_VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+class ModelRegistry:
+    """A directory of versioned model artifact sets."""
+
+    def __init__(self, root: Path = DEFAULT_REGISTRY_DIR):
+        self.root = Path(root)
+
+    @classmethod
+    def from_env(cls) -> "ModelRegistry":
+        """Registry at MODEL_REGISTRY_DIR (default models/registry)."""
+        root = os.getenv("MODEL_REGISTRY_DIR")
+        return cls(Path(root) if root else DEFAULT_REGISTRY_DIR)
+
+    @staticmethod
+    def validate_version(version: str) -> str:
+        if not _VERSION_PATTERN.match(version or ""):
+            raise ValueError(f"Invalid model version {version!r}: use letters, digits, '.', '_' or '-'")
+        return version
+
+    def versions(self) -> List[str]:
+        """Versions holding a loadable model, in name order."""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            path.name for path in self.root.iterdir()
+            if path.is_dir() and _VERSION_PATTERN.match(path.name)
+            and ((path / MODEL_FILE).exists() or (path / NPZ_FILE).exists())
+        )
+
+    def model_path(self, version: str) -> Path:
+        """Path to pass to ModelManager.load() for version.
+
+        Raises:
+            KeyError: If the version does not exist
+        """
+        directory = self.root / self.validate_version(version)
+        if (directory / MODEL_FILE).exists():
+            return directory / MODEL_FILE
+        if (directory / NPZ_FILE).exists():
+            return directory / NPZ_FILE
+        raise KeyError(f"Model version {version!r} not found in {self.root}")
+
+    def active_version(self) -> Optional[str]:
+        """Version named in ACTIVE, else the last version by name, else None."""
+        active = self.root / ACTIVE_FILE
+        if active.exists():
+            version = active.read_text().strip()
+            if version in self.versions():
+                return version
+            logger.warning(f"{active} names unknown version {version!r} - ignoring")
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def set_active(self, version: str) -> None:
+        """Point ACTIVE at version (atomic rename, safe against a concurrent reader)."""
+        self.model_path(version)
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{ACTIVE_FILE}.tmp"
+        tmp.write_text(version + "\n")
+        os.replace(tmp, self.root / ACTIVE_FILE)
+
+    def describe(self, version: str) -> Dict[str, Any]:
+        """Version summary from its training_report.json."""
+        info: Dict[str, Any] = {"version": version, "best_model": None, "accuracy": None}
+        report_path = self.root / version / "training_report.json"
+        if report_path.exists():
+            try:
+                report = json.loads(report_path.read_text())
+                best = report.get("best_model")
+                info["best_model"] = best
+                info["accuracy"] = report.get("models", {}).get(best, {}).get("accuracy")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read {report_path}: {e}")
+        return info
+
+    def publish(self, source_dir: Path, version: str) -> Path:
+        """Copy an artifact set (e.g. models/) into the registry as version.
+
+        Files are staged in a temporary directory and renamed into place,
+        so a watcher never sees a half-copied version.
+        """
+        self.validate_version(version)
+        target = self.root / version
+        if target.exists():
+            raise FileExistsError(f"Model version {version!r} already exists")
+        if not (source_dir / MODEL_FILE).exists() and not (source_dir / NPZ_FILE).exists():
+            raise FileNotFoundError(f"No {MODEL_FILE} or {NPZ_FILE} in {source_dir}")
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=self.root))
+        try:
+            for name in ARTIFACT_FILES:
+                if (source_dir / name).exists():
+                    shutil.copy2(source_dir / name, staging / name)
+            os.replace(staging, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return target
+
+    def remove(self, version: str) -> None:
+        """Delete a version's artifacts (refuses the version named in ACTIVE)."""
+        directory = self.model_path(version).parent
+        if self.active_version() == version:
+            raise ValueError(f"Refusing to remove active model version {version!r}")
+        shutil.rmtree(directory)
+
+
+class ModelSwapper:
+    """Loads, warms and atomically activates registry versions."""
+
+    def __init__(self, manager, registry: ModelRegistry, executor=None):
+        self.manager = manager
+        self.registry = registry
+        self.executor = executor
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self.target: Optional[str] = None
+        self.error: Optional[str] = None
+        self.swaps = 0
+        self.last_swap_seconds: Optional[float] = None
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked() or self.target is not None
+
+    def start_swap(self, version: str) -> None:
+        """Run swap(version) in the background (used by the admin endpoint)."""
+        self.target = version
+        task = asyncio.get_running_loop().create_task(self.swap(version))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def swap(self, version: str) -> bool:
+        """Load version in the background and make it active.
+
+        Returns:
+            True if the new version is now serving, False if loading failed
+            (the previous version keeps serving).
+        """
+        async with self._lock:
+            self.target, self.error = version, None
+            start = time.perf_counter()
+            try:
+                model_path = self.registry.model_path(version)
+                state = await asyncio.to_thread(self._prepare, model_path, version)
+                entries = await asyncio.to_thread(self.manager.rescore_cache, state)
+                previous = self.manager.model_path
+                if self.executor is not None:
+                    await asyncio.to_thread(self.executor.reload, state.model_path)
+                try:
+                    self.manager.activate(state, entries)
+                except Exception:
+                    if self.executor is not None:
+                        # Workers must serve the same version as this process
+                        await asyncio.to_thread(self.executor.reload, previous)
+                    raise
+            except Exception as e:
+                self.error = str(e)
+                logger.error(f"❌ Model swap to {version!r} failed: {e}", exc_info=True)
+                return False
+            finally:
+                self.target = None
+            try:
+                if self.registry.active_version() != version:
+                    self.registry.set_active(version)
+            except OSError as e:
+                # The new version is serving; only the pointer for restarts is stale
+                logger.warning(f"Could not record {version!r} as the active model version: {e}")
+            self.swaps += 1
+            self.last_swap_seconds = round(time.perf_counter() - start, 4)
+            logger.info(
+                f"🔁 Now serving model version {version} "
+                f"(swapped in {self.last_swap_seconds:.2f}s, {len(entries)} cache entries re-scored)"
+            )
+            return True
+
+    def _prepare(self, model_path: Path, version: str):
+        state = self.manager.build_state(model_path, version)
+        if state is None:
+            raise RuntimeError(f"Could not load model version {version!r} from {model_path}")
+        self.manager.warm_up(state)
+        return state
+
+    def start_watching(self, interval: float) -> None:
+        """Poll ACTIVE every interval seconds and swap when it changes."""
+        self._watch_task = asyncio.get_running_loop().create_task(self._watch(interval))
+
+    async def _watch(self, interval: float) -> None:
+        failed = None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                version = self.registry.active_version()
+            except OSError as e:
+                logger.warning(f"Could not read model registry: {e}")
+                continue
+            # Retry a failed version only after ACTIVE changes again
+            if version is None or version in (self.manager.version, failed) or self.busy:
+                continue
+            failed = None if await self.swap(version) else version
+
+    async def close(self) -> None:
+        """Stop the watcher and wait for running swaps."""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Swap status for the admin endpoint."""
+        return {
+            "in_progress": self.busy,
+            "target": self.target,
+            "last_error": self.error,
+            "swaps": self.swaps,
+            "last_swap_seconds": self.last_swap_seconds,
+        }
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    parser.add_argument("--registry", type=Path, default=None, help="Registry directory (default: MODEL_REGISTRY_DIR or models/registry)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List versions")
+    publish = commands.add_parser("publish", help="Copy an artifact set into the registry")
+    publish.add_argument("source", type=Path, help="Directory with psychiatric_model.joblib, scaler.joblib, ...")
+    publish.add_argument("version", help="Version name, e.g. 2024-07-15")
+    publish.add_argument("--activate", action="store_true", help="Also point ACTIVE at the new version")
+    activate = commands.add_parser("activate", help="Point ACTIVE at a version")
+    activate.add_argument("version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry) if args.registry else ModelRegistry.from_env()
+    if args.command == "publish":
+        print(f"📁 Published {registry.publish(args.source, args.version)}")
+        if args.activate:
+            registry.set_active(args.version)
+            print(f"✅ Active version: {args.version}")
+    elif args.command == "activate":
+        registry.set_active(args.version)
+        print(f"✅ Active version: {args.version}")
+    else:
+        active = registry.active_version()
+        for version in registry.versions():
+            info = registry.describe(version)
+            marker = "*" if version == active else " "
+            accuracy = f"{info['accuracy']:.4f}" if info["accuracy"] is not None else "-"
+            print(f"{marker} {version:<24} {info['best_model'] or '-':<24} accuracy {accuracy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,24 @@
 Pydantic schemas for the Psychiatric Disorder Detection API.
 """
 
-from typing import Dict, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Optional
+from pydantic import (
+    BaseModel, ConfigDict, Field, ValidationInfo, create_model, field_validator, model_validator,
+)
+
+from .metrics import now, observe_stage
+
+# Upper bound on questionnaires accepted by a single /predict/batch call
+MAX_BATCH_SIZE = 5000
+
+# Validation context for rows checked inside a larger, separately timed request
+UNTIMED = {"timed": False}
+
+DISCLAIMER = (
+    "⚠️ This tool is for educational and informational purposes only. "
+    "It is NOT a medical diagnosis. If you are experiencing mental health concerns, "
+    "please consult a qualified mental health professional."
+)
 
 
 class PredictionRequest(BaseModel):
@@ -47,6 +63,21 @@ class PredictionRequest(BaseModel):
     q29: int = Field(..., ge=1, le=4, description="I was worried about situations in which I might panic")
     q30: int = Field(..., ge=1, le=4, description="I experienced trembling")
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def _time_validation(cls, data, handler, info: ValidationInfo):
+        """Record pydantic validation time for the /metrics endpoint.
+
+        Rows validated inside a larger request pass ``context={"timed": False}``
+        so the route can time the whole request once instead.
+        """
+        if info.context is not None and not info.context.get("timed", True):
+            return handler(data)
+        start = now()
+        result = handler(data)
+        observe_stage("validation", start)
+        return result
+
     def to_feature_array(self) -> list:
         """Convert request to feature array in correct order for model."""
         return [
@@ -82,9 +113,7 @@ class PredictionResponse(BaseModel):
     probabilities: Dict[str, float] = Field(..., description="Probability distribution across all classes")
     description: str = Field(..., description="Description and recommendation for the severity level")
     disclaimer: str = Field(
-        default="⚠️ This tool is for educational and informational purposes only. "
-                "It is NOT a medical diagnosis. If you are experiencing mental health concerns, "
-                "please consult a qualified mental health professional.",
+        default=DISCLAIMER,
         description="Important disclaimer about the tool's limitations"
     )
 
@@ -109,8 +138,374 @@ class PredictionResponse(BaseModel):
     }
 
 
+# Question texts in feature order, as shown in the API docs
+QUESTION_TEXTS = [PredictionRequest.model_fields[f"q{i}"].description for i in range(1, 31)]
+
+
+class _PartialAnswers(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    def to_partial_array(self) -> list:
+        """Answers in model feature order, None for unanswered questions."""
+        return [getattr(self, f"q{i}") for i in range(1, 31)]
+
+
+# Same fields as PredictionRequest, each optional (unknown fields are rejected)
+PartialPredictionRequest = create_model(
+    "PartialPredictionRequest",
+    __base__=_PartialAnswers,
+    __doc__="Request schema for partial scoring: any subset of q1-q30 (values 1-4).",
+    **{
+        name: (Optional[int], Field(default=None, ge=1, le=4, description=field.description))
+        for name, field in PredictionRequest.model_fields.items()
+    },
+)
+
+
+class PartialPredictionResponse(BaseModel):
+    """Response schema for partial scoring."""
+    prediction: str = Field(..., description="Most likely label if the open questions get average answers")
+    severity_level: int = Field(..., ge=0, le=3, description="Numeric severity class (0-3) of that prediction")
+    confidence: float = Field(..., ge=0, le=1, description="Probability of that prediction")
+    probabilities: Dict[str, float] = Field(..., description="Probability distribution with average answers for open questions")
+    final: bool = Field(..., description="True if the remaining answers cannot change the predicted class")
+    reachable: List[str] = Field(..., description="Labels that some combination of remaining answers may still produce")
+    logit_range: Dict[str, List[float]] = Field(..., description="[min, max] of each class logit over all remaining answers")
+    answered: int = Field(..., ge=0, le=30, description="Number of questions answered")
+    next_question: Optional[str] = Field(
+        default=None, description="Open question (q1-q30) whose answer can narrow the outcome the most; null once final"
+    )
+    disclaimer: str = Field(
+        default=DISCLAIMER,
+        description="Important disclaimer about the tool's limitations"
+    )
+
+
+class QuestionContribution(BaseModel):
+    """How much one answer moved the prediction."""
+    question: str = Field(..., description="Request field (q1-q30)")
+    item: str = Field(..., description="DASS item the question was trained on (e.g. Q1A)")
+    text: str = Field(..., description="Question text")
+    answer: int = Field(..., ge=1, le=4, description="Submitted answer")
+    contribution: float = Field(..., description="Contribution to the predicted class")
+    contributions: Dict[str, float] = Field(..., description="Contribution to every class")
+
+
+class ExplanationResponse(BaseModel):
+    """Response schema for the explanation endpoint.
+    
+    Contributions are logits for linear models (coefficient × scaled answer,
+    relative to an average respondent) and log-probability changes when the
+    answer is replaced by the average answer for other models.
+    """
+    prediction: str = Field(..., description="Human-readable prediction label (None/Mild/Moderate/Severe)")
+    severity_level: int = Field(..., ge=0, le=3, description="Numeric severity class (0-3)")
+    confidence: float = Field(..., ge=0, le=1, description="Confidence score for the prediction")
+    probabilities: Dict[str, float] = Field(..., description="Probability distribution across all classes")
+    description: str = Field(..., description="Description and recommendation for the severity level")
+    method: str = Field(..., description="'linear' (exact) or 'occlusion' (non-linear models)")
+    base: Optional[Dict[str, float]] = Field(default=None, description="Class logits of an average respondent (linear models only)")
+    contributions: List[QuestionContribution] = Field(
+        ..., description="Questions ranked by the size of their contribution to the predicted class"
+    )
+    disclaimer: str = Field(
+        default=DISCLAIMER,
+        description="Important disclaimer about the tool's limitations"
+    )
+
+
+class SensitivityRequest(PredictionRequest):
+    """Request schema for the sensitivity endpoint: q1-q30 plus optional pair questions."""
+    pairs: List[str] = Field(
+        default_factory=list, max_length=30,
+        description="Questions (q1-q30) whose answers are also changed two at a time, 9 combinations per pair"
+    )
+
+    @field_validator("pairs")
+    @classmethod
+    def _check_pairs(cls, pairs: List[str]) -> List[str]:
+        valid = {f"q{i}" for i in range(1, 31)}
+        unknown = [name for name in pairs if name not in valid]
+        if unknown:
+            raise ValueError(f"Unknown questions: {', '.join(unknown)}")
+        if len(set(pairs)) != len(pairs):
+            raise ValueError("Questions must not repeat")
+        return pairs
+
+    def pair_indices(self) -> List[int]:
+        """0-based feature indices of the pair questions."""
+        return [int(name[1:]) - 1 for name in self.pairs]
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    **PredictionRequest.model_config["json_schema_extra"]["examples"][0],
+                    "pairs": ["q11", "q13", "q18"],
+                }
+            ]
+        }
+    }
+
+
+class SensitivityChange(BaseModel):
+    """Prediction after changing one or two answers."""
+    changes: Dict[str, int] = Field(..., description="Changed questions (q1-q30) and their new answers")
+    step: int = Field(..., ge=1, le=6, description="Total distance of the new answers from the submitted ones")
+    prediction: str = Field(..., description="Human-readable prediction label after the change")
+    severity_level: int = Field(..., ge=0, le=3, description="Numeric severity class (0-3) after the change")
+    confidence: float = Field(..., ge=0, le=1, description="Confidence score after the change")
+    margin: float = Field(..., description="log(p_best / p_runner_up) after the change; 0 is the class boundary")
+    flip: bool = Field(..., description="True if the change alters the predicted class")
+
+
+class SensitivityResponse(BaseModel):
+    """Response schema for the sensitivity endpoint.
+
+    The margin of a result is the log-ratio of its two most likely classes
+    (the logit gap for the multinomial linear model): how far it sits from
+    the boundary where the prediction would change.
+    """
+    prediction: str = Field(..., description="Human-readable prediction label (None/Mild/Moderate/Severe)")
+    severity_level: int = Field(..., ge=0, le=3, description="Numeric severity class (0-3)")
+    confidence: float = Field(..., ge=0, le=1, description="Confidence score for the prediction")
+    probabilities: Dict[str, float] = Field(..., description="Probability distribution across all classes")
+    description: str = Field(..., description="Description and recommendation for the severity level")
+    margin: float = Field(..., description="log(p_best / p_runner_up) of the submitted answers")
+    method: str = Field(..., description="'linear' (logit table deltas) or 'rescore' (non-linear models)")
+    stable: bool = Field(..., description="True if no evaluated change alters the predicted class")
+    min_flip_step: Optional[int] = Field(
+        default=None, description="Smallest total answer change that alters the predicted class; null if stable"
+    )
+    flips: List[SensitivityChange] = Field(
+        ..., description="Changes that alter the predicted class, smallest step first, then most decisive"
+    )
+    singles: List[SensitivityChange] = Field(..., description="Every other answer to every question (90 changes)")
+    pairs: List[SensitivityChange] = Field(
+        ..., description="Every combination of other answers to two of the requested pair questions"
+    )
+    disclaimer: str = Field(
+        default=DISCLAIMER,
+        description="Important disclaimer about the tool's limitations"
+    )
+
+
+class BatchPredictionRequest(BaseModel):
+    """Request schema for batch prediction endpoint.
+    
+    Each item uses the same q1-q30 fields as PredictionRequest. Items are
+    validated individually so one bad row does not reject the whole batch.
+    """
+    items: List[Dict[str, Any]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE,
+        description="Questionnaire responses, one object with q1-q30 per respondent"
+    )
+
+
+class BatchPredictionItem(BaseModel):
+    """Result for a single row of a batch prediction."""
+    index: int = Field(..., ge=0, description="Position of the row in the submitted batch")
+    prediction: Optional[str] = Field(default=None, description="Human-readable prediction label")
+    severity_level: Optional[int] = Field(default=None, ge=0, le=3, description="Numeric severity class (0-3)")
+    confidence: Optional[float] = Field(default=None, ge=0, le=1, description="Confidence score for the prediction")
+    probabilities: Optional[Dict[str, float]] = Field(default=None, description="Probability distribution across all classes")
+    description: Optional[str] = Field(default=None, description="Description and recommendation for the severity level")
+    error: Optional[str] = Field(default=None, description="Validation error for this row, if any")
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response schema for batch prediction endpoint."""
+    results: List[BatchPredictionItem] = Field(..., description="Per-row results in submission order")
+    total: int = Field(..., description="Number of rows submitted")
+    succeeded: int = Field(..., description="Number of rows scored successfully")
+    failed: int = Field(..., description="Number of rows rejected by validation")
+    disclaimer: str = Field(
+        default=DISCLAIMER,
+        description="Important disclaimer about the tool's limitations"
+    )
+
+
+class CacheStats(BaseModel):
+    """Prediction cache size and hit-rate counters."""
+    enabled: bool = Field(..., description="Whether the prediction cache is active")
+    size: int = Field(..., description="Number of cached predictions")
+    max_size: int = Field(..., description="Maximum number of cached predictions")
+    hits: int = Field(..., description="Lookups served from the cache")
+    misses: int = Field(..., description="Lookups that had to run the model")
+    evictions: int = Field(..., description="Entries dropped to respect max_size")
+    invalidations: int = Field(..., description="Times the cache was cleared or replaced by a model load")
+    hit_rate: float = Field(..., ge=0, le=1, description="hits / (hits + misses)")
+
+
+class StartupStats(BaseModel):
+    """Cold start measurements taken while loading the model."""
+    artifact_format: Optional[str] = Field(default=None, description="Model artifact served (npz or joblib)")
+    load_seconds: float = Field(..., description="Time spent loading the model at startup")
+    rss_before_mb: float = Field(..., description="Resident memory before loading the model (MB)")
+    rss_after_mb: float = Field(..., description="Resident memory after loading the model (MB)")
+    sklearn_imported: bool = Field(..., description="Whether scikit-learn was imported during startup")
+
+
+class BatchingStats(BaseModel):
+    """Micro-batching configuration and counters for /predict."""
+    max_batch_size: int = Field(..., description="Largest batch the coalescer will form")
+    window_ms: float = Field(..., description="How long the first queued request waits for others")
+    batches: int = Field(..., description="Model calls made by the coalescer")
+    rows: int = Field(..., description="Requests scored through the coalescer")
+    largest_batch: int = Field(..., description="Largest batch formed so far")
+    mean_batch_size: float = Field(..., description="rows / batches")
+
+
+class AdmissionStats(BaseModel):
+    """Admission control limits, load and counters."""
+    max_concurrency: int = Field(..., description="Requests served at once")
+    max_queue: int = Field(..., description="Requests allowed to wait for a slot")
+    target_delay_ms: float = Field(..., description="Queueing delay above which requests are shed")
+    in_flight: int = Field(..., description="Requests being served")
+    queued: int = Field(..., description="Requests waiting for a slot")
+    queue_delay_ms: float = Field(..., description="Current queueing delay (oldest waiter or event-loop lag)")
+    max_queue_delay_ms: float = Field(..., description="Largest queueing delay seen")
+    overloaded: bool = Field(..., description="Whether new requests are being shed")
+    admitted: int = Field(..., description="Requests admitted")
+    shed: Dict[str, int] = Field(..., description="Requests rejected with 503, by reason")
+
+
+class ReadinessResponse(BaseModel):
+    """Response schema for the readiness check."""
+    ready: bool = Field(..., description="Whether the service should receive prediction traffic")
+    model_loaded: bool = Field(..., description="Whether the ML model is loaded")
+    overloaded: bool = Field(default=False, description="Whether admission control is shedding load")
+
+
+class ModelVersionInfo(BaseModel):
+    """One version in the model registry."""
+    version: str = Field(..., description="Registry version name")
+    best_model: Optional[str] = Field(default=None, description="Best model family from training_report.json")
+    accuracy: Optional[float] = Field(default=None, description="Test accuracy of the best model")
+    active: bool = Field(..., description="Whether this version is serving predictions")
+
+
+class SwapStats(BaseModel):
+    """State of the model hot-swap machinery."""
+    in_progress: bool = Field(..., description="Whether a version is being loaded right now")
+    target: Optional[str] = Field(default=None, description="Version being loaded, if any")
+    last_error: Optional[str] = Field(default=None, description="Why the last swap failed, if it did")
+    swaps: int = Field(..., description="Successful swaps since startup")
+    last_swap_seconds: Optional[float] = Field(default=None, description="Load + warm-up time of the last swap")
+
+
+class ModelRegistryResponse(BaseModel):
+    """Response schema for the model registry admin endpoint."""
+    active_version: Optional[str] = Field(default=None, description="Version serving predictions")
+    versions: List[ModelVersionInfo] = Field(..., description="Versions in the registry")
+    swap: SwapStats = Field(..., description="Hot-swap status")
+
+
+class ModelSwapResponse(BaseModel):
+    """Response schema for a requested model swap."""
+    status: str = Field(..., description="'accepted' while the version loads in the background")
+    version: str = Field(..., description="Requested version")
+
+
+class ShadowLatency(BaseModel):
+    """Scoring latency of one model on the shadow batches."""
+    mean_row_us: Optional[float] = Field(default=None, description="Mean scoring time per row in microseconds")
+    batch_p50_ms: Optional[float] = Field(default=None, description="Median batch scoring time (recent batches)")
+    batch_p99_ms: Optional[float] = Field(default=None, description="99th percentile batch scoring time (recent batches)")
+
+
+class ShadowCandidate(BaseModel):
+    """Comparison of one candidate model with the served predictions."""
+    name: str = Field(..., description="Registry version or artifact path")
+    model_path: Optional[str] = Field(default=None, description="Loaded artifact")
+    rows: int = Field(..., description="Live rows scored by the candidate")
+    agreement: Optional[float] = Field(default=None, description="Fraction of rows where it predicts the served class")
+    mean_probability_shift: Optional[float] = Field(
+        default=None, description="Mean total variation distance between its and the served probabilities"
+    )
+    flips: Dict[str, Dict[str, int]] = Field(..., description="Row counts by served class, then candidate class")
+    latency: ShadowLatency = Field(..., description="Scoring latency on the same batches as the primary baseline")
+
+
+class ShadowQueueStats(BaseModel):
+    """Shadow queue counters."""
+    capacity: int = Field(..., description="Rows the queue holds before dropping")
+    queued: int = Field(..., description="Rows waiting to be scored")
+    submitted: int = Field(..., description="Rows copied from live requests")
+    dropped: int = Field(..., description="Rows dropped because the queue was full")
+    scored: int = Field(..., description="Rows scored by the candidates")
+    batches: int = Field(..., description="Batches sent to the shadow worker")
+
+
+class ShadowBaseline(BaseModel):
+    """The primary model scored on the same shadow batches."""
+    rows: int = Field(..., description="Rows scored")
+    latency: ShadowLatency = Field(..., description="Scoring latency")
+
+
+class ShadowResponse(BaseModel):
+    """Response schema for shadow scoring statistics."""
+    enabled: bool = Field(..., description="Whether live traffic is being shadowed")
+    error: Optional[str] = Field(default=None, description="Last shadow worker error")
+    queue: ShadowQueueStats = Field(..., description="Queue counters")
+    primary: ShadowBaseline = Field(..., description="Latency baseline of the serving model")
+    candidates: List[ShadowCandidate] = Field(..., description="One entry per candidate model")
+
+
+class OnlineUpdateRequest(BaseModel):
+    """Request schema for an online model update.
+    
+    Each item has the q1-q30 fields of PredictionRequest plus the confirmed
+    severity ``label`` (0-3). The batch is rejected if any row is invalid.
+    """
+    items: List[Dict[str, Any]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE,
+        description="Labeled questionnaires: q1-q30 plus 'label' (severity level 0-3)"
+    )
+
+
+class OnlineUpdateResponse(BaseModel):
+    """Response schema for an online model update."""
+    rows: int = Field(..., description="Rows applied in this update")
+    updates: int = Field(..., description="Mini-batches applied since the base model")
+    samples_seen: int = Field(..., description="Samples behind the scaler statistics")
+    loss_before: float = Field(..., description="Log loss on this batch before the update")
+    loss_after: float = Field(..., description="Log loss on this batch after the update")
+    published_version: Optional[str] = Field(default=None, description="Registry version swapped in, if a snapshot was published")
+
+
+class DriftWindow(BaseModel):
+    """Drift of one traffic window against the training reference."""
+    drift_score: float = Field(..., description="Largest of inputs_psi_mean, predictions_psi and confidence_psi")
+    status: str = Field(..., description="stable (< 0.1), moderate (< 0.25) or major")
+    inputs_psi_mean: float = Field(..., description="Mean answer-distribution PSI over the 30 questions")
+    inputs_psi_max: float = Field(..., description="Largest answer-distribution PSI of any question")
+    predictions_psi: Optional[float] = Field(default=None, description="PSI of the predicted-class distribution")
+    confidence_psi: Optional[float] = Field(default=None, description="PSI of the confidence distribution")
+    questions: Dict[str, float] = Field(..., description="Answer-distribution PSI per question (q1-q30)")
+
+
+class DriftResponse(BaseModel):
+    """Response schema for the drift monitor."""
+    enabled: bool = Field(..., description="Whether drift monitoring is on")
+    samples: int = Field(..., description="Questionnaires observed since startup")
+    prediction_samples: int = Field(..., description="Predictions observed since the served model was loaded")
+    recent_samples: float = Field(..., description="Effective number of questionnaires in the decayed window")
+    half_life: float = Field(..., description="Half-life of the decayed window in questionnaires")
+    reference_available: bool = Field(..., description="Whether the served model has a training reference")
+    reference_samples: Optional[int] = Field(default=None, description="Training rows behind the reference")
+    total: Optional[DriftWindow] = Field(default=None, description="All traffic since startup")
+    recent: Optional[DriftWindow] = Field(default=None, description="Exponentially decayed recent traffic")
+    histograms: Optional[Dict[str, Dict[str, List[Any]]]] = Field(default=None, description="Normalized live histograms, if requested")
+
+
 class HealthResponse(BaseModel):
     """Response schema for health check endpoint."""
     status: str = Field(..., description="Service status")
     model_loaded: bool = Field(..., description="Whether the ML model is loaded")
     version: str = Field(default="1.0.0", description="API version")
+    model_version: Optional[str] = Field(default=None, description="Active model registry version, if served from the registry")
+    cache: Optional[CacheStats] = Field(default=None, description="Prediction cache statistics")
+    startup: Optional[StartupStats] = Field(default=None, description="Cold start time and memory")
+    batching: Optional[BatchingStats] = Field(default=None, description="Micro-batching statistics, if enabled")
+    admission: Optional[AdmissionStats] = Field(default=None, description="Admission control statistics, if enabled")
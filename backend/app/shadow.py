@@ -0,0 +1,370 @@
+"""
+Shadow scoring of candidate models on live traffic.
+
+Candidate model sets (registry versions or artifact paths in
+SHADOW_MODELS) are loaded in a separate, low-priority worker process next to
+the primary ModelManager. Request handlers only append the served answers,
+class and probabilities to a bounded in-memory queue (O(1), no model work).
+When the queue is full the row is dropped and counted; production requests
+never wait for shadow work.
+
+A feeder thread drains the queue in batches of up to SHADOW_BATCH_SIZE
+rows and sends them to the worker. The worker scores each batch with every
+candidate and, as the latency baseline, with the primary model. For each
+candidate the feeder then aggregates:
+
+- agreement with the served predictions
+- a class-flip matrix (served class × candidate class)
+- the mean change in the probability vector (total variation distance)
+- per-row and per-batch scoring CPU time next to the primary's on the same
+  batches
+
+The worker process runs at idle CPU priority (SCHED_IDLE on Linux, else
+nice SHADOW_NICE), so shadow scoring stays off the server's GIL and only
+uses CPU time that production requests leave free.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASELINE = "primary"
+LATENCY_WINDOW = 1000  # Recent batches kept per model for latency percentiles
+
+# Per-process models used by the shadow worker
+_worker_candidates: Dict[str, Any] = {}
+_worker_primary: Dict[Path, Any] = {}
+
+
+def _init_shadow_worker(candidates: List[Tuple[str, str]], nice: int) -> None:
+    """Load every candidate once in the shadow worker process."""
+    from .model import ModelManager
+
+    try:
+        # Run only when the CPU would otherwise be idle (Linux)
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    except (AttributeError, OSError):
+        if nice:
+            try:
+                os.nice(nice)
+            except (AttributeError, OSError):
+                pass
+    for name, model_path in candidates:
+        manager = ModelManager(cache_size=0)
+        if not manager.load(Path(model_path), version=name):
+            raise RuntimeError(f"Shadow worker could not load candidate {name!r} from {model_path}")
+        _worker_candidates[name] = manager
+
+
+def _shadow_ready() -> List[str]:
+    return list(_worker_candidates)
+
+
+def _shadow_score(X: np.ndarray, primary_path: Optional[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray, float]]:
+    """Score X with every candidate and the primary model.
+
+    Returns:
+        {name: (classes, probabilities, seconds)}; the primary is under BASELINE
+    """
+    from .model import ModelManager
+
+    models = dict(_worker_candidates)
+    if primary_path is not None:
+        path = Path(primary_path)
+        if path not in _worker_primary:
+            # Follow hot swaps of the primary; keep only the current one
+            _worker_primary.clear()
+            manager = ModelManager(cache_size=0)
+            if manager.load(path):
+                _worker_primary[path] = manager
+        if path in _worker_primary:
+            models[BASELINE] = _worker_primary[path]
+
+    results = {}
+    for name, manager in models.items():
+        # CPU time, so that waiting for production work does not count
+        start = time.process_time()
+        classes, _, probabilities = manager.predict_batch(X)
+        results[name] = (classes.astype(np.int8), probabilities.astype(np.float32), time.process_time() - start)
+    return results
+
+
+class _ModelStats:
+    """Aggregates for one candidate (or the baseline)."""
+
+    def __init__(self, name: str, model_path: Optional[str], n_classes: int):
+        self.name = name
+        self.model_path = model_path
+        self.rows = 0
+        self.agree = 0
+        self.flips = np.zeros((n_classes, n_classes), dtype=np.int64)
+        self.probability_shift = 0.0
+        self.seconds = 0.0
+        self.batch_seconds: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def latency(self) -> Dict[str, Optional[float]]:
+        batches = np.array(self.batch_seconds) if self.batch_seconds else None
+        return {
+            "mean_row_us": round(self.seconds / self.rows * 1e6, 2) if self.rows else None,
+            "batch_p50_ms": round(float(np.percentile(batches, 50)) * 1000, 3) if batches is not None else None,
+            "batch_p99_ms": round(float(np.percentile(batches, 99)) * 1000, 3) if batches is not None else None,
+        }
+
+
+class ShadowScorer:
+    """Copies live predictions to candidate models in the background."""
+
+    def __init__(
+        self,
+        manager,
+        candidates: Sequence[Tuple[str, Path]],
+        class_labels: Sequence[str],
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        batch_wait_ms: float = 200,
+        sample_rate: float = 1.0,
+        nice: int = 10,
+    ):
+        if not candidates:
+            raise ValueError("Shadow scoring needs at least one candidate model")
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError(f"queue_size and batch_size must be >= 1, got {queue_size} and {batch_size}")
+        self.manager = manager
+        self.candidates = [(name, Path(path)) for name, path in candidates]
+        self.class_labels = [label.lower() for label in class_labels]
+        self.n_classes = len(self.class_labels)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.sample_rate = sample_rate
+        self.nice = nice
+        self.enabled = False
+        self.error: Optional[str] = None
+
+        # (features (n, 30), served classes (n,), served probabilities (n, K)) chunks
+        self._queue: deque = deque()
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.batches = 0
+        self._stats = {
+            name: _ModelStats(name, str(path), self.n_classes) for name, path in self.candidates
+        }
+        self._stats[BASELINE] = _ModelStats(BASELINE, None, self.n_classes)
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, manager, registry, class_labels: Sequence[str]) -> Optional["ShadowScorer"]:
+        """Build a scorer from SHADOW_* settings.
+
+        SHADOW_MODELS is a comma-separated list of registry versions or
+        artifact paths. Returns None when it is empty (the default).
+
+        Raises:
+            KeyError: If a registry version does not exist
+        """
+        entries = [entry.strip() for entry in os.getenv("SHADOW_MODELS", "").split(",") if entry.strip()]
+        if not entries:
+            return None
+        candidates = []
+        for entry in entries:
+            path = Path(entry)
+            if path.is_file():
+                candidates.append((entry, path))
+            else:
+                candidates.append((entry, registry.model_path(entry)))
+        return cls(
+            manager,
+            candidates,
+            class_labels,
+            queue_size=int(os.getenv("SHADOW_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("SHADOW_BATCH_SIZE", "256")),
+            batch_wait_ms=float(os.getenv("SHADOW_BATCH_WAIT_MS", "200")),
+            sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", "1")),
+            nice=int(os.getenv("SHADOW_NICE", "10")),
+        )
+
+    def start(self) -> None:
+        """Start the worker process and feeder thread (blocking: loads the candidates)."""
+        self._pool = ProcessPoolExecutor(
+            max_workers=1,
+            initializer=_init_shadow_worker,
+            initargs=([(name, str(path)) for name, path in self.candidates], self.nice),
+        )
+        try:
+            self._pool.submit(_shadow_ready).result()
+        except Exception as e:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.error = str(e)
+            raise
+        self.enabled = True
+        self._thread = threading.Thread(target=self._run, name="shadow-feeder", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the feeder and the worker; queued rows are discarded."""
+        self.enabled = False
+        self._stopping = True
+        self._ready.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, features, prediction: int, probabilities) -> None:
+        """Queue one served prediction for shadow scoring (never blocks)."""
+        if not self.enabled or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return
+        values = list(probabilities.values())
+        if len(values) != self.n_classes:
+            # Models without predict_proba report only the predicted class
+            values = [0.0] * self.n_classes
+            values[prediction] = 1.0
+        self._enqueue(([features], [prediction], [values]), 1)
+
+    def submit_batch(self, X: np.ndarray, classes: np.ndarray, probabilities: np.ndarray) -> None:
+        """Queue N served predictions for shadow scoring (never blocks)."""
+        if not self.enabled or len(X) == 0:
+            return
+        if self.sample_rate < 1:
+            keep = np.random.random(len(X)) < self.sample_rate
+            X, classes, probabilities = X[keep], classes[keep], probabilities[keep]
+        self._enqueue((X, classes, probabilities), len(X))
+
+    def _enqueue(self, chunk, n: int) -> None:
+        with self._lock:
+            self.submitted += n
+            if self._queued + n > self.queue_size:
+                self.dropped += n
+                return
+            self._queue.append(chunk)
+            self._queued += n
+            full = self._queued >= self.batch_size
+        if full:
+            self._ready.set()
+
+    def _take(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Up to batch_size queued rows as arrays, or None if the queue is empty."""
+        with self._lock:
+            chunks, rows = [], 0
+            while self._queue and rows < self.batch_size:
+                chunk = self._queue.popleft()
+                chunks.append(chunk)
+                rows += len(chunk[0])
+            self._queued -= rows
+        if not chunks:
+            return None
+        X = np.concatenate([np.asarray(c[0], dtype=np.int8).reshape(-1, 30) for c in chunks])
+        classes = np.concatenate([np.asarray(c[1], dtype=np.int64) for c in chunks])
+        probabilities = np.concatenate([np.asarray(c[2], dtype=np.float32).reshape(len(c[1]), -1) for c in chunks])
+        return X, classes, probabilities
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._ready.wait(self.batch_wait)
+            self._ready.clear()
+            while not self._stopping:
+                batch = self._take()
+                if batch is None:
+                    break
+                X, served, served_probabilities = batch
+                primary = self.manager.model_path
+                try:
+                    results = self._pool.submit(
+                        _shadow_score, X, str(primary) if primary is not None else None
+                    ).result()
+                except BrokenProcessPool as e:
+                    self.enabled, self.error = False, f"Shadow worker died: {e}"
+                    logger.error(f"❌ {self.error}; shadow scoring disabled")
+                    return
+                except Exception as e:
+                    self.error = str(e)
+                    logger.warning(f"Shadow batch failed: {e}")
+                    continue
+                self._aggregate(served, served_probabilities, results)
+
+    def _aggregate(self, served: np.ndarray, served_probabilities: np.ndarray, results) -> None:
+        with self._stats_lock:
+            self.batches += 1
+            self.scored += len(served)
+            for name, (classes, probabilities, seconds) in results.items():
+                stats = self._stats[name]
+                stats.rows += len(served)
+                stats.seconds += seconds
+                stats.batch_seconds.append(seconds)
+                stats.agree += int((classes == served).sum())
+                np.add.at(stats.flips, (served, classes), 1)
+                if probabilities.shape == served_probabilities.shape:
+                    stats.probability_shift += 0.5 * float(np.abs(probabilities - served_probabilities).sum())
+
+    def report(self) -> Dict[str, Any]:
+        """Queue counters and per-candidate agreement, flips and latency."""
+        with self._stats_lock:
+            def summary(stats: _ModelStats) -> Dict[str, Any]:
+                return {
+                    "name": stats.name,
+                    "model_path": stats.model_path,
+                    "rows": stats.rows,
+                    "agreement": round(stats.agree / stats.rows, 4) if stats.rows else None,
+                    "mean_probability_shift": round(stats.probability_shift / stats.rows, 4) if stats.rows else None,
+                    "flips": {
+                        self.class_labels[i]: {
+                            self.class_labels[j]: int(stats.flips[i, j]) for j in range(self.n_classes)
+                        }
+                        for i in range(self.n_classes)
+                    },
+                    "latency": stats.latency(),
+                }
+
+            return {
+                "enabled": self.enabled,
+                "error": self.error,
+                "queue": {
+                    "capacity": self.queue_size,
+                    "queued": self._queued,
+                    "submitted": self.submitted,
+                    "dropped": self.dropped,
+                    "scored": self.scored,
+                    "batches": self.batches,
+                },
+                "primary": {"latency": self._stats[BASELINE].latency(), "rows": self._stats[BASELINE].rows},
+                "candidates": [summary(self._stats[name]) for name, _ in self.candidates],
+            }
+
+    def render_metrics(self):
+        """Prometheus lines for the /metrics collector."""
+        report = self.report()
+        queue = report["queue"]
+        yield "# HELP pdd_shadow_rows_total Rows copied to shadow scoring, by outcome"
+        yield "# TYPE pdd_shadow_rows_total counter"
+        yield f'pdd_shadow_rows_total{{outcome="scored"}} {queue["scored"]}'
+        yield f'pdd_shadow_rows_total{{outcome="dropped"}} {queue["dropped"]}'
+        yield "# HELP pdd_shadow_queued Rows waiting for shadow scoring"
+        yield "# TYPE pdd_shadow_queued gauge"
+        yield f"pdd_shadow_queued {queue['queued']}"
+        yield "# HELP pdd_shadow_agreement Fraction of rows where the candidate matches the served class"
+        yield "# TYPE pdd_shadow_agreement gauge"
+        for candidate in report["candidates"]:
+            if candidate["agreement"] is not None:
+                yield f'pdd_shadow_agreement{{candidate="{candidate["name"]}"}} {candidate["agreement"]}'
@@ -0,0 +1,281 @@
+"""
+Reproducible inference benchmarks for the serving path.
+
+For every model family in ml/config.py MODEL_CONFIGS, a model is trained on
+a synthetic dataset with the production schema (30 answers, values 1-4,
+quartile labels on the total score), saved like the real artifacts and
+loaded through ModelManager. The suite then measures:
+
+- ``single``: ModelManager.predict latency for one row (mean/p50/p99, µs)
+- ``batch``: ModelManager.predict_batch throughput (rows/sec) per batch size
+- ``http``: POST /predict and /predict/compact through an in-process ASGI
+  client at several concurrency levels (requests/sec, CPU µs per request,
+  p50/p99 latency in ms)
+- ``single_sklearn`` / ``batch_sklearn``: the same as single/batch with
+  COMPILED_ENGINE off, for models that compile to a NumPy engine
+
+The prediction cache is disabled while measuring so every call exercises
+the model. Results are written to JSON; ``--compare`` checks a run against
+a baseline and exits non-zero if any metric regressed past ``--threshold``.
+
+Usage (from backend/, requires httpx):
+    python -m benchmarks.run --output benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.run --models logistic_regression --quick
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ML_DIR = BACKEND_DIR.parent / "ml"
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(ML_DIR))
+
+from config import MODEL_CONFIGS, RANDOM_STATE, SELECTED_FEATURES  # noqa: E402
+from train import build_estimator  # noqa: E402
+from app.cache import PredictionCache  # noqa: E402
+from app.model import ModelManager, model_manager  # noqa: E402
+
+SYNTHETIC_ROWS = 4000
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+# Metrics where a larger value is worse; every other metric is a throughput
+LOWER_IS_BETTER = ("_us", "_ms")
+
+
+def make_synthetic_dataset(n_rows: int = SYNTHETIC_ROWS, seed: int = RANDOM_STATE):
+    """Synthetic questionnaires with the production schema.
+
+    A latent distress score drives correlated answers (1-4) and labels are
+    total-score quartiles, mirroring how the real target is built.
+    """
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n_rows, 1))
+    loadings = rng.uniform(0.6, 1.2, size=(1, len(SELECTED_FEATURES)))
+    raw = 2.3 + latent * loadings + rng.normal(scale=0.7, size=(n_rows, len(SELECTED_FEATURES)))
+    X = np.clip(np.rint(raw), 1, 4).astype(np.int64)
+    total = X.sum(axis=1)
+    y = np.digitize(total, np.quantile(total, [0.25, 0.5, 0.75]), right=True)
+    return X, y
+
+
+def train_artifacts(name: str, X: np.ndarray, y: np.ndarray, out_dir: Path) -> Path:
+    """Fit scaler + model and save them the way the training notebook does."""
+    import joblib
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X)
+    model = build_estimator(name).fit(scaler.transform(X), y)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, out_dir / "psychiatric_model.joblib")
+    joblib.dump(scaler, out_dir / "scaler.joblib")
+    (out_dir / "feature_names.json").write_text(json.dumps(SELECTED_FEATURES))
+    return out_dir / "psychiatric_model.joblib"
+
+
+def _percentiles(samples_s, scale: float, suffix: str) -> dict:
+    samples = np.asarray(samples_s) * scale
+    return {
+        f"mean{suffix}": float(samples.mean()),
+        f"p50{suffix}": float(np.percentile(samples, 50)),
+        f"p99{suffix}": float(np.percentile(samples, 99)),
+    }
+
+
+def bench_single(manager: ModelManager, rows: np.ndarray, iterations: int) -> dict:
+    """Latency of ModelManager.predict on one row at a time."""
+    rows = rows.tolist()
+    for features in rows[:100]:
+        manager.predict(features)  # warm-up
+    timings = []
+    for i in range(iterations):
+        features = rows[i % len(rows)]
+        start = time.perf_counter()
+        manager.predict(features)
+        timings.append(time.perf_counter() - start)
+    return _percentiles(timings, 1e6, "_us")
+
+
+def bench_batch(manager: ModelManager, rows: np.ndarray, repeats: int) -> dict:
+    """Throughput of ModelManager.predict_batch per batch size (best of repeats)."""
+    results = {}
+    for size in BATCH_SIZES:
+        X = np.resize(rows, (size, rows.shape[1]))
+        manager.predict_batch(X)  # warm-up
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            manager.predict_batch(X)
+            best = min(best, time.perf_counter() - start)
+        results[f"batch_{size}_rows_per_sec"] = size / best
+    return results
+
+
+async def _http_run(rows: list, concurrency: int, n_requests: int, compact: bool = False) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    timings = []
+    path = "/predict/compact" if compact else "/predict"
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(offset: int):
+            for i in range(offset, n_requests, concurrency):
+                row = rows[i % len(rows)]
+                payload = "".join(map(str, row)) if compact else {f"q{j + 1}": v for j, v in enumerate(row)}
+                start = time.perf_counter()
+                response = await client.post(path, json=payload)
+                timings.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        await asyncio.gather(*(worker(k) for k in range(concurrency)))
+        cpu = time.process_time() - cpu_start
+        elapsed = time.perf_counter() - start
+    return {
+        "requests_per_sec": n_requests / elapsed,
+        # Includes the in-process client, so compare runs rather than read absolutely
+        "cpu_per_request_us": cpu / n_requests * 1e6,
+        **_percentiles(timings, 1e3, "_ms"),
+    }
+
+
+def bench_http(rows: np.ndarray, n_requests: int) -> dict:
+    """POST /predict (and /predict/compact) throughput through the ASGI app."""
+    rows = rows.tolist()
+    results = {}
+    asyncio.run(_http_run(rows, 1, min(50, n_requests)))  # warm-up
+    for concurrency in CONCURRENCY_LEVELS:
+        for compact in (False, True):
+            run = asyncio.run(_http_run(rows, concurrency, n_requests, compact))
+            prefix = f"c{concurrency}_compact" if compact else f"c{concurrency}"
+            for key, value in run.items():
+                results[f"{prefix}_{key}"] = value
+    return results
+
+
+def run_suite(model_names, quick: bool = False) -> dict:
+    iterations = 500 if quick else 5000
+    repeats = 3 if quick else 7
+    n_requests = 200 if quick else 2000
+
+    X, y = make_synthetic_dataset()
+    rng = np.random.default_rng(RANDOM_STATE + 1)
+    probe = rng.integers(1, 5, size=(2000, len(SELECTED_FEATURES)))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in model_names:
+            print(f"⏱️  {name}: training on {len(X):,} synthetic rows...")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                model_path = train_artifacts(name, X, y, Path(tmp) / name)
+
+            # Benchmark the joblib-loaded model (compiled engine if linear)
+            manager = ModelManager(cache_size=0)
+            if not manager.load(model_path):
+                raise RuntimeError(f"Could not load benchmark model {name}")
+            model_manager.cache = PredictionCache(0)
+            model_manager.load(model_path)
+
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                results[name] = {
+                    "engine": type(manager.engine).__name__ if manager.engine is not None else "sklearn",
+                    "single": bench_single(manager, probe, iterations),
+                    "batch": bench_batch(manager, probe, repeats),
+                    "http": bench_http(probe, n_requests),
+                }
+                if manager.engine is not None:
+                    # Same model served through scikit-learn, to show the engine's gain
+                    reference = ModelManager(cache_size=0)
+                    reference.compile = False
+                    reference.load(model_path)
+                    results[name]["single_sklearn"] = bench_single(reference, probe, max(100, iterations // 10))
+                    results[name]["batch_sklearn"] = bench_batch(reference, probe, repeats)
+            single = results[name]["single"]
+            print(f"   single p50 {single['p50_us']:.1f} µs, "
+                  f"batch_1000 {results[name]['batch']['batch_1000_rows_per_sec']:,.0f} rows/s, "
+                  f"http c8 {results[name]['http']['c8_requests_per_sec']:,.0f} req/s")
+            if "single_sklearn" in results[name]:
+                print(f"   scikit-learn: single p50 {results[name]['single_sklearn']['p50_us']:.1f} µs, "
+                      f"batch_1000 {results[name]['batch_sklearn']['batch_1000_rows_per_sec']:,.0f} rows/s")
+    return results
+
+
+def environment_info() -> dict:
+    import sklearn
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "synthetic_rows": SYNTHETIC_ROWS,
+        "random_state": RANDOM_STATE,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """List metrics that regressed by more than threshold (fraction)."""
+    regressions = []
+    for model, sections in baseline.get("results", {}).items():
+        for section, metrics in sections.items():
+            if not isinstance(metrics, dict):
+                continue
+            for metric, base in metrics.items():
+                value = current.get("results", {}).get(model, {}).get(section, {}).get(metric)
+                if value is None or not base:
+                    continue
+                if metric.endswith(LOWER_IS_BETTER):
+                    change = (value - base) / base
+                else:
+                    change = (base - value) / base
+                if change > threshold:
+                    regressions.append((f"{model}.{section}.{metric}", base, value, change))
+    return regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the inference serving path.")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_CONFIGS), choices=list(MODEL_CONFIGS))
+    parser.add_argument("--output", type=Path, default=None, help="Write results JSON here")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression fraction (default 0.10)")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations for a fast smoke run")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment_info(), "results": run_suite(args.models, quick=args.quick)}
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"📁 Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for metric, base, value, change in regressions:
+                print(f"   {metric}: {base:,.2f} → {value:,.2f} ({change:+.1%} worse)")
+            sys.exit(1)
+        print(f"✅ No regressions above {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
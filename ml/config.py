@@ -89,6 +89,9 @@ CLASS_COLORS = {
 # Train/test split ratio
 TEST_SIZE = 0.2
 
+# Stratified cross-validation folds on the training split
+CV_FOLDS = 5
+
 # Model configurations
 MODEL_CONFIGS = {
     'logistic_regression': {
@@ -111,3 +114,11 @@ MODEL_CONFIGS = {
         'random_state': RANDOM_STATE
     }
 }
+
+# Model names as they appear in training_report.json
+MODEL_DISPLAY_NAMES = {
+    'logistic_regression': 'Logistic Regression',
+    'random_forest': 'Random Forest',
+    'svm': 'SVM',
+    'gradient_boosting': 'Gradient Boosting',
+}
@@ -0,0 +1,287 @@
+"""
+Offline batch scoring of a raw DASS export.
+
+Reads the tab-separated DASS file in chunks, picks out the 30
+SELECTED_FEATURES answer columns and scores the chunks across a process
+pool with the backend's ModelManager. Results are written to CSV or
+Parquet (requires pyarrow) with the class, confidence and probabilities.
+
+With ``--cache`` the answers come from the memory-mapped dataset cache
+(see ml/dataset.py) instead: workers read row ranges straight from the
+mapped file and nothing is parsed after the first run.
+
+Usage:
+    python ml/score.py data.csv scores.csv
+    python ml/score.py data.csv scores.parquet --workers 8 --chunk-size 20000
+    python ml/score.py data.csv scores.csv --cache
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import SELECTED_FEATURES, CLASS_LABELS
+from dataset import open_dataset
+
+# Reuse the serving code so offline and online scores are identical
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.model import ModelManager  # noqa: E402
+
+DEFAULT_MODEL_PATH = BACKEND_DIR / "models" / "psychiatric_model.joblib"
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Per-process model, loaded once by the pool initializer
+_manager = None
+# Per-process memory map of the cached answers (--cache only)
+_answers = None
+
+
+def _init_worker(model_path: str, cache_dir: str = None) -> None:
+    """Load the model (and map the cached answers) once in each worker process."""
+    global _manager, _answers
+    _manager = ModelManager(cache_size=0)
+    if not _manager.load(Path(model_path)):
+        raise RuntimeError(f"Could not load model from {model_path}")
+    if cache_dir:
+        _answers = np.load(Path(cache_dir) / "answers.npy", mmap_mode="r")
+
+
+def _score_answers(X: np.ndarray):
+    """Score raw answers; rows outside 1-4 (or missing) are left unscored.
+
+    Returns:
+        Tuple of (valid_mask, classes, confidences, probabilities)
+    """
+    valid = np.isfinite(X).all(axis=1) & ((X >= 1) & (X <= 4)).all(axis=1)
+    n_classes = len(CLASS_LABELS)
+    classes = np.full(len(X), -1, dtype=np.int8)
+    confidences = np.full(len(X), np.nan)
+    probabilities = np.full((len(X), n_classes), np.nan)
+    if valid.any():
+        cls, conf, proba = _manager.predict_batch(X[valid].astype(np.int64))
+        classes[valid] = cls
+        confidences[valid] = conf
+        probabilities[valid] = proba
+    return valid, classes, confidences, probabilities
+
+
+def _to_frame(start_row: int, ids, result) -> pd.DataFrame:
+    """Build the output frame for one scored chunk."""
+    valid, classes, confidences, probabilities = result
+    frame = pd.DataFrame({"row": np.arange(start_row, start_row + len(valid))})
+    if ids is not None:
+        frame["id"] = ids
+    frame["valid"] = valid
+    frame["severity_level"] = classes
+    frame["prediction"] = pd.Series(classes).map(CLASS_LABELS).fillna("").to_numpy()
+    frame["confidence"] = confidences
+    for i, label in CLASS_LABELS.items():
+        frame[f"prob_{label.lower()}"] = probabilities[:, i]
+    return frame
+
+
+def _score_block(header: bytes, block: bytes, start_row: int, sep: str, id_column: str, as_csv: bool):
+    """Parse, score and format one block of raw lines inside a worker.
+
+    Parsing and output formatting happen in the worker too, so the parent
+    only splits lines and writes results and throughput scales with cores.
+
+    Returns:
+        Tuple of (rows, valid_rows, payload) where payload is CSV text
+        (without header) or a DataFrame for Parquet output.
+    """
+    usecols = SELECTED_FEATURES + ([id_column] if id_column else [])
+    chunk = pd.read_csv(io.BytesIO(header + block), sep=sep, usecols=usecols)
+    X = chunk[SELECTED_FEATURES].to_numpy(dtype=float)
+    ids = chunk[id_column].to_numpy() if id_column else None
+    result = _score_answers(X)
+    frame = _to_frame(start_row, ids, result)
+    payload = frame.to_csv(index=False, header=False) if as_csv else frame
+    return len(frame), int(result[0].sum()), payload
+
+
+def _score_cached(start_row: int, stop_row: int, as_csv: bool):
+    """Score a row range of the memory-mapped answers inside a worker.
+
+    Missing answers are stored as 0, so those rows come out invalid.
+
+    Returns:
+        Same as _score_block
+    """
+    X = _answers[start_row:stop_row].astype(float)
+    result = _score_answers(X)
+    frame = _to_frame(start_row, None, result)
+    payload = frame.to_csv(index=False, header=False) if as_csv else frame
+    return len(frame), int(result[0].sum()), payload
+
+
+def _iter_blocks(path: Path, chunk_size: int):
+    """Yield (header, block, n_lines) for blocks of at most chunk_size data lines.
+
+    Lines are split on newlines only; quoted fields spanning lines are not
+    supported (the DASS export has none).
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        lines = []
+        for line in f:
+            if line.strip():
+                lines.append(line)
+            if len(lines) >= chunk_size:
+                yield header, b"".join(lines), len(lines)
+                lines = []
+        if lines:
+            yield header, b"".join(lines), len(lines)
+
+
+class _OutputWriter:
+    """Incremental CSV or Parquet writer."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.parquet = path.suffix.lower() in (".parquet", ".pq")
+        self._writer = None
+        self._file = None
+        if self.parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise SystemExit("❌ Parquet output requires pyarrow (pip install pyarrow)")
+
+    def write(self, payload, columns) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(payload, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            if self._file is None:
+                self._file = open(self.path, "w", newline="")
+                self._file.write(",".join(columns) + "\n")
+            self._file.write(payload)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def score_file(
+    input_path: Path,
+    output_path: Path,
+    model_path: Path = DEFAULT_MODEL_PATH,
+    workers: int = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sep: str = "\t",
+    id_column: str = None,
+    use_cache: bool = False,
+) -> dict:
+    """Score every row of a DASS export and write the results.
+
+    Returns:
+        Summary dict with row counts, elapsed seconds and rows/sec.
+    """
+    workers = workers or os.cpu_count() or 1
+    if use_cache and id_column:
+        raise SystemExit("❌ --id-column is not available with --cache (the cache holds answers only)")
+
+    # Fail fast (in the parent) if the model or its feature order is wrong
+    manager = ModelManager(cache_size=0)
+    if not manager.load(model_path):
+        raise SystemExit(f"❌ Could not load model from {model_path}")
+    if list(manager.feature_names) != SELECTED_FEATURES:
+        raise SystemExit("❌ Model feature_names.json does not match config.SELECTED_FEATURES")
+
+    writer = _OutputWriter(output_path)
+    columns = ["row"] + (["id"] if id_column else []) + [
+        "valid", "severity_level", "prediction", "confidence"
+    ] + [f"prob_{label.lower()}" for label in CLASS_LABELS.values()]
+
+    total = valid_total = submitted = 0
+    start = time.perf_counter()
+    # Bound in-flight blocks so memory stays flat on large files
+    pending = deque()
+    max_pending = 2 * workers
+
+    def drain_one():
+        nonlocal total, valid_total
+        rows, valid_rows, payload = pending.popleft().result()
+        total += rows
+        valid_total += valid_rows
+        writer.write(payload, columns)
+
+    cache_dir = None
+    if use_cache:
+        dataset = open_dataset(input_path, sep)
+        cache_dir, n_rows = str(dataset.cache_dir), len(dataset)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(str(model_path), cache_dir)
+        ) as pool:
+            def submit(fn, *job_args):
+                pending.append(pool.submit(fn, *job_args))
+                if len(pending) >= max_pending:
+                    drain_one()
+
+            if cache_dir:
+                for start_row in range(0, n_rows, chunk_size):
+                    submit(_score_cached, start_row, min(start_row + chunk_size, n_rows), not writer.parquet)
+            else:
+                for header, block, n_lines in _iter_blocks(input_path, chunk_size):
+                    submit(_score_block, header, block, submitted, sep, id_column, not writer.parquet)
+                    submitted += n_lines
+            while pending:
+                drain_one()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": total,
+        "valid_rows": valid_total,
+        "invalid_rows": total - valid_total,
+        "workers": workers,
+        "seconds": elapsed,
+        "rows_per_sec": total / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Score a raw DASS export offline.")
+    parser.add_argument("input", type=Path, help="Tab-separated DASS export (e.g. data.csv)")
+    parser.add_argument("output", type=Path, help="Output file (.csv or .parquet)")
+    parser.add_argument("--model", type=Path, default=DEFAULT_MODEL_PATH, help="Path to psychiatric_model.joblib")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument("--sep", default="\t", help="Field separator (default: tab)")
+    parser.add_argument("--id-column", default=None, help="Optional column copied through to the output")
+    parser.add_argument("--cache", action="store_true", help="Score from the memory-mapped dataset cache (see dataset.py)")
+    args = parser.parse_args(argv)
+
+    summary = score_file(
+        args.input, args.output, args.model,
+        workers=args.workers, chunk_size=args.chunk_size, sep=args.sep, id_column=args.id_column,
+        use_cache=args.cache,
+    )
+    print(f"✅ Scored {summary['rows']:,} rows ({summary['invalid_rows']:,} invalid) "
+          f"with {summary['workers']} workers in {summary['seconds']:.2f}s "
+          f"→ {summary['rows_per_sec']:,.0f} rows/sec")
+    print(f"📁 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
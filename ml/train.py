@@ -0,0 +1,332 @@
+"""
+Scripted training pipeline (replaces ml/train_colab.ipynb for offline runs).
+
+Reproduces the notebook: the same preprocessing, target, split, scaler,
+metrics, best-model selection and artifacts. Instead of fitting each
+model and then refitting it five more times inside cross_val_score, every
+(model, fold) fit is an independent task in one process pool:
+
+- the data is loaded (memory-mapped from the dataset cache, see
+  ml/dataset.py), split and scaled once in the parent
+- the fold indices are computed once and shared by all models
+- each worker receives the scaled matrices once, through its initializer
+
+Cross-validation uses the notebook's StratifiedKFold on the scaled
+training split, so CV scores match the notebook's. Estimators that can
+multi-thread (``n_jobs``) are pinned to one thread; the pool provides
+the parallelism.
+
+Usage:
+    python ml/train.py --data data/data.csv
+    python ml/train.py --data data.csv --output backend/models --workers 8
+    python ml/train.py --data data.csv --models logistic_regression svm --publish 2024-07-15
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    CLASS_LABELS, CV_FOLDS, DATA_FILENAME, MODEL_CONFIGS,
+    MODEL_DISPLAY_NAMES, RANDOM_STATE, SELECTED_FEATURES, TEST_SIZE,
+)
+from dataset import open_dataset
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+DEFAULT_DATA_PATH = ROOT_DIR / "data" / DATA_FILENAME
+DEFAULT_OUTPUT_DIR = BACKEND_DIR / "models"
+
+# Shared, read-only training data in each worker process
+_data = {}
+
+
+def build_estimator(name: str, n_jobs: int = None):
+    """Instantiate a MODEL_CONFIGS entry, dropping params this sklearn lacks.
+
+    Args:
+        name: Key in MODEL_CONFIGS
+        n_jobs: Overrides n_jobs for estimators that support it
+    """
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import SVC
+
+    classes = {
+        'logistic_regression': LogisticRegression,
+        'random_forest': RandomForestClassifier,
+        'svm': SVC,
+        'gradient_boosting': GradientBoostingClassifier,
+    }
+    estimator = classes[name]()
+    supported = estimator.get_params()
+    params = {k: v for k, v in MODEL_CONFIGS[name].items() if k in supported}
+    if n_jobs is not None and 'n_jobs' in supported:
+        params['n_jobs'] = n_jobs
+    return estimator.set_params(**params)
+
+
+def load_dataset(path: Path, sep: str = "\t"):
+    """Parse the DASS export and build features and target as the notebook does.
+
+    The target is the quartile of the total score over all Q#A columns.
+    Used with --no-cache; otherwise dataset.open_dataset provides the same
+    arrays from the binary cache.
+
+    Returns:
+        Tuple of (X float array, y int array, feature names)
+    """
+    df = pd.read_csv(path, sep=sep)
+    available_features = [f for f in SELECTED_FEATURES if f in df.columns]
+    X = df[available_features].copy()
+
+    q_cols = [col for col in df.columns if col.endswith('A') and col.startswith('Q')]
+    total_score = df[q_cols].sum(axis=1)
+    y = pd.cut(total_score,
+               bins=[0, total_score.quantile(0.25), total_score.quantile(0.50),
+                     total_score.quantile(0.75), total_score.max() + 1],
+               labels=[0, 1, 2, 3], include_lowest=True)
+
+    X = X.fillna(X.median())
+    if y.isna().any():
+        print(f"⚠️ Dropping {y.isna().sum()} NaN targets")
+        mask = ~y.isna()
+        X, y = X[mask], y[mask]
+    return X.to_numpy(dtype=np.float64), y.astype(int).to_numpy(), available_features
+
+
+def _init_worker(data: dict) -> None:
+    """Receive the scaled matrices and fold indices once per worker."""
+    warnings.filterwarnings('ignore')
+    _data.update(data)
+
+
+def _fit_final(name: str):
+    """Fit on the whole training split and evaluate on the test split."""
+    from sklearn.metrics import (
+        accuracy_score, f1_score, precision_score, recall_score, roc_auc_score,
+    )
+
+    start = time.perf_counter()
+    model = build_estimator(name, n_jobs=1)
+    model.fit(_data['X_train'], _data['y_train'])
+    y_test = _data['y_test']
+    y_pred = model.predict(_data['X_test'])
+    y_proba = model.predict_proba(_data['X_test'])
+    try:
+        roc = float(roc_auc_score(y_test, y_proba, multi_class='ovr', average='weighted'))
+    except (ValueError, TypeError):
+        roc = None
+
+    metrics = {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred, average='weighted')),
+        'recall': float(recall_score(y_test, y_pred, average='weighted')),
+        'f1_weighted': float(f1_score(y_test, y_pred, average='weighted')),
+        'f1_macro': float(f1_score(y_test, y_pred, average='macro')),
+        'roc_auc': roc,
+    }
+    return name, None, metrics, model, y_pred, time.perf_counter() - start
+
+
+def _fit_fold(name: str, fold: int):
+    """Fit on one CV training fold; return the weighted F1 on its held-out fold."""
+    from sklearn.metrics import f1_score
+
+    start = time.perf_counter()
+    train_idx, val_idx = _data['folds'][fold]
+    X, y = _data['X_train'], _data['y_train']
+    model = build_estimator(name, n_jobs=1).fit(X[train_idx], y[train_idx])
+    score = float(f1_score(y[val_idx], model.predict(X[val_idx]), average='weighted'))
+    return name, fold, score, None, None, time.perf_counter() - start
+
+
+def train_models(X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray, y_test: np.ndarray,
+                 model_names, workers: int = None) -> dict:
+    """Fit and cross-validate every model, all (model, fold) pairs in parallel.
+
+    Returns:
+        Dict of model name -> {'metrics', 'model', 'y_pred', 'fit_seconds'}
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    cv = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
+    folds = list(cv.split(X_train, y_train))
+    data = {'X_train': X_train, 'y_train': y_train, 'X_test': X_test, 'y_test': y_test, 'folds': folds}
+
+    results = {name: {'fold_scores': [None] * len(folds), 'fit_seconds': 0.0} for name in model_names}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        # Full-split fits are the longest tasks; start them first
+        futures = [pool.submit(_fit_final, name) for name in model_names]
+        futures += [pool.submit(_fit_fold, name, k) for name in model_names for k in range(len(folds))]
+        for future in as_completed(futures):
+            name, fold, value, model, y_pred, seconds = future.result()
+            entry = results[name]
+            entry['fit_seconds'] += seconds
+            if fold is None:
+                entry.update(metrics=value, model=model, y_pred=y_pred)
+                print(f"   {MODEL_DISPLAY_NAMES[name]}: F1 {value['f1_weighted']:.4f} ({seconds:.1f}s)")
+            else:
+                entry['fold_scores'][fold] = value
+
+    for entry in results.values():
+        scores = np.array(entry.pop('fold_scores'))
+        entry['metrics']['cv_mean'] = float(scores.mean())
+        entry['metrics']['cv_std'] = float(scores.std())
+    return results
+
+
+def save_confusion_matrices(results: dict, y_test: np.ndarray, output_path: Path) -> bool:
+    """Plot one confusion matrix per model (skipped without matplotlib/seaborn)."""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+    except ImportError:
+        print("⚠️ matplotlib/seaborn not installed - skipping confusion_matrices.png")
+        return False
+    from sklearn.metrics import confusion_matrix
+
+    n = len(results)
+    cols = 2 if n > 1 else 1
+    rows = (n + cols - 1) // cols
+    fig, axes = plt.subplots(rows, cols, figsize=(6 * cols, 5 * rows), squeeze=False)
+    for ax, (name, entry) in zip(axes.flat, results.items()):
+        cm = confusion_matrix(y_test, entry['y_pred'], labels=list(CLASS_LABELS))
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax,
+                    xticklabels=CLASS_LABELS.values(), yticklabels=CLASS_LABELS.values())
+        ax.set_title(f"{MODEL_DISPLAY_NAMES[name]}\nF1={entry['metrics']['f1_weighted']:.4f}")
+    for ax in list(axes.flat)[n:]:
+        ax.axis('off')
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=150)
+    plt.close(fig)
+    return True
+
+
+def save_artifacts(results: dict, best_name: str, scaler, feature_names: list,
+                   y_test: np.ndarray, output_dir: Path,
+                   X_train: np.ndarray = None, X_test_scaled: np.ndarray = None) -> None:
+    """Write the files the backend loads, plus the report and plots.
+
+    With X_train (raw answers) and X_test_scaled, also writes the drift
+    monitor's reference histograms.
+    """
+    import joblib
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model_path = output_dir / 'psychiatric_model.joblib'
+    joblib.dump(results[best_name]['model'], model_path)
+    print("✅ psychiatric_model.joblib")
+    joblib.dump(scaler, output_dir / 'scaler.joblib')
+    print("✅ scaler.joblib")
+    with open(output_dir / 'feature_names.json', 'w') as f:
+        json.dump(feature_names, f)
+    print("✅ feature_names.json")
+
+    report = {
+        'best_model': MODEL_DISPLAY_NAMES[best_name],
+        'models': {MODEL_DISPLAY_NAMES[name]: entry['metrics'] for name, entry in results.items()},
+    }
+    with open(output_dir / 'training_report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    print("✅ training_report.json")
+
+    if save_confusion_matrices(results, y_test, output_dir / 'confusion_matrices.png'):
+        print("✅ confusion_matrices.png")
+
+    # Native artifact for sklearn-free cold starts (linear and tree-ensemble models)
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.artifact import export_npz
+
+    npz_path = output_dir / 'psychiatric_model.npz'
+    try:
+        export_npz(results[best_name]['model'], scaler, npz_path, model_path=model_path)
+        print("✅ psychiatric_model.npz")
+    except ValueError:
+        # A leftover npz from an earlier linear model would be stale
+        npz_path.unlink(missing_ok=True)
+
+    if X_train is not None and X_test_scaled is not None:
+        from app.drift import REFERENCE_FILE, build_reference
+
+        probabilities = results[best_name]['model'].predict_proba(X_test_scaled)
+        with open(output_dir / REFERENCE_FILE, 'w') as f:
+            json.dump(build_reference(X_train, probabilities), f)
+        print(f"✅ {REFERENCE_FILE}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Train and compare the screening models.")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA_PATH, help=f"DASS export (default: data/{DATA_FILENAME})")
+    parser.add_argument("--sep", default="\t", help="Field separator (default: tab)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_DIR, help="Artifact directory (default: backend/models)")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_CONFIGS), choices=list(MODEL_CONFIGS))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-cache", action="store_true", help="Parse the export directly instead of using the dataset cache")
+    parser.add_argument("--publish", metavar="VERSION", default=None,
+                        help="Also copy the artifacts into the backend model registry as VERSION")
+    args = parser.parse_args(argv)
+
+    if not args.data.exists():
+        raise SystemExit(f"❌ Dataset not found: {args.data} (download {DATA_FILENAME} from Kaggle or pass --data)")
+
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    start = time.perf_counter()
+    if args.no_cache:
+        X, y, feature_names = load_dataset(args.data, args.sep)
+    else:
+        dataset = open_dataset(args.data, args.sep)
+        X, y = dataset.training_data()
+        feature_names = dataset.feature_names
+    print(f"📥 Loaded {len(X):,} rows, {X.shape[1]} features from {args.data} "
+          f"in {time.perf_counter() - start:.2f}s")
+    for cls, count in enumerate(np.bincount(y, minlength=len(CLASS_LABELS))):
+        print(f"   {CLASS_LABELS[cls]}: {count:,} ({count / len(y) * 100:.1f}%)")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+    )
+    # Scaled once; shared by every model and fold
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    workers = args.workers or os.cpu_count() or 1
+    n_tasks = len(args.models) * (CV_FOLDS + 1)
+    print(f"🤖 Training {len(args.models)} models × {CV_FOLDS + 1} fits on {workers} workers ({n_tasks} tasks)...")
+    results = train_models(X_train_scaled, y_train, X_test_scaled, y_test, args.models, workers)
+
+    best_name = max(results, key=lambda name: results[name]['metrics']['f1_weighted'])
+    best = results[best_name]['metrics']
+    print(f"🏆 BEST: {MODEL_DISPLAY_NAMES[best_name]} (F1={best['f1_weighted']:.4f}, "
+          f"CV {best['cv_mean']:.4f} ± {best['cv_std']:.4f})")
+
+    save_artifacts(results, best_name, scaler, feature_names, y_test, args.output,
+                   X_train=X_train, X_test_scaled=X_test_scaled)
+
+    if args.publish:
+        from app.registry import ModelRegistry
+
+        target = ModelRegistry.from_env().publish(args.output, args.publish)
+        print(f"📁 Published to registry: {target}")
+
+    fit_seconds = sum(entry['fit_seconds'] for entry in results.values())
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  Done in {elapsed:.1f}s ({fit_seconds:.1f}s of model fitting across {workers} workers)")
+
+
+if __name__ == "__main__":
+    main()